@@ -1,23 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, jsonify, flash, has_request_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 import os
-import hashlib
 import json
 import uuid
+import base64
+import shutil
+import re
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import logging
 from dotenv import load_dotenv
 
 from utils.ocr_processor import ProcesadorOCR
-from utils.pdf_splitter import PDFSplitter
+from utils.pdf_splitter import PDFSplitter, paginas_con_varios_codigos
 from utils.validator import ValidadorNotarial
 from utils.auditor import Auditoria
+from utils.progress_notifier import progress_notifier
+from utils.cola_trabajos import ColaTrabajos, PoolTrabajos, ESTADO_COMPLETADO, ESTADO_ERROR
+from utils.carga_fragmentada import GestorCargas, ErrorCarga
+from utils.hashing import servicio_hash
+from utils.sesiones import AlmacenSesiones
+from utils.cache_ttl import CacheTTL
+from utils.busqueda_texto import BusquedaPostgres, BusquedaSQLite, paginas_para_indexar
 
 import requests
 
 # Importar modelos de base de datos
 from models import db, Usuario, Documento, Auditoria as AuditoriaDB
+from sqlalchemy import event, inspect, tuple_
 
 # Cargar variables de entorno
 load_dotenv()
@@ -46,12 +56,33 @@ app.config['SCANNED_FOLDER'] = os.getenv('SCANNED_FOLDER', 'scanned/')
 app.config['SCANNED_ARCHIVE_FOLDER'] = os.getenv('SCANNED_ARCHIVE_FOLDER', 'scanned_archive/')
 app.config['SCANNED_PREVIEW_FOLDER'] = os.getenv('SCANNED_PREVIEW_FOLDER', 'scanned_preview/')
 app.config['ESCANEO_SEPARADO_FOLDER'] = os.getenv('ESCANEO_SEPARADO_FOLDER', 'escaneo_separado/')
+# Copias de los PDF originales cuyo texto completo está pendiente (texto_completo)
+app.config['ORIGINALES_FOLDER'] = os.getenv('ORIGINALES_FOLDER', 'originales/')
 
 # Inicializar base de datos
 db.init_app(app)
 
-# Almacenamiento temporal de procesamiento (en producción usar Redis/DB)
-procesamiento_cache = {}
+# Sesiones de procesamiento para corrección manual (en disco, compartidas entre workers)
+sesiones_procesamiento = AlmacenSesiones(
+    os.getenv('SESIONES_DIR', 'sesiones/'),
+    ttl_segundos=float(os.getenv('SESIONES_TTL_HORAS', 24)) * 3600,
+    max_sesiones=int(os.getenv('SESIONES_MAX', 500))
+)
+
+# Cola persistente de procesamiento (sobrevive a reinicios)
+cola_trabajos = ColaTrabajos(
+    os.getenv('TRABAJOS_DB', 'trabajos.db'),
+    max_intentos=int(os.getenv('TRABAJOS_MAX_INTENTOS', 3))
+)
+
+# Encolar el OCR de página completa en cuanto se guarda un documento procesado por regiones
+TEXTO_COMPLETO_AUTO = os.getenv('OCR_TEXTO_COMPLETO_AUTO', '0') == '1'
+
+# Cargas fragmentadas y reanudables (archivos parciales dentro de UPLOAD_FOLDER)
+gestor_cargas = GestorCargas(
+    os.path.join(app.config['UPLOAD_FOLDER'], '.cargas'),
+    max_fragmento_mb=float(os.getenv('MAX_FRAGMENTO_MB', 64))
+)
 # Sin límite de tamaño de archivo
 
 # Configuración Login
@@ -59,23 +90,77 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+@login_manager.unauthorized_handler
+def no_autorizado():
+    """La API responde 401 en JSON; las páginas redirigen al login"""
+    if request.path.startswith('/api/'):
+        return jsonify({'error': 'Sesión no iniciada'}), 401
+    return redirect(url_for('login', next=request.path))
+
+# Caché por proceso de usuarios autenticados (cada petición con sesión pasa por load_user)
+cache_usuarios = CacheTTL(
+    ttl_segundos=float(os.getenv('USUARIOS_CACHE_TTL', 30)),
+    max_entradas=int(os.getenv('USUARIOS_CACHE_MAX', 1000))
+)
+
 # Clase de usuario para Flask-Login (wrapper del modelo Usuario)
 class User(UserMixin):
     def __init__(self, usuario_db):
         self.id = usuario_db.username
-        self.usuario_db = usuario_db
+        self.datos = {
+            'id': usuario_db.id,
+            'username': usuario_db.username,
+            'nombre_completo': usuario_db.nombre_completo,
+            'rol': usuario_db.rol
+        }
+        self._usuario_db = usuario_db
+    
+    @classmethod
+    def desde_datos(cls, datos):
+        """Usuario reconstruido desde la caché, sin consultar la base de datos"""
+        user = cls.__new__(cls)
+        user.id = datos['username']
+        user.datos = datos
+        user._usuario_db = None
+        return user
+    
+    @property
+    def usuario_db(self):
+        """Modelo Usuario (se consulta solo si una vista lo necesita)"""
+        if self._usuario_db is None:
+            self._usuario_db = db.session.get(Usuario, self.datos['id'])
+        return self._usuario_db
     
     def get_id(self):
-        return self.usuario_db.username
+        return self.id
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Cargar usuario desde base de datos"""
+    """Cargar usuario desde la caché o, si no está, desde la base de datos"""
+    datos = cache_usuarios.obtener(user_id)
+    if datos is not None:
+        return User.desde_datos(datos)
+    
     usuario = Usuario.query.filter_by(username=user_id, activo=True).first()
     if usuario:
-        return User(usuario)
+        user = User(usuario)
+        cache_usuarios.guardar(user_id, user.datos)
+        return user
     return None
 
+@event.listens_for(Usuario, 'after_update')
+@event.listens_for(Usuario, 'after_delete')
+def invalidar_usuario_cache(mapper, connection, target):
+    """Un usuario desactivado o con otro rol no debe seguir en la caché
+    
+    La invalidación es local a este proceso; en los demás workers la entrada
+    expira como máximo tras USUARIOS_CACHE_TTL segundos.
+    """
+    cache_usuarios.invalidar(target.username)
+    historial = inspect(target).attrs.username.history
+    for username in historial.deleted or ():
+        cache_usuarios.invalidar(username)
+
 # Mapeo tipos de libro
 MAPEO_TIPOS = {
     'P': 'PROTOCOLO',
@@ -85,9 +170,24 @@ MAPEO_TIPOS = {
     'A': 'ARRIENDOS'
 }
 
+# Pasos de procesar_pdf reportados al notificador de progreso
+TOTAL_PASOS_PROCESAMIENTO = 6
+
 # ==================== FUNCIONES HELPER ====================
 
-def guardar_documento_procesado(session_id, nombre_archivo, resultado_procesamiento, usuario_actual=None):
+_busqueda_local = None
+
+def obtener_buscador():
+    """Índice de texto: tsvector en PostgreSQL; fuera de él, SQLite FTS5 en BUSQUEDA_DB"""
+    global _busqueda_local
+    if db.engine.dialect.name == 'postgresql':
+        return BusquedaPostgres(db.session)
+    if _busqueda_local is None:
+        _busqueda_local = BusquedaSQLite(os.getenv('BUSQUEDA_DB', 'busqueda.db'))
+    # Las escrituras se aplican cuando db.session confirma
+    return _busqueda_local.en_sesion(db.session)
+
+def guardar_documento_procesado(session_id, nombre_archivo, resultado_procesamiento, usuario_actual=None, paginas_texto=None):
     """
     Guarda un documento procesado en PostgreSQL
     
@@ -96,6 +196,7 @@ def guardar_documento_procesado(session_id, nombre_archivo, resultado_procesamie
         nombre_archivo: Nombre del archivo procesado
         resultado_procesamiento: Dict con resultados del procesamiento
         usuario_actual: Usuario que procesó el documento (opcional)
+        paginas_texto: Texto por página para el índice de búsqueda (opcional)
     
     Returns:
         Documento: Objeto del documento guardado
@@ -108,6 +209,7 @@ def guardar_documento_procesado(session_id, nombre_archivo, resultado_procesamie
         
         # Extraer datos del resultado
         validacion = resultado_procesamiento.get('validacion', {})
+        anio = resultado_procesamiento.get('año')
         
         # Parsear fecha de escritura si existe
         fecha_escritura = None
@@ -129,10 +231,13 @@ def guardar_documento_procesado(session_id, nombre_archivo, resultado_procesamie
             session_id=session_id,
             nombre_archivo=nombre_archivo,
             ruta_archivo=resultado_procesamiento.get('ruta_salida'),
+            ruta_original=resultado_procesamiento.get('ruta_original'),
             usuario=usuario,
             estado='procesado',
             tiempo_procesamiento=resultado_procesamiento.get('tiempo_procesamiento'),
             metodo_ocr=resultado_procesamiento.get('metodo_ocr', 'hybrid'),
+            anio=int(anio) if str(anio or '').isdigit() else None,
+            tipo_libro=resultado_procesamiento.get('tipo_libro'),
             
             # Datos extraídos
             numero_escritura=validacion.get('numero_escritura'),
@@ -153,6 +258,13 @@ def guardar_documento_procesado(session_id, nombre_archivo, resultado_procesamie
         
         db.session.add(documento)
         
+        # Indexar el texto extraído en la misma transacción
+        if paginas_texto:
+            db.session.flush()
+            buscador = obtener_buscador()
+            buscador.registrar_documento(documento.id, nombre_archivo, usuario.id if usuario else None)
+            buscador.indexar(documento.id, paginas_texto)
+        
         # Registrar en auditoría
         if usuario:
             auditoria = AuditoriaDB(
@@ -165,8 +277,8 @@ def guardar_documento_procesado(session_id, nombre_archivo, resultado_procesamie
                     'codigos_faltantes': len(resultado_procesamiento.get('codigos_faltantes', [])),
                     'success': resultado_procesamiento.get('success', False)
                 },
-                ip_address=request.remote_addr if request else None,
-                user_agent=request.headers.get('User-Agent') if request else None
+                ip_address=request.remote_addr if has_request_context() else None,
+                user_agent=request.headers.get('User-Agent') if has_request_context() else None
             )
             db.session.add(auditoria)
         
@@ -225,7 +337,7 @@ def login():
 @login_required
 def dashboard():
     # Obtener últimos documentos procesados
-    documentos = Documento.query.filter_by(usuario_id=current_user.usuario_db.id)\
+    documentos = Documento.query.filter_by(usuario_id=current_user.datos['id'])\
         .order_by(Documento.fecha_procesamiento.desc())\
         .limit(20).all()
         
@@ -249,31 +361,158 @@ def upload_file():
     
     if file and file.filename.lower().endswith('.pdf'):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = ruta_subida_unica(filename)
         file.save(filepath)
         
-        # Procesar el archivo
-        resultado = procesar_pdf(filepath, año, tipo_libro)
+        # Encolar el procesamiento y responder de inmediato
+        trabajo_id = encolar_procesamiento(filepath, filename, año, tipo_libro, current_user.id)
+        return jsonify(respuesta_trabajo_encolado(trabajo_id)), 202
+    
+    return jsonify({'error': 'Archivo no válido'}), 400
+
+def ruta_subida_unica(filename):
+    """Ruta en UPLOAD_FOLDER que no pisa otra subida con el mismo nombre
+    
+    El nombre original se conserva en el payload del trabajo; en disco se
+    antepone un prefijo aleatorio (la app de escritorio sube siempre
+    scan_{año}_{tipo}.pdf).
+    """
+    return os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex[:12]}_{filename}")
+
+def conservar_original(filepath):
+    """Copia propia del PDF subido para el trabajo texto_completo diferido
+    
+    Enlace duro si el sistema de archivos lo permite (sin duplicar el libro);
+    el trabajo la borra cuando ya no quedan páginas parciales.
+    """
+    os.makedirs(app.config['ORIGINALES_FOLDER'], exist_ok=True)
+    destino = os.path.join(app.config['ORIGINALES_FOLDER'], f"{uuid.uuid4().hex}.pdf")
+    try:
+        os.link(filepath, destino)
+    except OSError:
+        shutil.copyfile(filepath, destino)
+    return destino
+
+def descartar_original(documento):
+    """Borra la copia del original de un documento cuyo texto ya está completo"""
+    if documento.ruta_original and os.path.exists(documento.ruta_original):
+        os.unlink(documento.ruta_original)
+    documento.ruta_original = None
+    db.session.commit()
+
+def encolar_procesamiento(filepath, filename, año, tipo_libro, username, sha256=None):
+    """Agrega un PDF a la cola de procesamiento y crea su tarea de progreso
+    
+    Args:
+        sha256: Hash del original ya calculado durante la carga (opcional)
+    """
+    trabajo_id = cola_trabajos.encolar('procesar_pdf', {
+        'filepath': filepath,
+        'filename': filename,
+        'año': año,
+        'tipo_libro': tipo_libro,
+        'username': username,
+        'sha256': sha256
+    })
+    progress_notifier.cleanup_old_tasks()
+    progress_notifier.create_task(trabajo_id, TOTAL_PASOS_PROCESAMIENTO, f"Procesando {filename}")
+    print(f"📥 Trabajo encolado: {trabajo_id} ({filename})")
+    return trabajo_id
+
+def respuesta_trabajo_encolado(trabajo_id):
+    """Respuesta estándar de los endpoints que encolan procesamiento"""
+    return {
+        'success': True,
+        'job_id': trabajo_id,
+        'task_id': trabajo_id,
+        'estado': 'pendiente',
+        'status_url': url_for('estado_trabajo', trabajo_id=trabajo_id),
+        'mensaje': 'Documento en cola de procesamiento'
+    }
+
+def ejecutar_trabajo_procesamiento(payload, trabajo_id):
+    """Manejador de la cola: procesa el PDF y guarda el documento en BD"""
+    # La tarea de progreso puede no existir si el trabajo viene de otro proceso o de un reinicio
+    if progress_notifier.get_progress(trabajo_id) is None:
+        progress_notifier.create_task(trabajo_id, TOTAL_PASOS_PROCESAMIENTO, f"Procesando {payload['filename']}")
+    
+    with app.app_context():
+        resultado = procesar_pdf(payload['filepath'], payload['año'], payload['tipo_libro'], task_id=trabajo_id)
+        # El texto por página va al índice de búsqueda, no al resultado JSON del trabajo
+        paginas_texto = resultado.pop('paginas_texto', None)
+        if payload.get('sha256'):
+            resultado['hash_original'] = payload['sha256']
         
-        # Guardar en base de datos PostgreSQL
         if resultado.get('success'):
+            if resultado.get('paginas_texto_pendiente'):
+                # El trabajo texto_completo vuelve a abrir el original más tarde
+                resultado['ruta_original'] = conservar_original(payload['filepath'])
             try:
-                session_id = resultado.get('session_id')
-                guardar_documento_procesado(
-                    session_id=session_id,
-                    nombre_archivo=filename,
+                usuario_db = Usuario.query.filter_by(username=payload['username']).first()
+                documento = guardar_documento_procesado(
+                    session_id=resultado.get('session_id'),
+                    nombre_archivo=payload['filename'],
                     resultado_procesamiento=resultado,
-                    usuario_actual=current_user
+                    usuario_actual=User(usuario_db) if usuario_db else None,
+                    paginas_texto=paginas_texto
                 )
+                if resultado.get('paginas_texto_pendiente') and TEXTO_COMPLETO_AUTO:
+                    resultado['texto_completo_job_id'] = cola_trabajos.encolar(
+                        'texto_completo', {'documento_id': documento.id, 'username': payload['username']}
+                    )
             except Exception as e:
                 print(f"⚠️ Error guardando en BD (continuando): {str(e)}")
-        
-        return jsonify(resultado)
+                if resultado.get('ruta_original') and os.path.exists(resultado['ruta_original']):
+                    os.unlink(resultado['ruta_original'])
     
-    return jsonify({'error': 'Archivo no válido'}), 400
+    progress_notifier.complete_task(
+        trabajo_id,
+        success=bool(resultado.get('success')),
+        message=resultado.get('error', 'Procesamiento completado')
+    )
+    if not resultado.get('success'):
+        # El pool marca el trabajo como fallido con este mensaje
+        raise RuntimeError(resultado.get('error', 'Error en el procesamiento'))
+    return resultado
+
+def ejecutar_trabajo_texto_completo(payload, trabajo_id):
+    """Manejador de la cola: OCR de página completa de las páginas que solo se
+    leyeron en las regiones del código, y actualización del índice de búsqueda"""
+    with app.app_context():
+        documento = db.session.get(Documento, payload['documento_id'])
+        if documento is None:
+            raise RuntimeError(f"Documento {payload['documento_id']} no encontrado")
+        
+        buscador = obtener_buscador()
+        pendientes = buscador.paginas_parciales(documento.id)
+        if not pendientes:
+            descartar_original(documento)
+            return {'documento_id': documento.id, 'paginas_completadas': 0}
+        if not documento.ruta_original or not os.path.exists(documento.ruta_original):
+            raise RuntimeError('El PDF original ya no está disponible')
+        
+        print(f"📖 Completando texto de {len(pendientes)} páginas de {documento.nombre_archivo}")
+        paginas = ProcesadorOCR().completar_texto(documento.ruta_original, pendientes)
+        buscador.actualizar(documento.id, paginas)
+        db.session.commit()
+        
+        # La copia se conserva mientras el índice tenga páginas parciales (reintento)
+        if not buscador.paginas_parciales(documento.id):
+            descartar_original(documento)
+        
+        return {'documento_id': documento.id, 'paginas_completadas': len(paginas)}
 
-def procesar_pdf(filepath, año, tipo_libro):
-    """Procesa el PDF según la Resolución 202-2021"""
+def _avanzar(task_id, paso, mensaje):
+    """Reporta el avance de procesar_pdf al notificador (si hay tarea)"""
+    if task_id:
+        progress_notifier.update_progress(task_id, paso, mensaje)
+
+def procesar_pdf(filepath, año, tipo_libro, task_id=None):
+    """Procesa el PDF según la Resolución 202-2021
+    
+    Args:
+        task_id: ID de la tarea en progress_notifier para reportar avance (opcional)
+    """
     
     print("\n" + "="*60)
     print(f"🚀 INICIANDO PROCESAMIENTO")
@@ -283,15 +522,16 @@ def procesar_pdf(filepath, año, tipo_libro):
     print(f"📚 Tipo: {tipo_libro} ({MAPEO_TIPOS.get(tipo_libro, 'DESCONOCIDO')})")
     
     try:
-        # 1. Extraer texto con OCR
+        # 1-2. Extraer texto y buscar códigos (en páginas escaneadas solo se
+        # leen las regiones del código; el texto completo se obtiene después)
         print("\n📖 PASO 1: Extrayendo texto con OCR...")
+        _avanzar(task_id, 0, 'Extrayendo texto con OCR...')
         processor = ProcesadorOCR()
-        texto_ocr = processor.extraer_texto(filepath)
-        print(f"✅ Texto extraído: {len(texto_ocr)} caracteres")
+        indice, codigos_encontrados = processor.construir_indice_codigos(filepath, año, tipo_libro)
+        print(f"✅ Texto extraído: {len(indice)} páginas {indice.contar_por_fuente()}")
         
-        # 2. Buscar y corregir códigos
         print("\n🔍 PASO 2: Buscando códigos notariales...")
-        codigos_encontrados = processor.buscar_codigos_notariales(texto_ocr, año, tipo_libro)
+        _avanzar(task_id, 1, 'Buscando códigos notariales...')
         
         if not codigos_encontrados:
             print("❌ ERROR: No se encontraron códigos válidos")
@@ -301,55 +541,65 @@ def procesar_pdf(filepath, año, tipo_libro):
         
         # 3. Validar secuenciales
         print("\n✔️  PASO 3: Validando secuenciales...")
+        _avanzar(task_id, 2, 'Validando secuenciales...')
         validador = ValidadorNotarial()
         validacion = validador.validar_secuenciales(codigos_encontrados)
         print(f"✅ Validación completada")
         
         # 4. Dividir PDF
         print("\n✂️  PASO 4: Dividiendo PDF...")
+        _avanzar(task_id, 3, 'Dividiendo PDF...')
         splitter = PDFSplitter()
         archivos_generados = splitter.dividir_por_codigos(
             filepath, 
             codigos_encontrados, 
             año, 
             tipo_libro,
-            app.config['PROCESSED_FOLDER']
+            app.config['PROCESSED_FOLDER'],
+            indice=indice
         )
         
         if not archivos_generados:
             print("⚠️  ADVERTENCIA: No se generaron archivos")
         
         # 5. Generar reporte PDF
-        print("\n📊 PASO 5: Generando reporte PDF...")
+        print("\n🔐 PASO 5: Calculando hashes de integridad...")
+        _avanzar(task_id, 4, 'Calculando hashes de integridad...')
+        hashes = calcular_hashes(archivos_generados)
+        print(f"✅ Hashes calculados: {len(hashes)}")
+        
+        # 6. Generar reporte PDF (reutiliza los hashes ya calculados)
+        print("\n📊 PASO 6: Generando reporte PDF...")
+        _avanzar(task_id, 5, 'Generando reporte PDF...')
         reporte_path = generar_reporte_pdf(
             archivos_generados, 
             validacion, 
             año, 
             tipo_libro,
-            filepath
+            filepath,
+            hashes=hashes
         )
         print(f"✅ Reporte generado: {reporte_path}")
         
-        # 6. Generar hash de integridad
-        print("\n🔐 PASO 6: Calculando hashes de integridad...")
-        hashes = calcular_hashes(archivos_generados)
-        print(f"✅ Hashes calculados: {len(hashes)}")
-        
         print(f"\n" + "="*60)
         print("✅ PROCESAMIENTO COMPLETADO EXITOSAMENTE")
         print("="*60)
+        _avanzar(task_id, TOTAL_PASOS_PROCESAMIENTO, 'Procesamiento completado')
         
         # Generar session_id único
         session_id = str(uuid.uuid4())
         
-        # Guardar datos en cache para corrección manual
-        procesamiento_cache[session_id] = {
+        # Guardar datos de la sesión para corrección manual
+        sesiones_procesamiento.guardar(session_id, {
             'filepath': filepath,
             'año': año,
             'tipo_libro': tipo_libro,
             'codigos_encontrados': codigos_encontrados,
-            'archivos_generados': archivos_generados
-        }
+            'codigos_manuales': [],
+            'archivos_generados': archivos_generados,
+            'rangos': splitter.rangos,
+            'hashes': hashes
+        })
         
         return {
             'success': True,
@@ -359,7 +609,14 @@ def procesar_pdf(filepath, año, tipo_libro):
             'hashes': hashes,
             'reporte_path': reporte_path,
             'ruta_salida': f"{año}/{MAPEO_TIPOS[tipo_libro]}/",
+            'año': año,
+            'tipo_libro': tipo_libro,
             'codigos_faltantes': validacion.get('faltantes', []),
+            'total_paginas': len(indice),
+            'paginas_en_blanco': len(indice.paginas_en_blanco()),
+            'paginas_con_varios_codigos': paginas_con_varios_codigos(splitter.rangos),
+            'paginas_texto': paginas_para_indexar(indice, splitter.rangos),
+            'paginas_texto_pendiente': indice.contar_por_fuente().get('ocr_regiones', 0),
             'session_id': session_id
         }
         
@@ -369,8 +626,12 @@ def procesar_pdf(filepath, año, tipo_libro):
         traceback.print_exc()
         return {'error': str(e)}
 
-def generar_reporte_pdf(archivos, validacion, año, tipo, original_path):
-    """Genera reporte en PDF para anexar al acta"""
+def generar_reporte_pdf(archivos, validacion, año, tipo, original_path, hashes=None):
+    """Genera reporte en PDF para anexar al acta
+    
+    Args:
+        hashes: Dict nombre -> SHA-256 ya calculado (si falta, se usa servicio_hash)
+    """
     from reportlab.lib.pagesizes import letter
     from reportlab.pdfgen import canvas
     
@@ -441,9 +702,9 @@ def generar_reporte_pdf(archivos, validacion, año, tipo, original_path):
     c.drawString(100, y, "Hashes SHA-256 de los archivos:")
     y -= 20
     
+    hashes = hashes or {}
     for archivo in archivos[:10]:  # Mostrar primeros 10 hashes
-        with open(archivo, 'rb') as f:
-            file_hash = hashlib.sha256(f.read()).hexdigest()
+        file_hash = hashes.get(os.path.basename(archivo)) or servicio_hash.calcular(archivo)
         c.drawString(120, y, f"{os.path.basename(archivo)}:")
         y -= 15
         c.drawString(140, y, file_hash[:64])
@@ -453,12 +714,144 @@ def generar_reporte_pdf(archivos, validacion, año, tipo, original_path):
     return reporte_path
 
 def calcular_hashes(archivos):
-    """Calcula hash SHA-256 para cada archivo"""
-    hashes = {}
-    for archivo in archivos:
-        with open(archivo, 'rb') as f:
-            hashes[os.path.basename(archivo)] = hashlib.sha256(f.read()).hexdigest()
-    return hashes
+    """Calcula hash SHA-256 para cada archivo (en streaming, con caché por archivo)"""
+    return servicio_hash.calcular_varios(archivos)
+
+def actualizar_hashes(hashes_previos, archivos, reescritos):
+    """Hashes de los archivos actuales reutilizando los previos de los que no cambiaron"""
+    reescritos = {os.path.basename(a) for a in reescritos}
+    pendientes = [
+        a for a in archivos
+        if os.path.basename(a) in reescritos or os.path.basename(a) not in hashes_previos
+    ]
+    nuevos = calcular_hashes(pendientes)
+    return {
+        os.path.basename(a): nuevos.get(os.path.basename(a)) or hashes_previos[os.path.basename(a)]
+        for a in archivos
+    }
+
+def validar_correcciones(datos, correcciones, estricto=True):
+    """
+    Valida una lista de correcciones contra la sesión sin aplicar ninguna
+    
+    Args:
+        estricto: Exigir que el código sea del año y tipo del libro (y pasarlo a
+            mayúsculas). /agregar_codigo_manual no lo exige, como antes del lote
+    
+    Returns:
+        (lista de estados por corrección, True si todas son válidas)
+    """
+    existentes = set(datos['codigos_encontrados'])
+    total_paginas = max((r['fin'] for r in datos['rangos']), default=-1) + 1
+    patron = re.compile(rf"^{re.escape(str(datos['año']))}\d+{re.escape(datos['tipo_libro'])}\d{{5}}$")
+    vistos = set()
+    estados = []
+    
+    for correccion in correcciones:
+        codigo = str((correccion or {}).get('codigo') or '').strip()
+        if estricto:
+            codigo = codigo.upper()
+        estado = {'codigo': codigo, 'pagina_inicio': (correccion or {}).get('pagina_inicio')}
+        try:
+            pagina = int(estado['pagina_inicio'])
+        except (TypeError, ValueError):
+            pagina = None
+        
+        if not codigo or pagina is None:
+            estado['error'] = 'Código y página son requeridos'
+        elif pagina < 0 or (total_paginas and pagina >= total_paginas):
+            estado['error'] = f'Página fuera del documento (0-{total_paginas - 1})'
+        elif estricto and not patron.match(codigo):
+            estado['error'] = f"El código no corresponde al libro {datos['año']} {datos['tipo_libro']}"
+        elif codigo in existentes:
+            estado['error'] = f'El código {codigo} ya existe'
+        elif codigo in vistos:
+            estado['error'] = f'El código {codigo} está repetido en la solicitud'
+        else:
+            estado['pagina_inicio'] = pagina
+        
+        estado['estado'] = 'error' if 'error' in estado else 'valido'
+        vistos.add(codigo)
+        estados.append(estado)
+    
+    return estados, all(e['estado'] == 'valido' for e in estados)
+
+def aplicar_correcciones(session_id, correcciones, estricto=True):
+    """
+    Aplica todas las correcciones o ninguna, con un solo ciclo de división,
+    validación y hashes. Si la redivisión falla, los PDFs y la sesión quedan
+    como estaban
+    
+    Returns:
+        (dict de respuesta, código HTTP)
+    """
+    # Dos correcciones simultáneas de la misma sesión no deben pisarse los cambios
+    with sesiones_procesamiento.bloquear(session_id):
+        return _aplicar_correcciones(session_id, correcciones, estricto)
+
+def _aplicar_correcciones(session_id, correcciones, estricto):
+    datos = sesiones_procesamiento.obtener(session_id)
+    if datos is None:
+        return {'error': 'Sesión no encontrada o expirada'}, 400
+    if not correcciones:
+        return {'error': 'Se requiere al menos una corrección'}, 400
+    
+    estados, validas = validar_correcciones(datos, correcciones, estricto)
+    if not validas:
+        # Nada se aplica si alguna corrección es inválida
+        return {'success': False, 'error': 'Correcciones inválidas, no se aplicó ninguna', 'correcciones': estados}, 400
+    
+    nuevos = [(e['codigo'], e['pagina_inicio']) for e in estados]
+    codigos_actualizados = datos['codigos_encontrados'] + [codigo for codigo, _ in nuevos]
+    print(f"📋 Total de códigos: {len(codigos_actualizados)} ({len(nuevos)} manuales nuevos)")
+    
+    # Redividir solo los rangos donde caen los códigos (los demás PDFs no se tocan)
+    splitter = PDFSplitter()
+    archivos_generados, reescritos, eliminados = splitter.redividir(
+        datos['filepath'],
+        datos['rangos'],
+        nuevos,
+        datos['año'],
+        datos['tipo_libro'],
+        app.config['PROCESSED_FOLDER']
+    )
+    
+    # Recalcular validación
+    validador = ValidadorNotarial()
+    validacion = validador.validar_secuenciales(codigos_actualizados)
+    
+    # Hashes: solo de los archivos reescritos (o de los que falten en la sesión)
+    hashes = actualizar_hashes(datos.get('hashes', {}), archivos_generados, reescritos)
+    
+    # Actualizar sesión
+    datos['codigos_encontrados'] = codigos_actualizados
+    datos['codigos_manuales'] = [tuple(c) for c in datos.get('codigos_manuales', [])] + nuevos
+    datos['archivos_generados'] = archivos_generados
+    datos['rangos'] = splitter.rangos
+    datos['hashes'] = hashes
+    sesiones_procesamiento.guardar(session_id, datos)
+    
+    rangos_por_codigo = {r['codigo']: r for r in splitter.rangos}
+    for estado in estados:
+        rango = rangos_por_codigo[estado['codigo']]
+        estado['estado'] = 'agregado'
+        estado['paginas'] = [rango['inicio'], rango['fin']]
+    
+    print(f"✅ {len(nuevos)} código(s) agregado(s)")
+    print(f"📁 Archivos generados: {len(archivos_generados)} ({len(reescritos)} reescritos)")
+    
+    return {
+        'success': True,
+        'archivos_generados': len(archivos_generados),
+        'codigos_encontrados': codigos_actualizados,
+        'validacion': validacion,
+        'hashes': hashes,
+        'ruta_salida': f"{datos['año']}/{MAPEO_TIPOS[datos['tipo_libro']]}/",
+        'codigos_faltantes': validacion.get('faltantes', []),
+        'paginas_con_varios_codigos': paginas_con_varios_codigos(splitter.rangos),
+        'archivos_reescritos': [os.path.basename(a) for a in reescritos],
+        'correcciones': estados
+    }, 200
 
 @app.route('/agregar_codigo_manual', methods=['POST'])
 @login_required
@@ -468,67 +861,52 @@ def agregar_codigo_manual():
         data = request.json
         session_id = data.get('session_id')
         codigo_manual = data.get('codigo')
-        pagina_inicio = int(data.get('pagina_inicio', 0))
         
         print(f"\n🔧 AGREGANDO CÓDIGO MANUAL")
         print(f"Session ID: {session_id}")
         print(f"Código: {codigo_manual}")
-        print(f"Página: {pagina_inicio}")
-        
-        # Validar datos
-        if not session_id or session_id not in procesamiento_cache:
-            return jsonify({'error': 'Sesión no encontrada o expirada'}), 400
-        
-        if not codigo_manual or pagina_inicio < 0:
-            return jsonify({'error': 'Código y página son requeridos'}), 400
-        
-        # Obtener datos de procesamiento
-        datos = procesamiento_cache[session_id]
-        
-        # Verificar que el código no exista ya
-        if codigo_manual in datos['codigos_encontrados']:
-            return jsonify({'error': f'El código {codigo_manual} ya existe'}), 400
-        
-        # Agregar código manual a la lista
-        codigos_actualizados = datos['codigos_encontrados'] + [codigo_manual]
+        print(f"Página: {data.get('pagina_inicio', 0)}")
         
-        print(f"📋 Total de códigos: {len(codigos_actualizados)}")
-        
-        # Reprocesar división con código adicional
-        splitter = PDFSplitter()
-        archivos_generados = splitter.dividir_por_codigos_con_manual(
-            datos['filepath'],
-            codigos_actualizados,
-            [(codigo_manual, pagina_inicio)],  # Códigos manuales con páginas
-            datos['año'],
-            datos['tipo_libro'],
-            app.config['PROCESSED_FOLDER']
+        # Sin exigir el patrón del libro: el código se acepta tal como lo escribe el usuario
+        respuesta, status = aplicar_correcciones(
+            session_id,
+            [{'codigo': codigo_manual, 'pagina_inicio': data.get('pagina_inicio', 0)}],
+            estricto=False
         )
+        if status != 200:
+            # Mismo formato de error que antes: el motivo de la única corrección
+            estados = respuesta.get('correcciones')
+            if estados:
+                respuesta = {'error': estados[0]['error'], 'correcciones': estados}
+            return jsonify(respuesta), status
         
-        # Actualizar cache
-        datos['codigos_encontrados'] = codigos_actualizados
-        datos['archivos_generados'] = archivos_generados
-        
-        # Recalcular validación
-        validador = ValidadorNotarial()
-        validacion = validador.validar_secuenciales(codigos_actualizados)
-        
-        # Generar hashes
-        hashes = calcular_hashes(archivos_generados)
+        respuesta['mensaje'] = f'Código {codigo_manual} agregado exitosamente'
+        return jsonify(respuesta)
         
-        print(f"✅ Código agregado exitosamente")
-        print(f"📁 Archivos generados: {len(archivos_generados)}")
+    except Exception as e:
+        print(f"❌ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/agregar_codigos_manuales', methods=['POST'])
+@login_required
+def agregar_codigos_manuales():
+    """Aplica varias correcciones manuales a la vez (todas o ninguna)
+    
+    Body JSON: {"session_id": "...", "correcciones": [{"codigo": "...", "pagina_inicio": 12}, ...]}
+    """
+    try:
+        data = request.json or {}
+        correcciones = data.get('correcciones')
+        if not isinstance(correcciones, list):
+            return jsonify({'error': 'correcciones debe ser una lista'}), 400
         
-        return jsonify({
-            'success': True,
-            'archivos_generados': len(archivos_generados),
-            'codigos_encontrados': codigos_actualizados,
-            'validacion': validacion,
-            'hashes': hashes,
-            'ruta_salida': f"{datos['año']}/{MAPEO_TIPOS[datos['tipo_libro']]}/",
-            'codigos_faltantes': validacion.get('faltantes', []),
-            'mensaje': f'Código {codigo_manual} agregado exitosamente'
-        })
+        print(f"\n🔧 AGREGANDO {len(correcciones)} CÓDIGOS MANUALES")
+        respuesta, status = aplicar_correcciones(data.get('session_id'), correcciones)
+        if status == 200:
+            respuesta['mensaje'] = f'{len(correcciones)} código(s) agregado(s) exitosamente'
+        return jsonify(respuesta), status
         
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
@@ -563,7 +941,8 @@ def api_login():
         usuario = Usuario.query.filter_by(username=username, activo=True).first()
         
         if usuario and usuario.check_password(password):
-            # En producción usar JWT, aquí simulamos retorno seguro
+            # Cookie de sesión para consultar /api/trabajos; en producción usar JWT
+            login_user(User(usuario))
             return jsonify({
                 'success': True,
                 'user': {
@@ -594,29 +973,15 @@ def api_upload_scan():
              return jsonify({'error': 'Faltan metadatos (año, tipo, usuario)'}), 400
         
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = ruta_subida_unica(filename)
         file.save(filepath)
         
         print(f"\n📥 Recibido desde Desktop App: {filename}")
         print(f"   Usuario: {username}, Año: {año}, Tipo: {tipo_libro}")
         
-        # Procesar (Validación/Splitting)
-        resultado = procesar_pdf(filepath, año, tipo_libro)
-        
-        # Asignar usuario
-        usuario_db = Usuario.query.filter_by(username=username).first()
-        user_obj = User(usuario_db) if usuario_db else None
-        
-        if resultado.get('success'):
-             session_id = resultado.get('session_id')
-             guardar_documento_procesado(
-                session_id=session_id,
-                nombre_archivo=filename,
-                resultado_procesamiento=resultado,
-                usuario_actual=user_obj
-            )
-            
-        return jsonify(resultado)
+        # Encolar (Validación/Splitting en segundo plano)
+        trabajo_id = encolar_procesamiento(filepath, filename, año, tipo_libro, username)
+        return jsonify(respuesta_trabajo_encolado(trabajo_id)), 202
         
     except Exception as e:
         print(f"❌ Error API Upload: {str(e)}")
@@ -624,6 +989,280 @@ def api_upload_scan():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+# ==================== CARGA FRAGMENTADA ====================
+
+def carga_del_usuario(carga_id):
+    """Estado de una carga del usuario actual (las de otros usuarios no se encuentran)"""
+    estado = gestor_cargas.estado(carga_id)
+    if estado['metadatos'].get('username') != current_user.id:
+        raise ErrorCarga('Carga no encontrada o expirada')
+    return estado
+
+@app.route('/api/cargas', methods=['POST'])
+@login_required
+def iniciar_carga():
+    """Inicia una carga fragmentada del usuario actual: {nombre, tamaño, año, tipo_libro}"""
+    data = request.json or {}
+    nombre = secure_filename(data.get('nombre', ''))
+    año = data.get('año')
+    tipo_libro = data.get('tipo_libro')
+    
+    if not nombre.lower().endswith('.pdf'):
+        return jsonify({'error': 'Archivo no válido'}), 400
+    if not all([año, tipo_libro]):
+        return jsonify({'error': 'Faltan metadatos (año, tipo)'}), 400
+    
+    try:
+        estado = gestor_cargas.iniciar(nombre, int(data.get('tamaño', 0)), {
+            'año': año,
+            'tipo_libro': tipo_libro,
+            'username': current_user.id
+        })
+    except (ErrorCarga, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    gestor_cargas.limpiar_expiradas()
+    return jsonify({
+        'carga_id': estado['carga_id'],
+        'recibido': 0,
+        'max_fragmento': gestor_cargas.max_fragmento
+    }), 201
+
+@app.route('/api/cargas/<carga_id>', methods=['GET'])
+@login_required
+def estado_carga(carga_id):
+    """Bytes ya recibidos de una carga (para reanudar desde ese offset)"""
+    try:
+        estado = carga_del_usuario(carga_id)
+    except ErrorCarga as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify({
+        'carga_id': carga_id,
+        'recibido': estado['recibido'],
+        'tamaño_total': estado['tamaño_total']
+    })
+
+@app.route('/api/cargas/<carga_id>', methods=['PUT'])
+@login_required
+def subir_fragmento(carga_id):
+    """Recibe un fragmento en el cuerpo (binario) con su offset en ?offset= o X-Offset"""
+    try:
+        # El dueño no cambia: basta comprobarlo antes de escribir
+        carga_del_usuario(carga_id)
+        offset = int(request.args.get('offset', request.headers.get('X-Offset', -1)))
+        estado = gestor_cargas.escribir_fragmento(
+            carga_id, offset, request.stream, request.content_length
+        )
+    except ValueError:
+        return jsonify({'error': 'Offset inválido'}), 400
+    except ErrorCarga as e:
+        codigo = 409 if e.recibido is not None else 404
+        return jsonify({'error': str(e), 'recibido': e.recibido}), codigo
+    
+    if not estado['completo']:
+        return jsonify({'carga_id': carga_id, 'recibido': estado['recibido'], 'completo': False})
+    
+    # Último fragmento: mover a uploads/ y encolar con el hash ya calculado
+    metadatos = estado['metadatos']
+    filepath = ruta_subida_unica(estado['nombre'])
+    gestor_cargas.finalizar(carga_id, filepath)
+    servicio_hash.registrar(filepath, estado['sha256'])
+    print(f"\n📥 Carga fragmentada completa: {estado['nombre']} ({estado['tamaño_total']} bytes)")
+    print(f"   SHA-256: {estado['sha256']}")
+    
+    trabajo_id = encolar_procesamiento(
+        filepath, estado['nombre'], metadatos['año'], metadatos['tipo_libro'],
+        metadatos['username'], sha256=estado['sha256']
+    )
+    respuesta = respuesta_trabajo_encolado(trabajo_id)
+    respuesta.update({'carga_id': carga_id, 'completo': True, 'sha256': estado['sha256']})
+    return jsonify(respuesta), 202
+
+# ==================== COLA DE TRABAJOS ====================
+
+@app.route('/api/trabajos/<trabajo_id>')
+@login_required
+def estado_trabajo(trabajo_id):
+    """Estado y resultado de un trabajo de procesamiento encolado (solo de su usuario)"""
+    trabajo = cola_trabajos.obtener(trabajo_id)
+    # Los trabajos de otros usuarios se responden igual que los inexistentes
+    if trabajo is None or trabajo['payload'].get('username') != current_user.id:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    respuesta = {
+        'job_id': trabajo['id'],
+        'tipo': trabajo['tipo'],
+        'estado': trabajo['estado'],
+        'intentos': trabajo['intentos'],
+        'creado': datetime.fromtimestamp(trabajo['creado']).isoformat(),
+        'actualizado': datetime.fromtimestamp(trabajo['actualizado']).isoformat(),
+        'progreso': progress_notifier.get_progress(trabajo_id)
+    }
+    if trabajo['estado'] == ESTADO_COMPLETADO:
+        respuesta['resultado'] = trabajo['resultado']
+    elif trabajo['estado'] == ESTADO_ERROR:
+        respuesta['error'] = trabajo['error']
+    
+    return jsonify(respuesta)
+
+def codificar_cursor(documento):
+    """Cursor opaco con la clave de orden (fecha_procesamiento, id) del último documento"""
+    clave = json.dumps([documento.fecha_procesamiento.isoformat(), documento.id])
+    return base64.urlsafe_b64encode(clave.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor):
+    relleno = '=' * (-len(cursor) % 4)
+    fecha, doc_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    return datetime.fromisoformat(fecha), int(doc_id)
+
+@app.route('/api/documentos')
+@login_required
+def listar_documentos():
+    """Documentos del usuario, del más reciente al más antiguo, paginados por cursor
+    
+    Parámetros: año, tipo, estado, requiere_revision (true/false), limite (máx. 100)
+    y cursor (el 'siguiente_cursor' de la respuesta anterior). La paginación por
+    clave (fecha_procesamiento, id) usa los índices idx_documentos_usuario_* y no
+    recorre las filas de las páginas anteriores como OFFSET.
+    """
+    try:
+        limite = min(max(int(request.args.get('limite', 20)), 1), 100)
+        
+        consulta = Documento.query.filter(
+            Documento.usuario_id == current_user.datos['id'],
+            Documento.fecha_procesamiento.isnot(None)
+        )
+        
+        if request.args.get('año'):
+            consulta = consulta.filter(Documento.anio == int(request.args['año']))
+        if request.args.get('tipo'):
+            consulta = consulta.filter(Documento.tipo_libro == request.args['tipo'].upper())
+        if request.args.get('estado'):
+            consulta = consulta.filter(Documento.estado == request.args['estado'])
+        if request.args.get('requiere_revision'):
+            revision = request.args['requiere_revision'].lower() in ('1', 'true', 'si')
+            consulta = consulta.filter(Documento.requiere_revision == revision)
+        
+        if request.args.get('cursor'):
+            fecha, doc_id = decodificar_cursor(request.args['cursor'])
+            consulta = consulta.filter(
+                tuple_(Documento.fecha_procesamiento, Documento.id) < tuple_(fecha, doc_id)
+            )
+        
+        # Uno de más para saber si hay otra página
+        documentos = consulta.order_by(
+            Documento.fecha_procesamiento.desc(), Documento.id.desc()
+        ).limit(limite + 1).all()
+        
+        hay_mas = len(documentos) > limite
+        documentos = documentos[:limite]
+        
+        return jsonify({
+            'documentos': [d.to_dict() for d in documentos],
+            'siguiente_cursor': codificar_cursor(documentos[-1]) if hay_mas else None
+        })
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Parámetro inválido: {e}'}), 400
+
+@app.route('/api/documentos/<int:documento_id>/texto_completo', methods=['POST'])
+@login_required
+def solicitar_texto_completo(documento_id):
+    """Encola el OCR de página completa de un documento procesado solo por regiones
+    (necesario para que sus páginas escaneadas aparezcan en /api/buscar)"""
+    documento = Documento.query.filter_by(id=documento_id, usuario_id=current_user.datos['id']).first()
+    if documento is None:
+        return jsonify({'error': 'Documento no encontrado'}), 404
+    
+    pendientes = obtener_buscador().paginas_parciales(documento.id)
+    if not pendientes:
+        return jsonify({'success': True, 'paginas_pendientes': 0, 'mensaje': 'El texto ya está completo'})
+    
+    trabajo_id = cola_trabajos.encolar('texto_completo', {'documento_id': documento.id, 'username': current_user.id})
+    return jsonify({
+        'success': True,
+        'job_id': trabajo_id,
+        'paginas_pendientes': len(pendientes),
+        'status_url': url_for('estado_trabajo', trabajo_id=trabajo_id)
+    }), 202
+
+@app.route('/api/buscar')
+@login_required
+def buscar_texto():
+    """Búsqueda de texto completo en las páginas de los documentos del usuario
+    
+    Parámetros: q (admite "frase exacta" y -excluir en PostgreSQL) y limite (máx. 100)
+    """
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        return jsonify({'error': 'Parámetro q requerido'}), 400
+    
+    try:
+        limite = min(max(int(request.args.get('limite', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'Parámetro limite inválido'}), 400
+    
+    resultados = obtener_buscador().buscar(consulta, usuario_id=current_user.datos['id'], limite=limite)
+    return jsonify({'consulta': consulta, 'resultados': resultados})
+
+@app.route('/api/estadisticas/cache')
+@login_required
+def estadisticas_cache():
+    """Contadores de las cachés de este proceso (usuarios y hashes)"""
+    return jsonify({
+        'pid': os.getpid(),
+        'usuarios': cache_usuarios.estadisticas(),
+        'hashes': servicio_hash.estadisticas()
+    })
+
+@app.route('/escaneo/progress/<task_id>')
+@login_required
+def progreso_tarea(task_id):
+    """Progreso de una tarea (lo consulta static/progress_monitor.js)"""
+    progreso = progress_notifier.get_progress(task_id)
+    if progreso is not None:
+        progreso['messages'] = [
+            {'time': m['time'].isoformat(), 'message': m['message']} for m in progreso['messages']
+        ]
+        return jsonify(progreso)
+    
+    # La tarea puede estar en otro proceso: responder con el estado persistido en la cola
+    trabajo = cola_trabajos.obtener(task_id)
+    if trabajo is None:
+        return jsonify({'error': 'Tarea no encontrada'}), 404
+    
+    terminado = trabajo['estado'] in (ESTADO_COMPLETADO, ESTADO_ERROR)
+    return jsonify({
+        'task_id': task_id,
+        'description': trabajo['tipo'],
+        'current_step': TOTAL_PASOS_PROCESAMIENTO if terminado else 0,
+        'total_steps': TOTAL_PASOS_PROCESAMIENTO,
+        'percent': 100 if terminado else 0,
+        'status': {ESTADO_COMPLETADO: 'completed', ESTADO_ERROR: 'failed'}.get(trabajo['estado'], 'running'),
+        'messages': [{'message': trabajo['error']}] if trabajo.get('error') else [],
+        'elapsed_time': trabajo['actualizado'] - trabajo['creado']
+    })
+
+# Pool local que vacía la cola (TRABAJOS_WORKERS=0 lo desactiva en este proceso)
+pool_trabajos = PoolTrabajos(
+    cola_trabajos,
+    {
+        'procesar_pdf': ejecutar_trabajo_procesamiento,
+        'texto_completo': ejecutar_trabajo_texto_completo
+    },
+    workers=int(os.getenv('TRABAJOS_WORKERS', 1))
+)
+
+def iniciar_pool_trabajos():
+    """Arranca el pool de trabajos en este proceso
+    
+    No se hace al importar el módulo: con el reloader de Werkzeug el proceso
+    padre solo vigila archivos y no debe reclamar trabajos. Un servidor WSGI
+    debe llamar a esta función al cargar la aplicación.
+    """
+    if pool_trabajos.workers > 0:
+        pool_trabajos.iniciar()
+
 if __name__ == '__main__':
     # Crear directorios necesarios
     for folder in [app.config['UPLOAD_FOLDER'], app.config['PROCESSED_FOLDER']]:
@@ -641,4 +1280,8 @@ if __name__ == '__main__':
         for tipo in MAPEO_TIPOS.values():
             os.makedirs(os.path.join('escaneo_separado', str(año), tipo), exist_ok=True)
     
+    # Con debug=True el reloader relanza el script: solo el hijo (WERKZEUG_RUN_MAIN) atiende peticiones
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_pool_trabajos()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark del análisis de códigos notariales
+Verifica que deduplicación, faltantes y validación crecen linealmente hasta 100k códigos
+(costo proporcional a códigos + tamaño del rango de secuenciales, nunca a su producto)
+"""
+import sys
+import os
+import time
+import random
+
+# Agregar el directorio actual al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.analisis_codigos import deduplicar, detectar_faltantes
+from utils.validator import ValidadorNotarial
+
+PREFIJO = "20251101007P"
+TAMAÑOS = [1_000, 10_000, 100_000]
+# Tolerancia: el tiempo por unidad puede variar (caché, GC) pero no crecer con n
+MAX_CRECIMIENTO_POR_UNIDAD = 4.0
+
+
+def generar_codigos(n, semilla=2025):
+    """n códigos con ~10% de huecos en el rango y repetidos como los que deja el OCR"""
+    rnd = random.Random(semilla)
+    # El secuencial tiene 5 dígitos: como máximo 99.999 distintos
+    distintos = min(int(n * 0.95), 90_000)
+    rango = min(99_999, int(distintos / 0.9))
+    secuenciales = rnd.sample(range(1, rango + 1), distintos)
+    codigos = [f"{PREFIJO}{sec:05d}" for sec in secuenciales]
+    codigos += rnd.choices(codigos, k=n - distintos)
+    rnd.shuffle(codigos)
+    return codigos
+
+
+def medir(funcion, *args, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def analisis_completo(codigos):
+    unicos = deduplicar(codigos)
+    detectar_faltantes(unicos, PREFIJO)
+    ValidadorNotarial().validar_secuenciales(unicos)
+
+
+print("=" * 60)
+print("BENCHMARK ANÁLISIS DE CÓDIGOS")
+print("=" * 60)
+
+resultados = []
+for n in TAMAÑOS:
+    codigos = generar_codigos(n)
+    secuenciales = [int(c[-5:]) for c in codigos]
+    unidades = len(codigos) + (max(secuenciales) - min(secuenciales) + 1)
+    segundos = medir(analisis_completo, codigos)
+    por_unidad = segundos / unidades * 1e6
+    resultados.append((n, segundos, por_unidad))
+    print(f"   n={n:>7,}: {segundos * 1000:8.1f} ms  ({por_unidad:.3f} µs por código+secuencial del rango)")
+
+base = resultados[0][2]
+peor = max(r[2] for r in resultados) / base
+print(f"\n📈 Crecimiento del costo por unidad (1k → 100k): {peor:.2f}x")
+
+if peor > MAX_CRECIMIENTO_POR_UNIDAD:
+    print("❌ El análisis no escala linealmente")
+    sys.exit(1)
+
+print("✅ Comportamiento lineal confirmado")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la mejora de imagen
+Compara la cadena anterior de realces de PIL (recorte, brillo, contraste como
+pasos separados) con la tubería de NumPy de ImageProcessor.mejorar_documento
+sobre una página A4 escaneada a 300 DPI (2480 x 3508), y verifica que ambas
+dan prácticamente la misma imagen
+"""
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+from PIL import Image
+
+# Agregar el directorio actual al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.image_processor import ImageProcessor
+
+ANCHO, ALTO = 2480, 3508  # A4 a 300 DPI
+PARAMETROS = {'auto_crop': True, 'brightness': 1.1, 'contrast': 1.3}
+# Diferencia media permitida entre ambas salidas (niveles de gris, 0-255)
+MAX_DIFERENCIA_MEDIA = 2.0
+
+
+def generar_pagina(modo='L', inclinacion=0.0, semilla=2025):
+    """Página sintética: fondo gris claro con ruido, márgenes y renglones de 'texto'"""
+    rnd = np.random.default_rng(semilla)
+    pagina = rnd.normal(235, 6, (ALTO, ANCHO)).clip(0, 255).astype(np.uint8)
+    pagina[:, :60] = 250   # Borde del escáner
+    pagina[:, -60:] = 250
+
+    for renglon in range(300, ALTO - 300, 70):
+        palabras = rnd.integers(200, ANCHO - 400, size=12)
+        for x in palabras:
+            pagina[renglon:renglon + 28, x:x + rnd.integers(60, 180)] = rnd.integers(20, 70)
+
+    imagen = Image.fromarray(pagina)
+    if inclinacion:
+        imagen = imagen.rotate(-inclinacion, fillcolor=250)
+    return imagen.convert(modo)
+
+
+def medir(funcion, *args, repeticiones=5, **kwargs):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args, **kwargs)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de mejora de imagen (A4 a 300 DPI)')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    processor = ImageProcessor()
+
+    print("=" * 60)
+    print(f"BENCHMARK MEJORA DE IMAGEN ({ANCHO} x {ALTO})")
+    print("=" * 60)
+
+    fallos = 0
+    for modo in ('L', 'RGB'):
+        pagina = generar_pagina(modo)
+        anterior = processor.mejorar_documento_encadenado(pagina, **PARAMETROS)
+        nueva = processor.mejorar_documento(pagina, **PARAMETROS)
+
+        t_anterior = medir(processor.mejorar_documento_encadenado, pagina,
+                           repeticiones=args.repeticiones, **PARAMETROS)
+        t_nueva = medir(processor.mejorar_documento, pagina,
+                        repeticiones=args.repeticiones, **PARAMETROS)
+
+        iguales = anterior.size == nueva.size
+        diferencia = float('inf')
+        if iguales:
+            diferencia = np.abs(np.asarray(anterior, dtype=np.int16) - np.asarray(nueva, dtype=np.int16)).mean()
+        if diferencia > MAX_DIFERENCIA_MEDIA:
+            fallos += 1
+
+        print(f"\n📄 Modo {modo}:")
+        print(f"   Cadena PIL:   {t_anterior * 1000:8.1f} ms")
+        print(f"   NumPy:        {t_nueva * 1000:8.1f} ms  ({t_anterior / t_nueva:.1f}x)")
+        print(f"   Recorte: {anterior.size} vs {nueva.size}, diferencia media {diferencia:.2f} niveles")
+
+    # Binarización y enderezado (sin equivalente en la cadena anterior)
+    inclinada = generar_pagina('L', inclinacion=2.0)
+    t_bin = medir(processor.mejorar_documento, inclinada, repeticiones=args.repeticiones,
+                  binarizar=True, **PARAMETROS)
+    angulo = processor.estimar_inclinacion(np.asarray(inclinada))
+    t_angulo = medir(processor.estimar_inclinacion, np.asarray(inclinada), repeticiones=args.repeticiones)
+    print(f"\n⬛ Con binarización (Otsu): {t_bin * 1000:8.1f} ms")
+    print(f"📐 Inclinación estimada: {angulo:+.2f}° (real +2.00°) en {t_angulo * 1000:.1f} ms")
+    if abs(angulo - 2.0) > 0.5:
+        fallos += 1
+
+    if fallos:
+        print("\n❌ La tubería de NumPy no coincide con la cadena anterior")
+        return 1
+
+    print("\n✅ Resultados equivalentes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
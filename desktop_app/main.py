@@ -14,7 +14,98 @@ ctk.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
 ctk.set_default_color_theme("blue")  # Themes: "blue" (standard), "green", "dark-blue"
 
 API_URL = "http://localhost:5000/api"
+SERVER_URL = API_URL.rsplit("/api", 1)[0]  # status_url comes back as a server path
 SESSION_FILE = "session.json"
+CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB per chunk
+MAX_RETRIES = 5
+POLL_INTERVAL = 3  # seconds between job status checks
+
+# Shared HTTP session: keeps the login cookie that /api/trabajos requires
+http = requests.Session()
+
+
+def upload_chunked(pdf_path, filename, metadata):
+    """Upload a PDF in resumable chunks; a dropped connection resumes from the server offset
+
+    Returns the last server response: 202 once the upload is complete, 404 if the
+    upload no longer exists, or any other error status as is.
+    """
+    total = os.path.getsize(pdf_path)
+    response = http.post(f"{API_URL}/cargas", json={"nombre": filename, "tamaño": total, **metadata})
+    response.raise_for_status()
+    upload_id = response.json()["carga_id"]
+
+    offset = 0
+    retries = 0
+    with open(pdf_path, "rb") as f:
+        while True:
+            f.seek(offset)
+            chunk = f.read(CHUNK_SIZE)
+            try:
+                response = http.put(f"{API_URL}/cargas/{upload_id}", params={"offset": offset}, data=chunk)
+            except requests.RequestException:
+                # Back off until the server answers how much it actually stored
+                status, retries = _wait_for_upload_status(upload_id, retries)
+                if status.status_code != 200:
+                    # 404: the lost response may have been the last chunk (already finalized) or the upload expired
+                    return status
+                offset = status.json()["recibido"]
+                continue
+
+            if response.status_code == 409:
+                offset = response.json()["recibido"]
+                continue
+            if response.status_code not in (200, 202):
+                # Error bodies (413, 500...) may not be JSON: the caller reports the status
+                return response
+
+            retries = 0
+            res = response.json()
+            if res.get("completo"):
+                return response
+            offset = res["recibido"]
+
+
+def _wait_for_upload_status(upload_id, retries):
+    """GET the upload status, retrying with backoff while the network is down
+
+    Returns (response, retries used so far)
+    """
+    while True:
+        retries += 1
+        if retries > MAX_RETRIES:
+            raise RuntimeError("Sin conexión con el servidor")
+        time.sleep(2 ** retries)
+        try:
+            return http.get(f"{API_URL}/cargas/{upload_id}"), retries
+        except requests.RequestException:
+            continue
+
+
+def wait_for_job(status_url, on_progress=None):
+    """Poll a queued job until the server finishes it; returns the final job JSON"""
+    retries = 0
+    while True:
+        try:
+            response = http.get(f"{SERVER_URL}{status_url}")
+        except requests.RequestException:
+            retries += 1
+            if retries > MAX_RETRIES:
+                raise
+            time.sleep(2 ** retries)
+            continue
+
+        if response.status_code == 401:
+            raise RuntimeError("Sesión expirada: inicie sesión de nuevo")
+        response.raise_for_status()
+        retries = 0
+
+        job = response.json()
+        if job["estado"] in ("completado", "error"):
+            return job
+        if on_progress and job.get("progreso"):
+            on_progress(job["progreso"])
+        time.sleep(POLL_INTERVAL)
 
 class LoginFrame(ctk.CTkFrame):
     def __init__(self, master, login_callback):
@@ -54,7 +145,7 @@ class LoginFrame(ctk.CTkFrame):
 
     def perform_login(self, username, password):
         try:
-            response = requests.post(f"{API_URL}/login", json={"username": username, "password": password})
+            response = http.post(f"{API_URL}/login", json={"username": username, "password": password})
             if response.status_code == 200:
                 data = response.json()
                 if data.get("success"):
@@ -96,6 +187,7 @@ class App(ctk.CTk):
                     data = json.load(f)
                     self.user_token = data.get("token")
                     self.current_user = data.get("user")
+                    http.cookies.update(data.get("cookies", {}))
                     return True
             except:
                 return False
@@ -103,7 +195,7 @@ class App(ctk.CTk):
 
     def save_session(self, token, user):
         with open(SESSION_FILE, "w") as f:
-            json.dump({"token": token, "user": user}, f)
+            json.dump({"token": token, "user": user, "cookies": http.cookies.get_dict()}, f)
         self.user_token = token
         self.current_user = user
 
@@ -123,6 +215,7 @@ class App(ctk.CTk):
     def logout_event(self):
         if os.path.exists(SESSION_FILE): os.remove(SESSION_FILE)
         self.user_token = None; self.current_user = None
+        http.cookies.clear()
         self.show_login()
 
     def show_scanner(self):
@@ -468,23 +561,35 @@ class ScannerFrame(ctk.CTkFrame):
             # 2. Upload to API
             self.after(0, lambda: self.set_status("Subiendo al servidor...", show_progress=True))
             
-            with open(pdf_path, 'rb') as f:
-                files = {'pdf_file': (f'scan_{year}_{book_type}.pdf', f, 'application/pdf')}
-                data = {
-                    'username': self.user_data.get('username'),
-                    'año': year,
-                    'tipo_libro': book_type
-                }
-                response = requests.post(f"{API_URL}/upload_scan", files=files, data=data)
+            # The server takes the owner from the login session
+            data = {
+                'año': year,
+                'tipo_libro': book_type
+            }
+            response = upload_chunked(pdf_path, f'scan_{year}_{book_type}.pdf', data)
+
+            # 202: el servidor encoló el documento y lo procesa en segundo plano
+            if response.status_code == 404:
+                # Images are kept: check the web dashboard before scanning again
+                self.after(0, lambda: self.set_status("La carga ya no existe en el servidor (finalizada o expirada)", True))
+                return
+            if response.status_code not in (200, 202):
+                self.after(0, lambda: self.set_status(f"Error HTTP {response.status_code}", True))
+                return
+            res = response.json()
+            if not res.get('success'):
+                self.after(0, lambda: self.set_status(f"Error Backend: {res.get('error')}", True))
+                return
 
-            if response.status_code == 200:
-                res = response.json()
-                if res.get('success'):
-                    self.after(0, lambda: self._on_upload_success(res.get('message', 'OK')))
-                else:
-                    self.after(0, lambda: self.set_status(f"Error Backend: {res.get('error')}", True))
+            # 3. Wait for the server to process it; the images are kept until it succeeds
+            self.after(0, lambda: self.set_status("Procesando en el servidor...", show_progress=True))
+            job = wait_for_job(res['status_url'], lambda p: self.after(
+                0, lambda: self.set_status(f"Procesando en el servidor... {p.get('percent', 0)}%", show_progress=True)
+            ))
+            if job['estado'] == 'completado':
+                self.after(0, lambda: self._on_upload_success("Documento procesado"))
             else:
-                self.after(0, lambda: self.set_status(f"Error HTTP {response.status_code}", True))
+                self.after(0, lambda: self.set_status(f"Error Backend: {job.get('error')}", True))
 
         except Exception as e:
             self.after(0, lambda: self.set_status(f"Error: {e}", True))
@@ -544,6 +649,7 @@ class App(ctk.CTk):
                     data = json.load(f)
                     self.user_token = data.get("token")
                     self.current_user = data.get("user")
+                    http.cookies.update(data.get("cookies", {}))
                     return True
             except:
                 return False
@@ -551,7 +657,7 @@ class App(ctk.CTk):
 
     def save_session(self, token, user):
         with open(SESSION_FILE, "w") as f:
-            json.dump({"token": token, "user": user}, f)
+            json.dump({"token": token, "user": user, "cookies": http.cookies.get_dict()}, f)
         self.user_token = token
         self.current_user = user
 
@@ -568,6 +674,7 @@ class App(ctk.CTk):
     def logout_event(self):
         if os.path.exists(SESSION_FILE): os.remove(SESSION_FILE)
         self.user_token = None; self.current_user = None
+        http.cookies.clear()
         self.show_login()
 
     def show_scanner(self):
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Ingesta Masiva de Libros Escaneados
+Recorre un árbol de carpetas, deduce año y tipo de libro de la ruta y procesa
+varios libros en paralelo (un proceso por libro) con BatchProcessor.
+
+- Un semáforo compartido acota las páginas en OCR simultáneas de todos los
+  procesos, así varios libros escaneados no saturan la máquina.
+- Los núcleos se reparten entre los libros: cada uno abre cpu_count // procesos
+  procesos de OCR (cada uno con su documento abierto), no cpu_count.
+- Cada libro terminado se anota en un checkpoint (JSON Lines); al relanzar,
+  los libros ya completados (mismo tamaño y fecha) se omiten.
+
+Uso:
+    python ingesta_masiva.py /archivo/libros --procesos 3 --ocr-paginas 8
+    python ingesta_masiva.py /archivo/2019/PROTOCOLO --tipo P --simular
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Agregar el directorio actual al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Nombre de carpeta/archivo → letra de tipo (mismo mapeo que la aplicación web)
+TIPOS_POR_NOMBRE = {
+    'PROTOCOLO': 'P',
+    'DILIGENCIA': 'D',
+    'CERTIFICACION': 'C',
+    'ARRIENDO': 'A',
+    'OTROS': 'O'
+}
+PATRON_AÑO = re.compile(r'(?<!\d)(19[5-9]\d|20\d{2})(?!\d)')
+
+# BatchProcessor de cada proceso (se crea una vez por proceso, no por libro)
+_procesador = None
+_salida = None
+
+
+def inferir_libro(ruta):
+    """
+    Deduce (año, tipo) de la ruta de un libro, de la parte más específica a la más general
+
+    Reconoce años de 4 dígitos y carpetas o archivos con el nombre del tipo
+    (PROTOCOLO, DILIGENCIAS, ...) o solo su letra (.../2019/P/libro.pdf).
+    """
+    año = tipo = None
+    partes = os.path.normpath(os.path.splitext(ruta)[0]).split(os.sep)
+
+    for i, parte in enumerate(reversed(partes)):
+        nombre = parte.upper()
+        es_carpeta = i > 0
+        if año is None:
+            encontrado = PATRON_AÑO.search(nombre)
+            if encontrado:
+                año = encontrado.group(1)
+        if tipo is None:
+            if es_carpeta and nombre in TIPOS_POR_NOMBRE.values():
+                tipo = nombre
+            else:
+                for clave, letra in TIPOS_POR_NOMBRE.items():
+                    if clave in nombre:
+                        tipo = letra
+                        break
+        if año and tipo:
+            break
+
+    return año, tipo
+
+
+def buscar_libros(raiz):
+    """PDFs bajo la carpeta raíz, en orden estable"""
+    libros = []
+    for directorio, subdirectorios, archivos in os.walk(raiz):
+        subdirectorios.sort()
+        for archivo in sorted(archivos):
+            if archivo.lower().endswith('.pdf'):
+                libros.append(os.path.join(directorio, archivo))
+    return libros
+
+
+def clave_libro(ruta):
+    """Identifica una versión concreta del archivo (si se reemplaza, se vuelve a procesar)"""
+    stat = os.stat(ruta)
+    return f"{os.path.abspath(ruta)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def cargar_checkpoint(ruta_checkpoint):
+    """Claves de los libros completados en ejecuciones anteriores"""
+    completados = set()
+    if not os.path.exists(ruta_checkpoint):
+        return completados
+    with open(ruta_checkpoint, 'r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                entrada = json.loads(linea)
+            except ValueError:
+                continue  # Línea cortada por una interrupción
+            if entrada.get('estado') == 'completado':
+                completados.add(entrada['clave'])
+    return completados
+
+
+def anotar_checkpoint(ruta_checkpoint, entrada):
+    """Anexa una línea y la fuerza a disco antes de seguir"""
+    with open(ruta_checkpoint, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _inicializar_proceso(limitador, ocr_workers, salida):
+    """Crea el BatchProcessor del proceso con el semáforo global de OCR"""
+    global _procesador, _salida
+    from utils.batch_processor import BatchProcessor
+    _procesador = BatchProcessor(ocr_workers=ocr_workers, limitador=limitador)
+    _salida = salida
+
+
+def _procesar_libro(ruta, año, tipo):
+    inicio = time.time()
+    resumen = _procesador.procesar_libro(ruta, año, tipo, _salida)
+    resumen['segundos'] = round(time.time() - inicio, 1)
+    # El checkpoint guarda el resumen, no la lista completa de códigos
+    resumen['archivos_generados'] = len(resumen['archivos_generados'])
+    resumen.pop('codigos')
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingesta masiva de libros notariales escaneados')
+    parser.add_argument('raiz', help='Carpeta con los PDFs (se recorre recursivamente)')
+    parser.add_argument('--año', help='Año para todos los libros (si no, se deduce de la ruta)')
+    parser.add_argument('--tipo', choices=sorted(TIPOS_POR_NOMBRE.values()),
+                        help='Tipo de libro para todos (si no, se deduce de la ruta)')
+    parser.add_argument('--salida', default=os.getenv('PROCESSED_FOLDER', 'processed/'),
+                        help='Carpeta base de los PDFs divididos (default: PROCESSED_FOLDER)')
+    parser.add_argument('--procesos', type=int, default=2, help='Libros procesados a la vez')
+    parser.add_argument('--ocr-paginas', type=int, default=os.cpu_count() or 1,
+                        help='Máximo de páginas en OCR a la vez entre todos los procesos')
+    parser.add_argument('--ocr-workers', type=int, default=None,
+                        help='Procesos de OCR por libro (default: núcleos / --procesos)')
+    parser.add_argument('--checkpoint', default='ingesta_checkpoint.jsonl',
+                        help='Archivo de avance para reanudar')
+    parser.add_argument('--simular', action='store_true',
+                        help='Solo listar qué se procesaría')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.raiz):
+        print(f"❌ No existe la carpeta {args.raiz}")
+        return 1
+
+    completados = cargar_checkpoint(args.checkpoint)
+    pendientes = []
+    omitidos = 0
+    sin_libro = []
+
+    for ruta in buscar_libros(args.raiz):
+        año, tipo = inferir_libro(ruta)
+        año = args.año or año
+        tipo = args.tipo or tipo
+        if not año or not tipo:
+            sin_libro.append(ruta)
+            continue
+        clave = clave_libro(ruta)
+        if clave in completados:
+            omitidos += 1
+            continue
+        pendientes.append((ruta, año, tipo, clave))
+
+    print("=" * 60)
+    print("INGESTA MASIVA")
+    print("=" * 60)
+    print(f"📁 Raíz: {args.raiz}")
+    print(f"📚 Pendientes: {len(pendientes)} | ✅ Ya completados: {omitidos} | ⚠️  Sin año/tipo: {len(sin_libro)}")
+    for ruta in sin_libro:
+        print(f"   ⚠️  {ruta} (use --año/--tipo)")
+
+    if args.simular:
+        for ruta, año, tipo, _ in pendientes:
+            print(f"   {año} {tipo}  {ruta}")
+        return 0
+    if not pendientes:
+        return 0
+
+    # El semáforo solo acota las llamadas a Tesseract, no el renderizado ni la memoria
+    ocr_workers = args.ocr_workers or max(1, (os.cpu_count() or 1) // args.procesos)
+    print(f"⚙️  {args.procesos} libros a la vez ({ocr_workers} procesos de OCR cada uno), "
+          f"máximo {args.ocr_paginas} páginas en OCR a la vez")
+
+    errores = 0
+    contexto = multiprocessing.get_context('spawn')
+    with contexto.Manager() as manager:
+        limitador = manager.BoundedSemaphore(args.ocr_paginas)
+
+        with ProcessPoolExecutor(
+            max_workers=args.procesos,
+            mp_context=contexto,
+            initializer=_inicializar_proceso,
+            initargs=(limitador, ocr_workers, args.salida)
+        ) as executor:
+            futuros = {
+                executor.submit(_procesar_libro, ruta, año, tipo): (ruta, año, tipo, clave)
+                for ruta, año, tipo, clave in pendientes
+            }
+
+            try:
+                for i, futuro in enumerate(as_completed(futuros), 1):
+                    ruta, año, tipo, clave = futuros[futuro]
+                    entrada = {
+                        'clave': clave,
+                        'ruta': ruta,
+                        'año': año,
+                        'tipo': tipo,
+                        'fecha': datetime.now().isoformat()
+                    }
+                    try:
+                        entrada.update(futuro.result())
+                        entrada['estado'] = 'completado'
+                        print(f"[{i}/{len(pendientes)}] ✅ {ruta}: {entrada['total_codigos']} códigos, "
+                              f"{entrada['archivos_generados']} archivos ({entrada['segundos']}s)")
+                    except Exception as e:
+                        errores += 1
+                        entrada['estado'] = 'error'
+                        entrada['error'] = str(e)
+                        print(f"[{i}/{len(pendientes)}] ❌ {ruta}: {e}")
+                    anotar_checkpoint(args.checkpoint, entrada)
+            except KeyboardInterrupt:
+                print("\n⏹️  Interrumpido: los libros terminados quedan en el checkpoint")
+                for futuro in futuros:
+                    futuro.cancel()
+                raise
+
+    print(f"\n✅ Ingesta terminada: {len(pendientes) - errores} libros, {errores} errores")
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
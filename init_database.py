@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
 from models import Usuario, Documento, Auditoria, Configuracion
+from utils.auditor import Auditoria as RegistroAuditoria
 
 def init_database():
     """Inicializar base de datos con tablas y datos iniciales"""
@@ -70,6 +71,11 @@ def init_database():
         db.session.commit()
         print("✅ Configuración inicial creada")
         
+        # Registro de auditoría antiguo (arreglo JSON) → JSON Lines
+        migrados = RegistroAuditoria.registro.migrar_json_legado(RegistroAuditoria.LOG_FILE)
+        if migrados:
+            print(f"✅ Auditoría migrada a {RegistroAuditoria.registro.ruta}: {migrados} eventos")
+        
         # Mostrar estadísticas
         total_usuarios = Usuario.query.count()
         total_documentos = Documento.query.count()
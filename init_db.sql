@@ -22,11 +22,14 @@ CREATE TABLE IF NOT EXISTS documentos (
     session_id VARCHAR(100) UNIQUE NOT NULL,
     nombre_archivo VARCHAR(255) NOT NULL,
     ruta_archivo VARCHAR(500),
+    ruta_original VARCHAR(500),
     fecha_procesamiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     usuario_id INTEGER REFERENCES usuarios(id),
     estado VARCHAR(20) DEFAULT 'procesado',
     tiempo_procesamiento FLOAT,
     metodo_ocr VARCHAR(50),
+    anio INTEGER,
+    tipo_libro VARCHAR(1),
     
     -- Datos extraídos
     numero_escritura VARCHAR(50),
@@ -47,6 +50,17 @@ CREATE TABLE IF NOT EXISTS documentos (
     actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Texto extraído por página (comprimido con zlib) e índice de búsqueda
+CREATE TABLE IF NOT EXISTS paginas_texto (
+    id SERIAL PRIMARY KEY,
+    documento_id INTEGER NOT NULL REFERENCES documentos(id) ON DELETE CASCADE,
+    pagina INTEGER NOT NULL,
+    codigos VARCHAR(255),
+    texto_comprimido BYTEA NOT NULL,
+    vector TSVECTOR,
+    parcial BOOLEAN DEFAULT FALSE
+);
+
 -- Tabla de auditoría/logs
 CREATE TABLE IF NOT EXISTS auditoria (
     id SERIAL PRIMARY KEY,
@@ -74,6 +88,45 @@ CREATE INDEX IF NOT EXISTS idx_documentos_numero ON documentos(numero_escritura)
 CREATE INDEX IF NOT EXISTS idx_auditoria_documento ON auditoria(documento_id);
 CREATE INDEX IF NOT EXISTS idx_auditoria_fecha ON auditoria(fecha);
 
+-- Libro de cada documento (bases creadas antes de estas columnas)
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS anio INTEGER;
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS tipo_libro VARCHAR(1);
+
+-- Rellenar año y tipo de los documentos ya guardados desde ruta_archivo ('2025/PROTOCOLO/')
+UPDATE documentos
+SET anio = split_part(ruta_archivo, '/', 1)::INTEGER
+WHERE anio IS NULL AND ruta_archivo ~ '^[0-9]{4}/';
+
+UPDATE documentos
+SET tipo_libro = CASE split_part(ruta_archivo, '/', 2)
+        WHEN 'PROTOCOLO' THEN 'P'
+        WHEN 'DILIGENCIA' THEN 'D'
+        WHEN 'CERTIFICACIONES' THEN 'C'
+        WHEN 'OTROS' THEN 'O'
+        WHEN 'ARRIENDOS' THEN 'A'
+    END
+WHERE tipo_libro IS NULL
+  AND split_part(ruta_archivo, '/', 2) IN ('PROTOCOLO', 'DILIGENCIA', 'CERTIFICACIONES', 'OTROS', 'ARRIENDOS');
+
+-- Texto diferido: páginas leídas solo en las regiones del código
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS ruta_original VARCHAR(500);
+ALTER TABLE paginas_texto ADD COLUMN IF NOT EXISTS parcial BOOLEAN DEFAULT FALSE;
+
+-- Listados paginados por cursor (fecha_procesamiento, id) de cada usuario
+CREATE INDEX IF NOT EXISTS idx_documentos_usuario_fecha
+    ON documentos(usuario_id, fecha_procesamiento DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documentos_usuario_libro_fecha
+    ON documentos(usuario_id, anio, tipo_libro, fecha_procesamiento DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documentos_usuario_estado_fecha
+    ON documentos(usuario_id, estado, fecha_procesamiento DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documentos_usuario_revision_fecha
+    ON documentos(usuario_id, fecha_procesamiento DESC, id DESC)
+    WHERE requiere_revision;
+
+-- Búsqueda de texto completo por página
+CREATE INDEX IF NOT EXISTS idx_paginas_texto_vector ON paginas_texto USING GIN (vector);
+CREATE INDEX IF NOT EXISTS idx_paginas_texto_documento ON paginas_texto(documento_id, pagina);
+
 -- Trigger para actualizar timestamp
 CREATE OR REPLACE FUNCTION actualizar_timestamp()
 RETURNS TRIGGER AS $$
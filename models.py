@@ -1,7 +1,9 @@
 """
 Modelos de base de datos usando SQLAlchemy
 """
+import zlib
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -45,16 +47,31 @@ class Usuario(db.Model):
 
 class Documento(db.Model):
     __tablename__ = 'documentos'
+    __table_args__ = (
+        # Listados paginados por cursor (fecha_procesamiento, id) de cada usuario
+        db.Index('idx_documentos_usuario_fecha',
+                 'usuario_id', db.desc('fecha_procesamiento'), db.desc('id')),
+        db.Index('idx_documentos_usuario_libro_fecha',
+                 'usuario_id', 'anio', 'tipo_libro', db.desc('fecha_procesamiento'), db.desc('id')),
+        db.Index('idx_documentos_usuario_estado_fecha',
+                 'usuario_id', 'estado', db.desc('fecha_procesamiento'), db.desc('id')),
+        db.Index('idx_documentos_usuario_revision_fecha',
+                 'usuario_id', db.desc('fecha_procesamiento'), db.desc('id'),
+                 postgresql_where=db.text('requiere_revision')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), unique=True, nullable=False)
     nombre_archivo = db.Column(db.String(255), nullable=False)
     ruta_archivo = db.Column(db.String(500))
+    ruta_original = db.Column(db.String(500))  # PDF subido, para completar el texto después
     fecha_procesamiento = db.Column(db.DateTime, default=datetime.utcnow)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
     estado = db.Column(db.String(20), default='procesado')
     tiempo_procesamiento = db.Column(db.Float)
     metodo_ocr = db.Column(db.String(50))
+    anio = db.Column(db.Integer)
+    tipo_libro = db.Column(db.String(1))
     
     # Datos extraídos
     numero_escritura = db.Column(db.String(50))
@@ -76,6 +93,7 @@ class Documento(db.Model):
     
     # Relaciones
     auditorias = db.relationship('Auditoria', backref='documento', lazy=True, cascade='all, delete-orphan')
+    paginas_texto = db.relationship('PaginaTexto', backref='documento', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -86,6 +104,8 @@ class Documento(db.Model):
             'estado': self.estado,
             'tiempo_procesamiento': self.tiempo_procesamiento,
             'metodo_ocr': self.metodo_ocr,
+            'anio': self.anio,
+            'tipo_libro': self.tipo_libro,
             'numero_escritura': self.numero_escritura,
             'fecha_escritura': self.fecha_escritura.isoformat() if self.fecha_escritura else None,
             'tipo_acto': self.tipo_acto,
@@ -99,6 +119,37 @@ class Documento(db.Model):
         }
 
 
+class PaginaTexto(db.Model):
+    """Texto extraído de una página (comprimido con zlib) con su tsvector para búsqueda"""
+    __tablename__ = 'paginas_texto'
+    __table_args__ = (
+        db.Index('idx_paginas_texto_vector', 'vector', postgresql_using='gin'),
+        db.Index('idx_paginas_texto_documento', 'documento_id', 'pagina'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id', ondelete='CASCADE'), nullable=False)
+    pagina = db.Column(db.Integer, nullable=False)
+    codigos = db.Column(db.String(255))  # Escrituras a las que pertenece la página
+    texto_comprimido = db.Column(db.LargeBinary, nullable=False)
+    # to_tsvector('spanish', texto); en SQLite (desarrollo) la búsqueda usa FTS5 y la columna no se llena
+    vector = db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite'))
+    parcial = db.Column(db.Boolean, default=False)  # Solo se leyeron las regiones del código
+    
+    @property
+    def texto(self):
+        return zlib.decompress(self.texto_comprimido).decode('utf-8')
+    
+    def to_dict(self):
+        return {
+            'documento_id': self.documento_id,
+            'pagina': self.pagina,
+            'codigos': self.codigos.split() if self.codigos else [],
+            'texto': self.texto,
+            'parcial': self.parcial
+        }
+
+
 class Auditoria(db.Model):
     __tablename__ = 'auditoria'
     
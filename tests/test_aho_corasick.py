@@ -0,0 +1,60 @@
+"""Pruebas del autómata Aho-Corasick de códigos notariales"""
+
+import random
+
+from utils.aho_corasick import AutomataCodigos
+
+
+def buscar_ingenuo(codigos, texto):
+    """Referencia: todas las apariciones con str.find, ordenadas como el autómata"""
+    encontrados = []
+    for codigo in dict.fromkeys(codigos):
+        inicio = texto.find(codigo)
+        while inicio != -1:
+            encontrados.append((inicio, codigo))
+            inicio = texto.find(codigo, inicio + 1)
+    # El autómata informa al terminar cada coincidencia: primero la que acaba antes
+    return sorted(encontrados, key=lambda e: (e[0] + len(e[1]), -len(e[1])))
+
+
+def test_ejemplo_clasico_con_prefijos_y_sufijos_compartidos():
+    automata = AutomataCodigos(['he', 'she', 'his', 'hers'])
+    assert automata.buscar('ushers') == [(1, 'she'), (2, 'he'), (2, 'hers')]
+
+
+def test_apariciones_solapadas():
+    automata = AutomataCodigos(['aba', 'bab'])
+    assert automata.buscar('ababab') == [(0, 'aba'), (1, 'bab'), (2, 'aba'), (3, 'bab')]
+
+
+def test_codigo_que_es_prefijo_de_otro():
+    automata = AutomataCodigos(['2025P0001', '2025P00012'])
+    assert automata.buscar('x2025P00012x') == [(1, '2025P0001'), (1, '2025P00012')]
+    assert automata.codigos_en('2025P00012 y 2025P0001') == ['2025P0001', '2025P00012']
+
+
+def test_codigos_notariales_con_prefijo_comun():
+    codigos = [f"20251101007P{n:05d}" for n in (1, 2, 10, 11, 100)]
+    texto = "Hoja 20251101007P00010 ... 20251101007P00002\nver 20251101007P00010"
+    automata = AutomataCodigos(codigos)
+    assert automata.codigos_en(texto) == ['20251101007P00010', '20251101007P00002']
+    assert [inicio for inicio, _ in automata.buscar(texto)] == [
+        texto.index('20251101007P00010'),
+        texto.index('20251101007P00002'),
+        texto.rindex('20251101007P00010'),
+    ]
+
+
+def test_duplicados_y_texto_vacio():
+    automata = AutomataCodigos(['abc', 'abc'])
+    assert automata.buscar('abcabc') == [(0, 'abc'), (3, 'abc')]
+    assert automata.buscar('') == []
+    assert AutomataCodigos([]).buscar('abc') == []
+
+
+def test_coincide_con_busqueda_ingenua():
+    rnd = random.Random(2025)
+    for _ in range(200):
+        codigos = [''.join(rnd.choice('ab') for _ in range(rnd.randint(1, 4))) for _ in range(5)]
+        texto = ''.join(rnd.choice('abc') for _ in range(30))
+        assert AutomataCodigos(codigos).buscar(texto) == buscar_ingenuo(codigos, texto)
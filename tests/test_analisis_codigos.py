@@ -0,0 +1,64 @@
+"""Pruebas de deduplicación y detección de faltantes de códigos notariales"""
+
+import random
+
+from utils.analisis_codigos import deduplicar, detectar_faltantes, analizar_secuenciales
+
+PREFIJO = '20251101007P'
+
+
+def codigo(n, prefijo=PREFIJO):
+    return f"{prefijo}{n:05d}"
+
+
+def faltantes_cuadratico(codigos, prefijo):
+    """Implementación anterior (lista y búsqueda lineal por secuencial)"""
+    if not codigos:
+        return []
+    secuenciales = sorted(int(c[-5:]) for c in codigos)
+    return [
+        f"{prefijo}{sec:05d}"
+        for sec in range(secuenciales[0], secuenciales[-1] + 1)
+        if f"{prefijo}{sec:05d}" not in codigos
+    ]
+
+
+def test_deduplicar_conserva_el_primer_orden():
+    codigos = [codigo(3), codigo(1), codigo(3), codigo(2), codigo(1)]
+    assert deduplicar(codigos) == [codigo(3), codigo(1), codigo(2)]
+    assert deduplicar([]) == []
+
+
+def test_detectar_faltantes_en_el_rango():
+    codigos = [codigo(n) for n in (5, 1, 2, 7)]
+    assert detectar_faltantes(codigos, PREFIJO) == [codigo(3), codigo(4), codigo(6)]
+
+
+def test_detectar_faltantes_sin_huecos_ni_codigos():
+    assert detectar_faltantes([codigo(n) for n in range(10, 20)], PREFIJO) == []
+    assert detectar_faltantes([], PREFIJO) == []
+
+
+def test_detectar_faltantes_con_duplicados():
+    codigos = [codigo(1), codigo(1), codigo(3), codigo(3)]
+    assert detectar_faltantes(codigos, PREFIJO) == [codigo(2)]
+
+
+def test_otro_prefijo_no_cuenta_como_presente():
+    # Un código de otro tipo de libro amplía el rango pero no cubre el secuencial
+    codigos = [codigo(1), codigo(2, '20251101007D'), codigo(3)]
+    assert detectar_faltantes(codigos, PREFIJO) == [codigo(2)]
+
+
+def test_detectar_faltantes_igual_que_la_version_anterior():
+    rnd = random.Random(2025)
+    for _ in range(100):
+        prefijos = [PREFIJO, '20251101007D']
+        codigos = [codigo(rnd.randint(1, 60), rnd.choice(prefijos)) for _ in range(rnd.randint(1, 40))]
+        assert detectar_faltantes(codigos, PREFIJO) == faltantes_cuadratico(codigos, PREFIJO)
+
+
+def test_analizar_secuenciales():
+    resultado = analizar_secuenciales([4, 1, 4, 2, 6, 1, 4])
+    assert resultado == {'minimo': 1, 'maximo': 6, 'faltantes': [3, 5], 'duplicados': [1, 4, 4]}
+    assert analizar_secuenciales([]) == {'minimo': None, 'maximo': None, 'faltantes': [], 'duplicados': []}
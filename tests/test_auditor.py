@@ -0,0 +1,46 @@
+"""Pruebas del registro de auditoría en JSON Lines"""
+
+import json
+import time
+
+from utils.auditor import RegistroAuditoria
+
+
+def test_cerrar_escribe_el_lote_en_memoria_del_hilo(tmp_path):
+    # Intervalo largo: el hilo escritor retiene su lote hasta que se cierra el registro
+    registro = RegistroAuditoria(str(tmp_path / 'auditoria.jsonl'), intervalo=0.5)
+    for i in range(50):
+        registro.registrar({'n': i})
+
+    registro.cerrar()
+    assert not registro.hilo.is_alive()
+    assert [e['n'] for e in registro.iterar()] == list(range(50))
+
+    # Después de cerrar se escribe de forma directa
+    registro.registrar({'n': 50})
+    assert registro.ultimos(1) == [{'n': 50}]
+
+
+def test_migrar_json_legado_una_sola_vez(tmp_path):
+    legado = tmp_path / 'auditoria_notarial.json'
+    legado.write_text(json.dumps([{'accion': 'LOGIN'}, {'accion': 'PROCESAMIENTO'}]))
+    registro = RegistroAuditoria(str(tmp_path / 'auditoria.jsonl'))
+
+    assert registro.migrar_json_legado(str(legado)) == 2
+    assert registro.migrar_json_legado(str(legado)) == 0
+    assert [e['accion'] for e in registro.iterar()] == ['LOGIN', 'PROCESAMIENTO']
+
+
+def test_un_lote_no_espera_mas_que_el_intervalo(tmp_path):
+    # Un goteo constante de eventos no debe mantener abierto el lote hasta max_lote
+    registro = RegistroAuditoria(str(tmp_path / 'auditoria.jsonl'), intervalo=0.2, max_lote=500)
+    inicio = time.monotonic()
+    escrito = None
+    while time.monotonic() - inicio < 1.5:
+        registro.registrar({'t': time.monotonic()})
+        if escrito is None and registro.ultimos(1):
+            escrito = time.monotonic() - inicio
+        time.sleep(0.05)
+    registro.cerrar()
+
+    assert escrito is not None and escrito < 0.6
@@ -0,0 +1,94 @@
+"""Pruebas de BusquedaSQLite: índice FTS5 sin contenido y escrituras ligadas a la sesión"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from utils.busqueda_texto import BusquedaSQLite
+
+
+def pagina(numero, texto, codigos='2025PROT00001', parcial=False):
+    return {'pagina': numero, 'codigos': codigos, 'texto': texto, 'parcial': parcial}
+
+
+@pytest.fixture
+def indice():
+    indice = BusquedaSQLite(':memory:')
+    indice.registrar_documento(1, 'libro1.pdf', usuario_id=7)
+    indice.registrar_documento(2, 'libro2.pdf', usuario_id=8)
+    return indice
+
+
+def test_indexar_y_buscar(indice):
+    assert indice.indexar(1, [
+        pagina(1, 'Compraventa otorgada por José Pérez'),
+        pagina(2, 'Poder general a favor de María Gómez')
+    ]) == 2
+    indice.indexar(2, [pagina(1, 'Compraventa de un inmueble')])
+
+    resultados = indice.buscar('compraventa')
+    assert {(r['documento_id'], r['pagina']) for r in resultados} == {(1, 1), (2, 1)}
+
+    # Sin acentos y filtrando por usuario
+    resultados = indice.buscar('jose perez', usuario_id=7)
+    assert [(r['nombre_archivo'], r['pagina']) for r in resultados] == [('libro1.pdf', 1)]
+    assert resultados[0]['codigos'] == ['2025PROT00001']
+    assert 'José Pérez' in resultados[0]['fragmento']
+    assert indice.buscar('compraventa', usuario_id=8)[0]['documento_id'] == 2
+
+
+def test_buscar_no_interpreta_sintaxis_fts(indice):
+    indice.indexar(1, [pagina(1, 'Hipoteca abierta')])
+    # Los operadores se buscan como palabras, sin error de sintaxis
+    assert [r['pagina'] for r in indice.buscar('hipoteca" abierta*')] == [1]
+    assert indice.buscar('hipoteca OR NEAR(') == []
+    assert indice.buscar('***') == []
+
+
+def test_actualizar_borra_el_texto_anterior_del_indice(indice):
+    indice.indexar(1, [pagina(1, '2025PROT00001', parcial=True), pagina(2, 'Donación')])
+    assert indice.paginas_parciales(1) == [1]
+
+    assert indice.actualizar(1, [pagina(1, 'Testamento abierto de Ana Ruiz'), pagina(9, 'no existe')]) == 2
+    assert indice.paginas_parciales(1) == []
+    assert [r['pagina'] for r in indice.buscar('testamento')] == [1]
+    # El texto parcial anterior ya no coincide (borrado 'delete' de la tabla sin contenido)
+    assert indice.buscar('PROT00001') == []
+    assert [r['pagina'] for r in indice.buscar('donacion')] == [2]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    with Session(engine) as session:
+        session.execute(text('CREATE TABLE t (x INTEGER)'))
+        session.commit()
+        yield session
+
+
+def test_en_sesion_aplica_al_confirmar(indice, session):
+    buscador = indice.en_sesion(session)
+    session.execute(text('INSERT INTO t VALUES (1)'))
+    buscador.registrar_documento(3, 'libro3.pdf', usuario_id=7)
+    buscador.indexar(3, [pagina(1, 'Permuta de lotes')])
+    assert indice.buscar('permuta') == []
+
+    session.commit()
+    assert [(r['nombre_archivo'], r['pagina']) for r in indice.buscar('permuta', usuario_id=7)] == [('libro3.pdf', 1)]
+
+
+def test_en_sesion_descarta_al_revertir(indice, session):
+    indice.indexar(1, [pagina(1, 'Sucesión intestada', parcial=True)])
+    buscador = indice.en_sesion(session)
+    session.execute(text('INSERT INTO t VALUES (1)'))
+    buscador.indexar(3, [pagina(1, 'Permuta de lotes')])
+    buscador.actualizar(1, [pagina(1, 'Sucesión testada')])
+    session.rollback()
+
+    # Ni páginas huérfanas ni actualizaciones de una transacción revertida
+    assert indice.buscar('permuta') == []
+    assert indice.paginas_parciales(1) == [1]
+
+    session.execute(text('INSERT INTO t VALUES (2)'))
+    session.commit()
+    assert indice.buscar('permuta') == []
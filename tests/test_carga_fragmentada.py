@@ -0,0 +1,152 @@
+"""Pruebas de GestorCargas: reanudación y fragmentos fuera de orden"""
+
+import io
+import hashlib
+import threading
+
+import pytest
+
+from utils.carga_fragmentada import GestorCargas, ErrorCarga
+
+DATOS = bytes(range(256)) * 40  # 10 KB
+
+
+@pytest.fixture
+def gestor(tmp_path):
+    return GestorCargas(str(tmp_path / '.cargas'), max_fragmento_mb=1)
+
+
+class StreamCortado(io.BytesIO):
+    """Stream que se corta después de n bytes (conexión caída)"""
+
+    def __init__(self, datos, n):
+        super().__init__(datos[:n])
+
+
+def subir(gestor, carga_id, offset, datos):
+    return gestor.escribir_fragmento(carga_id, offset, io.BytesIO(datos), len(datos))
+
+
+def test_carga_completa_calcula_sha256(gestor, tmp_path):
+    carga_id = gestor.iniciar('libro.pdf', len(DATOS))['carga_id']
+    for inicio in range(0, len(DATOS), 4096):
+        estado = subir(gestor, carga_id, inicio, DATOS[inicio:inicio + 4096])
+
+    assert estado['completo']
+    assert estado['sha256'] == hashlib.sha256(DATOS).hexdigest()
+
+    destino = tmp_path / 'uploads' / 'libro.pdf'
+    gestor.finalizar(carga_id, str(destino))
+    assert destino.read_bytes() == DATOS
+    with pytest.raises(ErrorCarga):
+        gestor.estado(carga_id)
+
+
+def test_offset_fuera_de_orden_informa_lo_recibido(gestor):
+    carga_id = gestor.iniciar('libro.pdf', len(DATOS))['carga_id']
+    subir(gestor, carga_id, 0, DATOS[:1000])
+
+    with pytest.raises(ErrorCarga) as adelantado:
+        subir(gestor, carga_id, 3000, DATOS[3000:4000])
+    assert adelantado.value.recibido == 1000
+
+    with pytest.raises(ErrorCarga) as repetido:
+        subir(gestor, carga_id, 0, DATOS[:1000])
+    assert repetido.value.recibido == 1000
+
+    # Nada de lo rechazado llegó al archivo parcial
+    assert gestor.estado(carga_id)['recibido'] == 1000
+
+
+def test_reanudar_tras_fragmento_incompleto(gestor):
+    carga_id = gestor.iniciar('libro.pdf', len(DATOS))['carga_id']
+    subir(gestor, carga_id, 0, DATOS[:4096])
+
+    with pytest.raises(ErrorCarga) as cortado:
+        gestor.escribir_fragmento(carga_id, 4096, StreamCortado(DATOS[4096:], 100), len(DATOS) - 4096)
+    assert cortado.value.recibido == 4096
+    assert gestor.estado(carga_id)['recibido'] == 4096
+
+    estado = subir(gestor, carga_id, 4096, DATOS[4096:])
+    assert estado['completo']
+    assert estado['sha256'] == hashlib.sha256(DATOS).hexdigest()
+
+
+def test_reanudar_en_otro_proceso_rehace_el_hash(gestor, tmp_path):
+    carga_id = gestor.iniciar('libro.pdf', len(DATOS))['carga_id']
+    subir(gestor, carga_id, 0, DATOS[:5000])
+
+    # Otro worker (o un reinicio) no tiene el hash incremental en memoria
+    otro = GestorCargas(gestor.directorio, max_fragmento_mb=1)
+    assert otro.estado(carga_id)['recibido'] == 5000
+    estado = subir(otro, carga_id, 5000, DATOS[5000:])
+    assert estado['sha256'] == hashlib.sha256(DATOS).hexdigest()
+
+
+def test_fragmentos_concurrentes_con_el_mismo_offset(gestor):
+    carga_id = gestor.iniciar('libro.pdf', len(DATOS))['carga_id']
+    aceptados = []
+    rechazados = []
+
+    def enviar():
+        try:
+            aceptados.append(subir(gestor, carga_id, 0, DATOS[:4096]))
+        except ErrorCarga as e:
+            rechazados.append(e.recibido)
+
+    hilos = [threading.Thread(target=enviar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(aceptados) == 1
+    assert rechazados == [4096] * 7
+    assert gestor.estado(carga_id)['recibido'] == 4096
+
+
+def test_identificador_invalido(gestor):
+    with pytest.raises(ErrorCarga):
+        subir(gestor, '../../etc/passwd', 0, b'x')
+    with pytest.raises(ErrorCarga):
+        subir(gestor, 'f' * 32, 0, b'x')
+
+
+def test_estado_de_una_carga_que_se_esta_finalizando(gestor, tmp_path):
+    carga_id = gestor.iniciar('libro.pdf', len(DATOS))['carga_id']
+    subir(gestor, carga_id, 0, DATOS)
+
+    # finalizar() ya movió el parcial pero aún no borró el estado
+    (tmp_path / '.cargas' / f'{carga_id}.part').rename(tmp_path / 'libro.pdf')
+    with pytest.raises(ErrorCarga, match='no encontrada'):
+        gestor.estado(carga_id)
+
+
+def test_ultimo_fragmento_concurrente(gestor, tmp_path):
+    carga_id = gestor.iniciar('libro.pdf', len(DATOS))['carga_id']
+    subir(gestor, carga_id, 0, DATOS[:4096])
+    completos = []
+    rechazados = []
+    inesperados = []
+
+    def enviar(i):
+        # Reintentos del último PUT; el que lo completa finaliza como hace la app
+        try:
+            estado = subir(gestor, carga_id, 4096, DATOS[4096:])
+            if estado['completo']:
+                gestor.finalizar(carga_id, str(tmp_path / 'uploads' / 'libro.pdf'))
+                completos.append(i)
+        except ErrorCarga:
+            rechazados.append(i)
+        except Exception as e:
+            inesperados.append(e)
+
+    hilos = [threading.Thread(target=enviar, args=(i,)) for i in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert inesperados == []
+    assert len(completos) == 1 and len(rechazados) == 7
+    assert (tmp_path / 'uploads' / 'libro.pdf').read_bytes() == DATOS
@@ -0,0 +1,119 @@
+"""Pruebas de ColaTrabajos: reserva atómica y reintento de trabajos interrumpidos"""
+
+import os
+import socket
+import threading
+
+import pytest
+
+from utils.cola_trabajos import (
+    ColaTrabajos, ESTADO_PENDIENTE, ESTADO_PROCESANDO, ESTADO_COMPLETADO, ESTADO_ERROR
+)
+
+# PID que no corresponde a ningún proceso vivo (worker muerto)
+PID_MUERTO = 2 ** 22 + 12345
+
+
+@pytest.fixture
+def cola(tmp_path):
+    return ColaTrabajos(str(tmp_path / 'trabajos.db'), max_intentos=2)
+
+
+def worker_muerto():
+    return f"{socket.gethostname()}:{PID_MUERTO}"
+
+
+def test_reclamar_en_orden_de_llegada(cola):
+    primero = cola.encolar('procesar_pdf', {'n': 1})
+    segundo = cola.encolar('procesar_pdf', {'n': 2})
+
+    trabajo = cola.reclamar('w1')
+    assert trabajo['id'] == primero
+    assert trabajo['estado'] == ESTADO_PROCESANDO
+    assert trabajo['payload'] == {'n': 1}
+    assert cola.obtener(primero)['intentos'] == 1
+
+    assert cola.reclamar('w2')['id'] == segundo
+    assert cola.reclamar('w3') is None
+
+
+def test_cada_trabajo_se_reclama_una_sola_vez(cola):
+    ids = {cola.encolar('procesar_pdf', {'n': i}) for i in range(20)}
+    reclamados = []
+    lock = threading.Lock()
+
+    def consumir(nombre):
+        while True:
+            trabajo = cola.reclamar(nombre)
+            if trabajo is None:
+                return
+            with lock:
+                reclamados.append(trabajo['id'])
+
+    hilos = [threading.Thread(target=consumir, args=(f"w{i}",)) for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(reclamados) == sorted(ids)
+
+
+def test_completar_y_fallar(cola):
+    ok = cola.encolar('procesar_pdf', {})
+    mal = cola.encolar('procesar_pdf', {})
+    cola.reclamar('w')
+    cola.reclamar('w')
+
+    cola.completar(ok, {'success': True})
+    cola.fallar(mal, ValueError('PDF dañado'))
+
+    assert cola.obtener(ok)['estado'] == ESTADO_COMPLETADO
+    assert cola.obtener(ok)['resultado'] == {'success': True}
+    assert cola.obtener(mal)['estado'] == ESTADO_ERROR
+    assert cola.obtener(mal)['error'] == 'PDF dañado'
+
+
+def test_interrumpido_se_reintenta(cola):
+    trabajo_id = cola.encolar('procesar_pdf', {})
+    cola.reclamar(worker_muerto())
+
+    assert cola.recuperar_interrumpidos() == 1
+    assert cola.obtener(trabajo_id)['estado'] == ESTADO_PENDIENTE
+
+    trabajo = cola.reclamar('w')
+    assert trabajo['id'] == trabajo_id
+    assert cola.obtener(trabajo_id)['intentos'] == 2
+
+
+def test_worker_vivo_no_se_recupera(cola):
+    trabajo_id = cola.encolar('procesar_pdf', {})
+    cola.reclamar(f"{socket.gethostname()}:{os.getpid()}")
+
+    assert cola.recuperar_interrumpidos() == 0
+    assert cola.obtener(trabajo_id)['estado'] == ESTADO_PROCESANDO
+
+
+def test_error_al_agotar_intentos(cola):
+    trabajo_id = cola.encolar('procesar_pdf', {})
+    for _ in range(cola.max_intentos):
+        assert cola.reclamar(worker_muerto())['id'] == trabajo_id
+        cola.recuperar_interrumpidos()
+
+    trabajo = cola.obtener(trabajo_id)
+    assert trabajo['estado'] == ESTADO_ERROR
+    assert 'no se reintenta' in trabajo['error']
+    assert cola.reclamar('w') is None
+
+
+def test_pendiente_sin_intentos_no_se_reclama(tmp_path):
+    ruta = str(tmp_path / 'trabajos.db')
+    trabajo_id = ColaTrabajos(ruta, max_intentos=3).encolar('procesar_pdf', {})
+    cola = ColaTrabajos(ruta, max_intentos=3)
+    cola.reclamar(worker_muerto())
+    cola.recuperar_interrumpidos()
+
+    # Otra instancia con un límite menor ya no lo ejecuta
+    estricta = ColaTrabajos(ruta, max_intentos=1)
+    assert estricta.reclamar('w') is None
+    assert estricta.obtener(trabajo_id)['estado'] == ESTADO_ERROR
@@ -0,0 +1,39 @@
+"""Pruebas del mapa de posiciones entre el texto normalizado y el crudo"""
+
+import pytest
+
+from utils.indice_paginas import IndicePaginas
+from utils.normalizacion import normalizar_con_offsets
+
+
+def test_normalizar_con_offsets():
+    texto = 'Escritura 2O25 I1\n007'
+    normalizado, offsets = normalizar_con_offsets(texto)
+
+    assert normalizado == 'Escritura202511007'
+    assert len(offsets) == len(normalizado)
+    # El '2' de 2O25 está en la posición 10 del texto original
+    inicio = normalizado.index('2025')
+    assert texto[offsets[inicio]:offsets[inicio + 3] + 1] == '2O25'
+
+
+def test_ubicar_posiciones_en_las_paginas():
+    indice = IndicePaginas([
+        {'pagina': 0, 'texto': 'Acta 1', 'fuente': 'ocr'},
+        {'pagina': 1, 'texto': '', 'fuente': 'blanco'},
+        {'pagina': 2, 'texto': 'Código 2O25 P\n0001', 'fuente': 'ocr'},
+    ])
+    texto = indice.texto_normalizado()
+
+    posicion = texto.index('2025P0001')
+    assert indice.ubicar(posicion) == (2, 7)
+    assert indice.ubicar(len(texto) - 1) == (2, len('Código 2O25 P\n0001') - 1)
+    assert indice.ubicar(0) == (0, 0)
+
+    # El mapa de cada página se calcula una sola vez
+    mapa = indice._offsets[2]
+    indice.ubicar(posicion + 1)
+    assert indice._offsets[2] is mapa
+
+    with pytest.raises(IndexError):
+        indice.ubicar(len(texto))
@@ -0,0 +1,25 @@
+"""Pruebas del esquema: create_all() debe funcionar en SQLite (desarrollo y pruebas)"""
+
+from flask import Flask
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from models import db, PaginaTexto
+
+
+def test_create_all_en_sqlite():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        tablas = inspect(db.engine).get_table_names()
+
+    assert {'usuarios', 'documentos', 'auditoria', 'paginas_texto'} <= set(tablas)
+
+
+def test_vector_sigue_siendo_tsvector_en_postgres():
+    ddl = str(CreateTable(PaginaTexto.__table__).compile(dialect=postgresql.dialect()))
+    assert 'vector TSVECTOR' in ddl
@@ -0,0 +1,100 @@
+"""Pruebas de los backends de Tesseract (sin ejecutar Tesseract)"""
+
+import threading
+
+import pytest
+
+from utils import motor_tesseract
+
+
+class APIFalsa:
+    """Sustituto de tesserocr.PyTessBaseAPI que registra cómo se usa"""
+
+    creadas = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.finalizada = False
+        APIFalsa.creadas.append(self)
+
+    def End(self):
+        self.finalizada = True
+
+
+@pytest.fixture
+def tesserocr_falso(monkeypatch):
+    APIFalsa.creadas = []
+    monkeypatch.setattr(motor_tesseract, 'tesserocr', type('tesserocr', (), {'PyTessBaseAPI': APIFalsa}))
+    monkeypatch.setattr(motor_tesseract, '_backends', threading.local())
+    monkeypatch.setattr(motor_tesseract, '_abiertos', [])
+    monkeypatch.setenv('OCR_BACKEND', 'tesserocr')
+    return APIFalsa
+
+
+def test_tessdata_explicito(tesserocr_falso, monkeypatch):
+    motor_tesseract.crear_backend('spa', tessdata='/opt/tessdata')
+    monkeypatch.setattr(motor_tesseract, 'TESSDATA', None)
+    motor_tesseract.crear_backend('spa')
+
+    assert [api.kwargs for api in tesserocr_falso.creadas] == [
+        {'path': '/opt/tessdata', 'lang': 'spa'},
+        {'lang': 'spa'}
+    ]
+
+
+def test_cerrar_backends_de_todos_los_hilos(tesserocr_falso):
+    principal = motor_tesseract.obtener_backend('spa')
+    assert motor_tesseract.obtener_backend('spa') is principal
+
+    hilo = threading.Thread(target=motor_tesseract.obtener_backend, args=('spa',))
+    hilo.start()
+    hilo.join()
+    assert len(tesserocr_falso.creadas) == 2
+
+    motor_tesseract.cerrar_backends()
+    assert all(api.finalizada for api in tesserocr_falso.creadas)
+    assert principal.cerrado
+    principal.cerrar()  # Cerrar dos veces no llama a End de nuevo
+
+    # Si el hilo sigue trabajando después, se crea una API nueva
+    assert motor_tesseract.obtener_backend('spa') is not principal
+
+
+CABECERA_TSV = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+
+
+def test_confianza_tsv():
+    palabras = [
+        '5\t1\t1\t1\t1\t1\t10\t10\t50\t20\t90\t2025',
+        '5\t1\t1\t1\t1\t2\t70\t10\t50\t20\t70\tP00001',
+        '4\t1\t1\t1\t1\t0\t10\t10\t110\t20\t-1\t',
+    ]
+    assert motor_tesseract.confianza_tsv('\n'.join([CABECERA_TSV] + palabras)) == 80
+    # Región sin palabras: sin evidencia (no confianza 0)
+    assert motor_tesseract.confianza_tsv(CABECERA_TSV + '\n' + palabras[2]) is None
+    assert motor_tesseract.confianza_tsv('') is None
+
+
+def test_tesserocr_sin_texto_no_informa_confianza(tesserocr_falso):
+    class APIConTexto(APIFalsa):
+        texto = ''
+
+        def SetPageSegMode(self, psm):
+            pass
+
+        def SetImageBytes(self, *args):
+            pass
+
+        def GetUTF8Text(self):
+            return self.texto
+
+        def MeanTextConf(self):
+            return 0
+
+    motor_tesseract.tesserocr.PyTessBaseAPI = APIConTexto
+    backend = motor_tesseract.crear_backend('spa')
+    pix = type('Pixmap', (), {'samples': b'', 'width': 0, 'height': 0, 'n': 1, 'stride': 0})()
+
+    assert backend.reconocer(pix) == ('', None)
+    APIConTexto.texto = '2025\n'
+    assert backend.reconocer(pix) == ('2025\n', 0.0)
@@ -0,0 +1,88 @@
+"""Pruebas de ProcesadorOCR.construir_indice_codigos con detección por regiones"""
+
+import pytest
+
+from utils.ocr_processor import ProcesadorOCR
+
+PREFIJO = '20251101007P'
+
+
+@pytest.fixture
+def procesador(monkeypatch):
+    monkeypatch.setenv('OCR_CACHE_DIR', '')
+    monkeypatch.setenv('OCR_DETECCION', 'regiones')
+    return ProcesadorOCR(workers=1)
+
+
+def simular_ocr(monkeypatch, procesador, regiones, completas):
+    """regiones: página → texto de las franjas (None: en blanco); completas: texto que la página entera agrega"""
+    pedidas = []
+
+    def extraer_paginas(pdf_path, paginas=None, modo=None):
+        return [
+            {'pagina': n, 'texto': texto or '', 'fuente': 'blanco' if texto is None else 'ocr_regiones'}
+            for n, texto in regiones.items()
+        ]
+
+    def completar_texto(pdf_path, paginas, forzar=False):
+        assert forzar
+        pedidas.append(list(paginas))
+        return [
+            {'pagina': n, 'texto': (regiones[n] or '') + ' ' + completas.get(n, ''), 'fuente': 'ocr'}
+            for n in paginas
+        ]
+
+    monkeypatch.setattr(procesador, 'extraer_paginas', extraer_paginas)
+    monkeypatch.setattr(procesador, 'completar_texto', completar_texto)
+    return pedidas
+
+
+def test_repite_ocr_completo_entre_los_vecinos_de_un_faltante(procesador, monkeypatch):
+    regiones = {
+        0: f'{PREFIJO}00001', 1: '', 2: '', 3: '', 4: f'{PREFIJO}00003', 5: '', 6: f'{PREFIJO}00004'
+    }
+    # El código 00002 está en el cuerpo de la página 2, fuera de las franjas
+    pedidas = simular_ocr(monkeypatch, procesador, regiones, {2: f'Escritura {PREFIJO}00002'})
+
+    indice, codigos = procesador.construir_indice_codigos('libro.pdf', 2025, 'P')
+
+    assert pedidas == [[0, 1, 2, 3, 4]]
+    assert codigos == [f'{PREFIJO}0000{n}' for n in (1, 2, 3, 4)]
+    assert indice.contar_por_fuente() == {'ocr': 5, 'ocr_regiones': 2}
+
+
+def test_sin_faltantes_no_repite_ocr(procesador, monkeypatch):
+    regiones = {0: f'{PREFIJO}00001', 1: '', 2: f'{PREFIJO}00002'}
+    pedidas = simular_ocr(monkeypatch, procesador, regiones, {})
+
+    indice, codigos = procesador.construir_indice_codigos('libro.pdf', 2025, 'P')
+
+    assert pedidas == []
+    assert codigos == [f'{PREFIJO}00001', f'{PREFIJO}00002']
+    assert indice.contar_por_fuente() == {'ocr_regiones': 3}
+
+
+def test_repite_ocr_en_paginas_en_blanco_junto_a_un_faltante(procesador, monkeypatch):
+    # La hoja con el código 00002 se descartó como en blanco (solo tiene el sello)
+    regiones = {0: f'{PREFIJO}00001', 1: None, 2: f'{PREFIJO}00003', 3: None}
+    pedidas = simular_ocr(monkeypatch, procesador, regiones, {1: f'{PREFIJO}00002'})
+
+    indice, codigos = procesador.construir_indice_codigos('libro.pdf', 2025, 'P')
+
+    assert pedidas == [[0, 1, 2]]
+    assert codigos == [f'{PREFIJO}0000{n}' for n in (1, 2, 3)]
+    assert indice.paginas_en_blanco() == [3]
+
+
+def test_codigo_partido_entre_dos_paginas(procesador, monkeypatch):
+    # El OCR de las franjas dejó el código 00003 repartido entre el pie y el encabezado
+    regiones = {
+        0: f'{PREFIJO}00001', 1: '', 2: PREFIJO, 3: '00003', 4: '', 5: f'{PREFIJO}00004'
+    }
+    pedidas = simular_ocr(monkeypatch, procesador, regiones, {1: f'{PREFIJO}00002'})
+
+    indice, codigos = procesador.construir_indice_codigos('libro.pdf', 2025, 'P')
+
+    # El vecino siguiente del faltante es la página donde empieza el código partido
+    assert pedidas == [[0, 1, 2]]
+    assert codigos == [f'{PREFIJO}0000{n}' for n in (1, 2, 3, 4)]
@@ -0,0 +1,63 @@
+"""Pruebas del detector de páginas en blanco sobre páginas generadas con PyMuPDF"""
+
+import fitz
+import pytest
+
+from utils.paginas_blanco import DetectorPaginasBlanco
+
+# Encabezado y pie, como el OCR_REGIONES por defecto
+REGIONES = [(0, 0, 1, 0.18), (0, 0.82, 1, 1)]
+
+
+@pytest.fixture
+def documento():
+    documento = fitz.open()
+    yield documento
+    documento.close()
+
+
+@pytest.fixture
+def detector():
+    return DetectorPaginasBlanco(umbral_tinta=0.002, nivel_tinta=160, max_desviacion=12)
+
+
+def test_pagina_vacia(documento, detector):
+    blanco, metricas = detector.es_blanco(documento.new_page(), regiones=REGIONES)
+    assert blanco
+    assert metricas['tinta'] == 0 and metricas['tinta_regiones'] == 0
+
+
+def test_codigo_sellado_en_hoja_casi_vacia(documento, detector):
+    page = documento.new_page()
+    page.insert_text((420, 70), '20251101007P00042', fontsize=9)
+
+    # Para la página entera es poca tinta; para su franja no
+    blanco, metricas = detector.es_blanco(page)
+    assert blanco and metricas['tinta'] < detector.umbral_tinta
+    blanco, metricas = detector.es_blanco(page, regiones=REGIONES)
+    assert not blanco and metricas['tinta_regiones'] >= detector.umbral_tinta
+
+
+def test_texto_tenue_no_es_blanco(documento, detector):
+    page = documento.new_page()
+    # Renglones grises más claros que el nivel de tinta
+    for y in range(120, 720, 24):
+        page.draw_rect(fitz.Rect(80, y, 520, y + 12), color=None, fill=(0.75, 0.75, 0.75))
+
+    blanco, metricas = detector.es_blanco(page)
+    assert metricas['tinta'] == 0
+    assert metricas['desviacion'] >= detector.max_desviacion
+    assert not blanco
+
+    # Sin límite de desviación solo cuenta la tinta
+    assert DetectorPaginasBlanco(max_desviacion=None).es_blanco(page)[0]
+
+
+def test_codigo_dentro_del_margen_de_la_pagina(documento, detector):
+    page = documento.new_page()
+    # Sello en el 3% superior, dentro del margen que se ignora para la página
+    page.insert_text((420, 20), '20251101007P00042', fontsize=9)
+
+    blanco, metricas = detector.es_blanco(page, regiones=REGIONES)
+    assert metricas['tinta'] == 0
+    assert not blanco
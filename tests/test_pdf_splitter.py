@@ -0,0 +1,94 @@
+"""Pruebas de PDFSplitter.redividir: reescritura incremental y todo o nada"""
+
+import os
+
+import fitz
+import pytest
+
+from utils.pdf_splitter import PDFSplitter
+
+
+@pytest.fixture
+def libro(tmp_path):
+    """PDF de 6 páginas dividido en 2025PROT00001 (0-2) y 2025PROT00003 (3-5)"""
+    ruta = str(tmp_path / 'libro.pdf')
+    documento = fitz.open()
+    for _ in range(6):
+        documento.new_page()
+    documento.save(ruta)
+    documento.close()
+
+    splitter = PDFSplitter(workers=1)
+    salida = str(tmp_path / 'processed')
+    splitter.redividir(ruta, [], [('2025PROT00001', 0), ('2025PROT00003', 3)], 2025, 'P', salida)
+    return ruta, salida, splitter.rangos
+
+
+def contenido(carpeta):
+    return {
+        nombre: os.path.getsize(os.path.join(carpeta, nombre))
+        for nombre in os.listdir(carpeta)
+    }
+
+
+def paginas(ruta):
+    with fitz.open(ruta) as documento:
+        return len(documento)
+
+
+def test_redividir_reescribe_solo_lo_que_cambia(libro):
+    ruta, salida, rangos = libro
+    splitter = PDFSplitter(workers=1)
+    archivos, reescritos, eliminados = splitter.redividir(
+        ruta, rangos, [('2025PROT00002', 2)], 2025, 'P', salida
+    )
+
+    carpeta = os.path.dirname(archivos[0])
+    assert [os.path.basename(a) for a in archivos] == ['2025PROT00001.pdf', '2025PROT00002.pdf', '2025PROT00003.pdf']
+    assert sorted(os.path.basename(a) for a in reescritos) == ['2025PROT00001.pdf', '2025PROT00002.pdf']
+    assert eliminados == []
+    assert paginas(archivos[0]) == 2 and paginas(archivos[1]) == 1 and paginas(archivos[2]) == 3
+    # Sin restos de la carpeta de preparación
+    assert sorted(os.listdir(carpeta)) == ['2025PROT00001.pdf', '2025PROT00002.pdf', '2025PROT00003.pdf']
+
+
+def test_redividir_no_publica_nada_si_falla_la_escritura(libro, monkeypatch):
+    ruta, salida, rangos = libro
+    carpeta = os.path.join(salida, '2025', 'PROTOCOLO')
+    antes = contenido(carpeta)
+
+    splitter = PDFSplitter(workers=1)
+    original = splitter._escribir_rangos
+
+    def escribir_y_fallar(pdf_path, rangos, output_dir):
+        # Alcanza a escribir el primer rango y falla en el segundo
+        original(pdf_path, rangos[:1], output_dir)
+        raise RuntimeError('disco lleno')
+
+    monkeypatch.setattr(splitter, '_escribir_rangos', escribir_y_fallar)
+    with pytest.raises(RuntimeError):
+        splitter.redividir(ruta, rangos, [('2025PROT00002', 2)], 2025, 'P', salida)
+
+    assert contenido(carpeta) == antes
+    assert paginas(os.path.join(carpeta, '2025PROT00001.pdf')) == 3
+
+
+def test_publicar_restaura_si_falla_un_renombre(libro, monkeypatch):
+    ruta, salida, rangos = libro
+    carpeta = os.path.join(salida, '2025', 'PROTOCOLO')
+    antes = contenido(carpeta)
+
+    reemplazar = os.replace
+
+    def replace_que_falla(origen, destino):
+        # Falla al publicar el segundo archivo preparado
+        if os.path.basename(destino) == '2025PROT00002.pdf' and '.redivision_' not in destino:
+            raise OSError('renombre fallido')
+        return reemplazar(origen, destino)
+
+    monkeypatch.setattr(os, 'replace', replace_que_falla)
+    with pytest.raises(OSError):
+        PDFSplitter(workers=1).redividir(ruta, rangos, [('2025PROT00002', 2)], 2025, 'P', salida)
+
+    assert contenido(carpeta) == antes
+    assert paginas(os.path.join(carpeta, '2025PROT00001.pdf')) == 3
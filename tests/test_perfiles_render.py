@@ -0,0 +1,42 @@
+"""Pruebas del escalado de DPI por baja confianza"""
+
+import pytest
+
+from utils import perfiles_render
+from utils.perfiles_render import escalar
+
+
+@pytest.fixture
+def renderizados(monkeypatch):
+    """Etapas renderizadas durante el escalado (sin PyMuPDF)"""
+    etapas = []
+    monkeypatch.setattr(perfiles_render, 'renderizar', lambda page, etapa, clip=None: etapas.append(etapa) or etapa)
+    return etapas
+
+
+def test_texto_escala_hasta_el_ultimo_perfil(renderizados):
+    confianzas = {'escalado': 55}
+    resultado = escalar(None, 'texto', 'a', 20, lambda etapa: (etapa, confianzas[etapa]))
+
+    assert renderizados == ['escalado']
+    assert resultado == ('escalado', 55, 'escalado')
+
+
+def test_codigos_escala_una_sola_vez(renderizados):
+    resultado = escalar(None, 'codigos', '2025', 10, lambda etapa: (etapa, 30))
+
+    # Sin el límite seguiría a 'escalado' (la confianza sigue baja)
+    assert renderizados == ['texto']
+    assert resultado == ('texto', 30, 'texto')
+
+
+def test_sin_palabras_no_escala(renderizados):
+    assert escalar(None, 'codigos', '', None, lambda etapa: ('', None)) == ('', None, 'codigos')
+    assert renderizados == []
+
+
+def test_conserva_el_mejor_resultado(renderizados):
+    resultado = escalar(None, 'codigos', '2025', 40, lambda etapa: ('', None))
+
+    assert renderizados == ['texto']
+    assert resultado == ('2025', 40, 'codigos')
@@ -0,0 +1,61 @@
+"""Pruebas del historial de escaneos: agregados, instantánea y compactación del log"""
+
+import os
+
+from utils.scan_history import ScanHistory
+
+
+def nuevo(tmp_path, **kwargs):
+    return ScanHistory(str(tmp_path / 'scan_history.jsonl'), legacy_file=None, **kwargs)
+
+
+def test_agregados_sobreviven_al_reinicio(tmp_path):
+    historial = nuevo(tmp_path)
+    for i in range(5):
+        historial.add_scan(f"scan_{i}.pdf", pages=2, size_mb=1.5)
+
+    reabierto = nuevo(tmp_path)
+    assert reabierto.get_stats()['total_scans'] == 5
+    assert reabierto.get_stats()['total_pages'] == 10
+    assert reabierto.add_scan('scan_5.pdf') == 6
+
+
+def test_compacta_cada_n_escaneos(tmp_path):
+    historial = nuevo(tmp_path, compact_every=4)
+    for i in range(10):
+        historial.add_scan(f"scan_{i}.pdf", pages=1)
+
+    assert [n for n, _ in historial._segments()] == [1, 2]
+    with open(historial.history_file) as f:
+        assert len(f.readlines()) == 2
+
+    reabierto = nuevo(tmp_path, compact_every=4)
+    assert reabierto.get_stats()['total_scans'] == 10
+    assert [e['id'] for e in reabierto.iter_history()] == list(range(1, 11))
+    assert [e['id'] for e in reabierto.get_recent(3)] == [10, 9, 8]
+
+
+def test_corte_entre_archivar_y_guardar_la_instantanea(tmp_path):
+    historial = nuevo(tmp_path, compact_every=100)
+    for i in range(3):
+        historial.add_scan(f"scan_{i}.pdf", pages=1)
+    historial.compact()
+    historial.add_scan('scan_3.pdf', pages=1)
+
+    # Se archivó el log pero la instantánea sigue apuntando a su posición anterior
+    os.replace(historial.history_file, f"{historial.history_file}.00001")
+
+    reabierto = nuevo(tmp_path, compact_every=100)
+    assert reabierto.get_stats()['total_scans'] == 4
+    assert reabierto.segment == 1
+
+
+def test_sin_instantanea_reconstruye_desde_los_segmentos(tmp_path):
+    historial = nuevo(tmp_path, compact_every=3)
+    for i in range(7):
+        historial.add_scan(f"scan_{i}.pdf", pages=1)
+    os.unlink(historial.snapshot_file)
+
+    reabierto = nuevo(tmp_path, compact_every=3)
+    assert reabierto.get_stats()['total_scans'] == 7
+    assert reabierto.add_scan('scan_7.pdf') == 8
@@ -0,0 +1,89 @@
+"""Pruebas de ScannerMonitor: detección y consumo de la cola por lotes"""
+
+import os
+import time
+
+import pytest
+
+from utils.scanner_monitor import ScannerMonitor
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    ruta = tmp_path / 'scanned'
+    ruta.mkdir()
+    return ruta
+
+
+def crear_pdf(carpeta, nombre, mtime):
+    ruta = carpeta / nombre
+    ruta.write_bytes(b'%PDF-1.4 prueba')
+    os.utime(ruta, (mtime, mtime))
+    return str(ruta)
+
+
+def esperar(condicion, limite=5.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class ProcesadorFalso:
+    """Falla el archivo 'malo.pdf' y lanza una excepción en el primer lote"""
+
+    def __init__(self):
+        self.llamadas = []
+
+    def procesar_lote(self, archivos, año, tipo):
+        self.llamadas.append(list(archivos))
+        if len(self.llamadas) == 1:
+            raise RuntimeError('OCR no disponible')
+        return [
+            {'archivo': a, 'estado': 'error' if a.endswith('malo.pdf') else 'listo'}
+            for a in archivos
+        ]
+
+
+def test_detectar_archivos_nuevos_sin_esperar_estabilidad(carpeta):
+    segundo = crear_pdf(carpeta, 'b.pdf', 2000)
+    primero = crear_pdf(carpeta, 'a.pdf', 1000)
+    (carpeta / 'nota.txt').write_text('x')
+
+    monitor = ScannerMonitor(str(carpeta), segundos_estables=60)
+    assert monitor.detectar_archivos_nuevos() == [primero, segundo]
+
+    monitor.marcar_como_procesado(primero)
+    assert monitor.detectar_archivos_nuevos() == [segundo]
+    assert ScannerMonitor(str(carpeta)).detectar_archivos_nuevos() == [segundo]
+
+
+def test_solo_se_marcan_los_procesados_sin_error(carpeta):
+    bueno = crear_pdf(carpeta, 'bueno.pdf', 1000)
+    malo = crear_pdf(carpeta, 'malo.pdf', 2000)
+
+    monitor = ScannerMonitor(str(carpeta), segundos_estables=0.05, intervalo=0.05)
+    procesador = ProcesadorFalso()
+    resultados = monitor.iniciar_procesamiento(procesador, '2025', 'P')
+    monitor.iniciar()
+    try:
+        # El primer lote falla entero y se reintenta; en el segundo 'malo.pdf' da error
+        assert esperar(lambda: {r['archivo'] for r in resultados} == {bueno, malo})
+        time.sleep(0.3)
+    finally:
+        monitor.detener()
+
+    assert len(procesador.llamadas) >= 2
+    assert len(resultados) == 2
+    assert monitor.processed_files == {bueno}
+    assert malo in monitor.fallidos
+    assert not monitor.encolados
+
+    # El fallido no vuelve a entrar hasta que el archivo cambia
+    monitor.observar(malo)
+    assert malo not in monitor.pendientes
+    os.utime(malo, (3000, 3000))
+    monitor.observar(malo)
+    assert malo in monitor.pendientes
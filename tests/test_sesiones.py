@@ -0,0 +1,50 @@
+"""Pruebas de AlmacenSesiones: expiración y ciclos leer-modificar-guardar concurrentes"""
+
+import uuid
+import threading
+
+import pytest
+
+from utils.sesiones import AlmacenSesiones
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenSesiones(str(tmp_path / 'sesiones'), ttl_segundos=3600, max_sesiones=10)
+
+
+def test_guardar_obtener_y_eliminar(almacen):
+    session_id = str(uuid.uuid4())
+    almacen.guardar(session_id, {'codigos': ['a']})
+    assert almacen.obtener(session_id) == {'codigos': ['a']}
+    assert session_id in almacen
+
+    almacen.eliminar(session_id)
+    assert almacen.obtener(session_id) is None
+    assert almacen.obtener('../../etc/passwd') is None
+
+
+def test_expulsa_las_menos_usadas(almacen):
+    ids = [str(uuid.uuid4()) for _ in range(12)]
+    for session_id in ids:
+        almacen.guardar(session_id, {})
+    assert sum(session_id in almacen for session_id in ids) == 10
+
+
+def test_bloquear_no_pierde_actualizaciones(almacen):
+    session_id = str(uuid.uuid4())
+    almacen.guardar(session_id, {'manuales': []})
+
+    def agregar(n):
+        with almacen.bloquear(session_id):
+            datos = almacen.obtener(session_id)
+            datos['manuales'].append(n)
+            almacen.guardar(session_id, datos)
+
+    hilos = [threading.Thread(target=agregar, args=(n,)) for n in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(almacen.obtener(session_id)['manuales']) == list(range(20))
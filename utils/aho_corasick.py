@@ -0,0 +1,75 @@
+"""
+Autómata Aho-Corasick para Códigos Notariales
+Se construye una vez con la lista de códigos y encuentra todos los que
+aparecen en un texto con un único recorrido lineal
+"""
+
+from collections import deque
+
+
+class AutomataCodigos:
+    """Buscador de múltiples códigos en una sola pasada"""
+
+    def __init__(self, codigos):
+        # Cada nodo: transiciones, enlace de fallo y códigos que terminan en él
+        self.transiciones = [{}]
+        self.fallo = [0]
+        self.salidas = [[]]
+
+        for codigo in dict.fromkeys(codigos):
+            self._agregar(codigo)
+        self._construir_fallos()
+
+    def _agregar(self, codigo):
+        nodo = 0
+        for caracter in codigo:
+            siguiente = self.transiciones[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(self.transiciones)
+                self.transiciones.append({})
+                self.fallo.append(0)
+                self.salidas.append([])
+                self.transiciones[nodo][caracter] = siguiente
+            nodo = siguiente
+        self.salidas[nodo].append(codigo)
+
+    def _construir_fallos(self):
+        """Calcula los enlaces de fallo por niveles (BFS)"""
+        cola = deque(self.transiciones[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for caracter, hijo in self.transiciones[nodo].items():
+                cola.append(hijo)
+                f = self.fallo[nodo]
+                while f and caracter not in self.transiciones[f]:
+                    f = self.fallo[f]
+                destino = self.transiciones[f].get(caracter, 0)
+                self.fallo[hijo] = destino if destino != hijo else 0
+                # Heredar las salidas del sufijo más largo
+                self.salidas[hijo] = self.salidas[hijo] + self.salidas[self.fallo[hijo]]
+
+    def buscar(self, texto):
+        """
+        Recorre el texto una vez
+
+        Returns:
+            Lista de (posición inicial, código) en orden de aparición
+        """
+        encontrados = []
+        transiciones = self.transiciones
+        fallo = self.fallo
+        salidas = self.salidas
+        nodo = 0
+
+        for i, caracter in enumerate(texto):
+            while nodo and caracter not in transiciones[nodo]:
+                nodo = fallo[nodo]
+            nodo = transiciones[nodo].get(caracter, 0)
+            for codigo in salidas[nodo]:
+                encontrados.append((i - len(codigo) + 1, codigo))
+
+        return encontrados
+
+    def codigos_en(self, texto):
+        """Códigos distintos presentes en el texto, en orden de aparición"""
+        return list(dict.fromkeys(codigo for _, codigo in self.buscar(texto)))
@@ -0,0 +1,69 @@
+"""
+Análisis de Códigos Notariales
+Deduplicación y detección de faltantes/duplicados en tiempo lineal usando
+conjuntos y mapas de bits sobre el rango de secuenciales
+"""
+
+
+def secuencial(codigo):
+    """Secuencial de un código (últimos 5 dígitos)"""
+    return int(codigo[-5:])
+
+
+def deduplicar(codigos):
+    """Elimina duplicados manteniendo el orden de aparición"""
+    return list(dict.fromkeys(codigos))
+
+
+def analizar_secuenciales(secuenciales):
+    """
+    Analiza una lista de secuenciales con un mapa de conteos sobre [mínimo, máximo]
+
+    Returns:
+        dict con 'minimo', 'maximo', 'faltantes' y 'duplicados' (listas ordenadas
+        de enteros; un duplicado aparece una vez por cada repetición extra)
+    """
+    if not secuenciales:
+        return {'minimo': None, 'maximo': None, 'faltantes': [], 'duplicados': []}
+
+    minimo = min(secuenciales)
+    maximo = max(secuenciales)
+
+    # Un byte por secuencial del rango (hasta 100k → 100 KB)
+    conteos = bytearray(maximo - minimo + 1)
+    duplicados = []
+    for sec in secuenciales:
+        i = sec - minimo
+        if conteos[i]:
+            duplicados.append(sec)
+        else:
+            conteos[i] = 1
+
+    faltantes = [minimo + i for i, visto in enumerate(conteos) if not visto]
+    duplicados.sort()
+
+    return {'minimo': minimo, 'maximo': maximo, 'faltantes': faltantes, 'duplicados': duplicados}
+
+
+def detectar_faltantes(codigos, prefijo):
+    """
+    Códigos esperados con el prefijo dado que no aparecen en la lista
+
+    Args:
+        codigos: Códigos encontrados
+        prefijo: Año + código de notaría + tipo (p. ej. '20251101007P')
+    """
+    if not codigos:
+        return []
+
+    secuenciales = [secuencial(c) for c in codigos]
+    minimo = min(secuenciales)
+    maximo = max(secuenciales)
+
+    # Mapa de bits del rango: marcar los secuenciales presentes con este prefijo
+    presentes = bytearray(maximo - minimo + 1)
+    for codigo, sec in zip(codigos, secuenciales):
+        if codigo.startswith(prefijo):
+            presentes[sec - minimo] = 1
+
+    return [f"{prefijo}{minimo + i:05d}" for i, visto in enumerate(presentes) if not visto]
@@ -1,10 +1,273 @@
 import json
 from datetime import datetime
 import os
+import queue
+import time
+import atexit
+import threading
+from itertools import islice
+
+try:
+    import fcntl  # Bloqueo entre procesos (solo POSIX)
+except ImportError:
+    fcntl = None
+
+
+class RegistroAuditoria:
+    """
+    Registro de auditoría en JSON Lines, solo de anexado
+
+    Los eventos se encolan en memoria y un hilo en segundo plano los escribe
+    por lotes con una sola escritura O_APPEND; el archivo rota por tamaño
+    (archivo.1, archivo.2, ... el número mayor es el más antiguo)
+    """
+
+    def __init__(self, ruta='auditoria_notarial.jsonl', max_mb=10, max_archivos=5,
+                 intervalo=1.0, max_lote=500):
+        """
+        Args:
+            ruta: Archivo activo del registro
+            max_mb: Tamaño a partir del cual se rota
+            max_archivos: Archivos rotados que se conservan
+            intervalo: Segundos máximos que un evento espera en memoria
+            max_lote: Eventos por escritura
+        """
+        self.ruta = ruta
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_archivos = max_archivos
+        self.intervalo = intervalo
+        self.max_lote = max_lote
+
+        self.cola = queue.Queue()
+        self.lock = threading.Lock()
+        self.hilo = None
+        self.detenido = threading.Event()
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def registrar(self, entrada):
+        """Encola un evento (no bloquea en disco)"""
+        if self.detenido.is_set():
+            # Ya se cerró el registro (p. ej. durante la salida): escribir directamente
+            self._escribir_lote([entrada])
+            return
+        self.cola.put(entrada)
+        self._iniciar()
+
+    def _iniciar(self):
+        if self.hilo is not None and self.hilo.is_alive():
+            return
+        with self.lock:
+            if self.hilo is None or not self.hilo.is_alive():
+                self.hilo = threading.Thread(target=self._bucle, name='auditoria', daemon=True)
+                self.hilo.start()
+
+    def _bucle(self):
+        while not self.detenido.is_set():
+            try:
+                lote = [self.cola.get(timeout=self.intervalo)]
+            except queue.Empty:
+                continue
+            # Agrupar lo que llegue hasta un intervalo después del primer evento
+            limite = time.monotonic() + self.intervalo
+            try:
+                while len(lote) < self.max_lote:
+                    lote.append(self.cola.get(timeout=max(0, limite - time.monotonic())))
+            except queue.Empty:
+                pass
+            self._escribir_lote(lote)
+
+    def cerrar(self, timeout=10.0):
+        """
+        Detiene el hilo escritor y escribe todo lo pendiente (al cerrar la aplicación)
+
+        Primero se espera al hilo para que termine de escribir el lote que tiene
+        en memoria, y después se vacía lo que quede en la cola.
+        """
+        self.detenido.set()
+        hilo = self.hilo
+        if hilo is not None and hilo.is_alive():
+            hilo.join(timeout)
+        self.vaciar()
+
+    def vaciar(self):
+        """Escribe de inmediato los eventos que siguen en la cola"""
+        lote = []
+        while True:
+            try:
+                lote.append(self.cola.get_nowait())
+            except queue.Empty:
+                break
+        if lote:
+            self._escribir_lote(lote)
+
+    def _escribir_lote(self, lote):
+        try:
+            with self.lock, _BloqueoArchivo(self.ruta + '.lock'):
+                self._anexar(lote)
+        except OSError as e:
+            print(f"⚠️  No se pudo escribir la auditoría ({len(lote)} eventos): {e}")
+
+    def _anexar(self, lote):
+        """Anexa un lote con una sola escritura (requiere tener el bloqueo)"""
+        datos = "".join(
+            json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in lote
+        ).encode('utf-8')
+
+        self._rotar_si_necesario(len(datos))
+        fd = os.open(self.ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, datos)
+        finally:
+            os.close(fd)
+
+    def _rotar_si_necesario(self, tamaño_nuevo):
+        try:
+            tamaño = os.path.getsize(self.ruta)
+        except FileNotFoundError:
+            return
+        if tamaño == 0 or tamaño + tamaño_nuevo <= self.max_bytes:
+            return
+
+        # archivo.(n-1) → archivo.n, ..., archivo → archivo.1
+        for n in range(self.max_archivos - 1, 0, -1):
+            origen = f"{self.ruta}.{n}"
+            if os.path.exists(origen):
+                os.replace(origen, f"{self.ruta}.{n + 1}")
+        if self.max_archivos > 0:
+            os.replace(self.ruta, f"{self.ruta}.1")
+        else:
+            os.unlink(self.ruta)
+
+    def migrar_json_legado(self, ruta_json):
+        """Convierte el antiguo arreglo JSON a líneas (una sola vez) y lo renombra"""
+        if not os.path.exists(ruta_json):
+            return 0
+
+        # Varios workers pueden arrancar a la vez: solo migra el primero
+        with self.lock, _BloqueoArchivo(self.ruta + '.lock'):
+            if not os.path.exists(ruta_json):
+                return 0
+            try:
+                with open(ruta_json, 'r') as f:
+                    entradas = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                return 0
+            if not isinstance(entradas, list):
+                return 0
+
+            if entradas:
+                self._anexar(entradas)
+            os.replace(ruta_json, ruta_json + '.migrado')
+        return len(entradas)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def _archivos(self):
+        """Archivos del registro, del más reciente al más antiguo"""
+        rutas = [self.ruta] + [f"{self.ruta}.{n}" for n in range(1, self.max_archivos + 1)]
+        return [r for r in rutas if os.path.exists(r)]
+
+    def iterar(self):
+        """Eventos del más antiguo al más reciente, línea a línea"""
+        for ruta in reversed(self._archivos()):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    for linea in f:
+                        entrada = _decodificar(linea)
+                        if entrada is not None:
+                            yield entrada
+            except FileNotFoundError:
+                continue
+
+    def iterar_recientes(self, tamaño_bloque=64 * 1024):
+        """Eventos del más reciente al más antiguo, leyendo los archivos desde el final"""
+        for ruta in self._archivos():
+            try:
+                for linea in _lineas_inversas(ruta, tamaño_bloque):
+                    entrada = _decodificar(linea)
+                    if entrada is not None:
+                        yield entrada
+            except FileNotFoundError:
+                continue
+
+    def ultimos(self, n=100):
+        """Últimos n eventos, el más reciente primero"""
+        return list(islice(self.iterar_recientes(), n))
+
+    def pagina(self, numero=1, por_pagina=50):
+        """Página de la historia (1 = la más reciente)"""
+        inicio = (max(1, numero) - 1) * por_pagina
+        return list(islice(self.iterar_recientes(), inicio, inicio + por_pagina))
+
+
+class _BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos sobre un archivo auxiliar"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+def _decodificar(linea):
+    linea = linea.strip()
+    if not linea:
+        return None
+    try:
+        return json.loads(linea)
+    except json.JSONDecodeError:
+        return None  # Línea truncada por un corte
+
+
+def _lineas_inversas(ruta, tamaño_bloque):
+    """Líneas de un archivo desde la última a la primera, sin cargarlo completo"""
+    with open(ruta, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        posicion = f.tell()
+        resto = b''
+        while posicion > 0:
+            leer = min(tamaño_bloque, posicion)
+            posicion -= leer
+            f.seek(posicion)
+            bloque = f.read(leer) + resto
+            lineas = bloque.split(b'\n')
+            # La primera puede estar incompleta: se completa con el siguiente bloque
+            resto = lineas.pop(0)
+            for linea in reversed(lineas):
+                if linea:
+                    yield linea.decode('utf-8', errors='replace')
+        if resto:
+            yield resto.decode('utf-8', errors='replace')
+
 
 class Auditoria:
     LOG_FILE = "auditoria_notarial.json"
-    
+    registro = RegistroAuditoria(
+        os.getenv('AUDITORIA_LOG', 'auditoria_notarial.jsonl'),
+        max_mb=float(os.getenv('AUDITORIA_MAX_MB', 10)),
+        max_archivos=int(os.getenv('AUDITORIA_MAX_ARCHIVOS', 5))
+    )
+
     @staticmethod
     def registrar_acceso(usuario):
         """Registra acceso de usuario"""
@@ -15,7 +278,7 @@ class Auditoria:
             'ip': '127.0.0.1'  # En producción, obtener IP real
         }
         Auditoria._escribir_log(log_entry)
-    
+
     @staticmethod
     def registrar_procesamiento(usuario, archivo, año, tipo, resultado):
         """Registra procesamiento de archivo"""
@@ -32,26 +295,23 @@ class Auditoria:
             'errores': resultado.get('error', None)
         }
         Auditoria._escribir_log(log_entry)
-    
+
+    @staticmethod
+    def ultimos(n=100):
+        """Últimos n eventos, el más reciente primero"""
+        return Auditoria.registro.ultimos(n)
+
+    @staticmethod
+    def pagina(numero=1, por_pagina=50):
+        """Página de la historia de auditoría (1 = la más reciente)"""
+        return Auditoria.registro.pagina(numero, por_pagina)
+
     @staticmethod
     def _escribir_log(entry):
-        """Escribe entrada en el archivo de log"""
-        logs = []
-        
-        # Cargar logs existentes
-        if os.path.exists(Auditoria.LOG_FILE):
-            with open(Auditoria.LOG_FILE, 'r') as f:
-                try:
-                    logs = json.load(f)
-                except:
-                    logs = []
-        
-        # Agregar nueva entrada
-        logs.append(entry)
-        
-        # Guardar (mantener últimos 1000 registros)
-        if len(logs) > 1000:
-            logs = logs[-1000:]
-        
-        with open(Auditoria.LOG_FILE, 'w') as f:
-            json.dump(logs, f, indent=2)
\ No newline at end of file
+        """Encola la entrada; el hilo de auditoría la anexa al registro por lotes"""
+        Auditoria.registro.registrar(entry)
+
+
+# No perder eventos pendientes al salir (el registro antiguo en arreglo JSON se
+# migra con init_database.py)
+atexit.register(Auditoria.registro.cerrar)
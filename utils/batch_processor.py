@@ -9,8 +9,13 @@ from utils.validator import ValidadorNotarial
 class BatchProcessor:
     """Procesador de lotes de documentos escaneados"""
     
-    def __init__(self):
-        self.ocr = ProcesadorOCR()
+    def __init__(self, ocr_workers=None, limitador=None):
+        """
+        Args:
+            ocr_workers: Procesos de OCR por documento (por defecto OCR_WORKERS o todos los núcleos)
+            limitador: Semáforo compartido que acota las páginas en OCR simultáneas (opcional)
+        """
+        self.ocr = ProcesadorOCR(workers=ocr_workers, limitador=limitador)
         self.splitter = PDFSplitter()
         self.validator = ValidadorNotarial()
     
@@ -33,11 +38,8 @@ class BatchProcessor:
             print(f"\n[{i}/{len(archivos)}] Procesando: {os.path.basename(archivo)}")
             
             try:
-                # Extraer texto con método híbrido
-                texto = self.ocr.extraer_texto(archivo)
-                
-                # Buscar códigos notariales
-                codigos = self.ocr.buscar_codigos_notariales(texto, año, tipo)
+                # Índice por página y códigos (OCR solo de las regiones del código)
+                indice, codigos = self.ocr.construir_indice_codigos(archivo, año, tipo)
                 
                 # Validar secuenciales
                 validacion = self.validator.validar_secuenciales(codigos)
@@ -53,7 +55,8 @@ class BatchProcessor:
                     'validacion': validacion,
                     'preview': preview_path,
                     'estado': 'listo',
-                    'caracteres_extraidos': len(texto)
+                    'caracteres_extraidos': sum(len(p['texto']) for p in indice),
+                    'paginas_en_blanco': len(indice.paginas_en_blanco())
                 }
                 
                 print(f"✅ Códigos detectados: {len(codigos)}")
@@ -73,6 +76,37 @@ class BatchProcessor:
         
         return resultados
     
+    def procesar_libro(self, archivo, año, tipo, base_output_dir='escaneo_separado/'):
+        """Procesa un libro completo: índice de texto, códigos, validación y división
+        
+        El índice se construye una sola vez y se reutiliza para dividir, así
+        las páginas escaneadas no se vuelven a pasar por OCR. Para dividir basta
+        con el código, así que solo se leen sus regiones (ver construir_indice_codigos).
+        
+        Returns:
+            Dict con el resumen del libro (códigos, faltantes y archivos generados)
+        """
+        indice, codigos = self.ocr.construir_indice_codigos(archivo, año, tipo)
+        validacion = self.validator.validar_secuenciales(codigos)
+        
+        archivos_generados = []
+        if codigos:
+            archivos_generados = self.dividir_y_guardar(
+                archivo, codigos, año, tipo, base_output_dir, indice=indice
+            )
+        
+        return {
+            'archivo': archivo,
+            'nombre': os.path.basename(archivo),
+            'total_paginas': len(indice),
+            'paginas_por_fuente': indice.contar_por_fuente(),
+            'paginas_en_blanco': len(indice.paginas_en_blanco()),
+            'codigos': codigos,
+            'total_codigos': len(codigos),
+            'faltantes': validacion.get('faltantes', []),
+            'archivos_generados': archivos_generados
+        }
+    
     def generar_preview(self, pdf_path, output_dir='scanned_preview/'):
         """Genera vista previa (miniatura) de la primera página del PDF
         
@@ -112,7 +146,7 @@ class BatchProcessor:
             print(f"⚠️  Error generando preview: {str(e)}")
             return None
     
-    def dividir_y_guardar(self, archivo, codigos, año, tipo, base_output_dir='escaneo_separado/'):
+    def dividir_y_guardar(self, archivo, codigos, año, tipo, base_output_dir='escaneo_separado/', indice=None):
         """Divide PDF por códigos y guarda en carpeta de escaneo separado
         
         Args:
@@ -121,6 +155,7 @@ class BatchProcessor:
             año: Año de los documentos
             tipo: Tipo de libro
             base_output_dir: Directorio base de salida
+            indice: IndicePaginas ya construido (opcional, evita releer el texto)
         
         Returns:
             Lista de archivos generados
@@ -130,14 +165,14 @@ class BatchProcessor:
         
         # Usar el splitter existente
         archivos_generados = self.splitter.dividir_por_codigos(
-            archivo, codigos, año, tipo, base_output_dir
+            archivo, codigos, año, tipo, base_output_dir, indice=indice
         )
         
         print(f"✅ Archivos generados: {len(archivos_generados)}")
         
         return archivos_generados
     
-    def dividir_con_codigos_manuales(self, archivo, codigos, codigos_manuales, año, tipo, base_output_dir='escaneo_separado/'):
+    def dividir_con_codigos_manuales(self, archivo, codigos, codigos_manuales, año, tipo, base_output_dir='escaneo_separado/', indice=None):
         """Divide PDF incluyendo códigos agregados manualmente
         
         Args:
@@ -147,6 +182,7 @@ class BatchProcessor:
             año: Año
             tipo: Tipo de libro
             base_output_dir: Directorio base de salida
+            indice: IndicePaginas ya construido (opcional, evita releer el texto)
         
         Returns:
             Lista de archivos generados
@@ -160,7 +196,7 @@ class BatchProcessor:
         
         # Usar el splitter con códigos manuales
         archivos_generados = self.splitter.dividir_por_codigos_con_manual(
-            archivo, todos_codigos, codigos_manuales, año, tipo, base_output_dir
+            archivo, todos_codigos, codigos_manuales, año, tipo, base_output_dir, indice=indice
         )
         
         print(f"✅ Archivos generados: {len(archivos_generados)}")
@@ -0,0 +1,363 @@
+"""
+Búsqueda de Texto Completo
+Persiste el texto extraído de cada página (comprimido con zlib) y lo indexa
+para encontrar escrituras por su contenido (otorgantes, actos, cédulas...)
+
+- BusquedaPostgres: tsvector con configuración 'spanish' e índice GIN
+- BusquedaSQLite: misma interfaz sobre SQLite FTS5 (desarrollo y pruebas); su
+  conexión es independiente de SQLAlchemy, así que en_sesion() difiere las
+  escrituras hasta que la sesión confirma (un rollback no deja páginas huérfanas)
+
+Las páginas escaneadas que solo se leyeron en las regiones del código quedan
+marcadas como parciales hasta que se completa su texto (actualizar()).
+"""
+
+import re
+import zlib
+import sqlite3
+import threading
+import unicodedata
+
+from sqlalchemy import event, text
+
+NIVEL_COMPRESION = 6
+LARGO_FRAGMENTO = 160
+
+
+def comprimir(texto):
+    return zlib.compress(texto.encode('utf-8'), NIVEL_COMPRESION)
+
+
+def descomprimir(datos):
+    return zlib.decompress(bytes(datos)).decode('utf-8')
+
+
+def paginas_para_indexar(indice, rangos):
+    """
+    Páginas con texto y los códigos de escritura a los que pertenecen
+
+    Args:
+        indice: IndicePaginas del documento
+        rangos: Rangos de PDFSplitter (una página compartida pertenece a dos escrituras)
+
+    Returns:
+        Lista de dicts con 'pagina', 'codigos' (separados por espacio), 'texto' y
+        'parcial' (solo se leyeron las regiones del código; se guardan aunque estén vacías)
+    """
+    codigos_pagina = {}
+    for rango in rangos:
+        for pagina in range(rango['inicio'], rango['fin'] + 1):
+            codigos_pagina.setdefault(pagina, []).append(rango['codigo'])
+
+    return [
+        {
+            'pagina': entrada['pagina'],
+            'codigos': ' '.join(codigos_pagina.get(entrada['pagina'], [])),
+            'texto': entrada['texto'],
+            'parcial': entrada['fuente'] == 'ocr_regiones'
+        }
+        for entrada in indice
+        if entrada['texto'].strip() or entrada['fuente'] == 'ocr_regiones'
+    ]
+
+
+def _sin_acentos(texto):
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', texto.lower()) if unicodedata.category(c) != 'Mn'
+    )
+
+
+def fragmento(texto, consulta, largo=LARGO_FRAGMENTO):
+    """Extracto del texto alrededor del primer término de la consulta"""
+    plano = _sin_acentos(texto)
+    posiciones = [
+        plano.find(termino)
+        for termino in _sin_acentos(consulta).split()
+        if len(termino) > 2 and plano.find(termino) >= 0
+    ]
+    inicio = max(0, min(posiciones) - largo // 3) if posiciones else 0
+    extracto = ' '.join(texto[inicio:inicio + largo].split())
+    return ('…' if inicio > 0 else '') + extracto + ('…' if inicio + largo < len(texto) else '')
+
+
+class BusquedaPostgres:
+    """Índice sobre la tabla paginas_texto (tsvector 'spanish' + GIN)"""
+
+    def __init__(self, session):
+        """
+        Args:
+            session: Sesión de SQLAlchemy (se usa su transacción actual)
+        """
+        self.session = session
+
+    def registrar_documento(self, documento_id, nombre_archivo, usuario_id=None):
+        """En Postgres estos datos vienen de la tabla documentos"""
+
+    def indexar(self, documento_id, paginas):
+        """Guarda el texto comprimido y el tsvector de cada página"""
+        if not paginas:
+            return 0
+        self.session.execute(
+            text(
+                "INSERT INTO paginas_texto (documento_id, pagina, codigos, texto_comprimido, vector, parcial) "
+                "VALUES (:documento_id, :pagina, :codigos, :texto_comprimido, to_tsvector('spanish', :texto), :parcial)"
+            ),
+            [
+                {
+                    'documento_id': documento_id,
+                    'pagina': p['pagina'],
+                    'codigos': p['codigos'],
+                    'texto_comprimido': comprimir(p['texto']),
+                    'texto': p['texto'],
+                    'parcial': p.get('parcial', False)
+                }
+                for p in paginas
+            ]
+        )
+        return len(paginas)
+
+    def paginas_parciales(self, documento_id):
+        """Números de las páginas del documento cuyo texto falta completar"""
+        filas = self.session.execute(
+            text(
+                "SELECT pagina FROM paginas_texto "
+                "WHERE documento_id = :documento_id AND parcial ORDER BY pagina"
+            ),
+            {'documento_id': documento_id}
+        )
+        return [f.pagina for f in filas]
+
+    def actualizar(self, documento_id, paginas):
+        """Reemplaza el texto de páginas ya indexadas (dicts con 'pagina' y 'texto')"""
+        if not paginas:
+            return 0
+        self.session.execute(
+            text(
+                "UPDATE paginas_texto SET texto_comprimido = :texto_comprimido, "
+                "       vector = to_tsvector('spanish', :texto), parcial = FALSE "
+                "WHERE documento_id = :documento_id AND pagina = :pagina"
+            ),
+            [
+                {
+                    'documento_id': documento_id,
+                    'pagina': p['pagina'],
+                    'texto_comprimido': comprimir(p['texto']),
+                    'texto': p['texto']
+                }
+                for p in paginas
+            ]
+        )
+        return len(paginas)
+
+    def buscar(self, consulta, usuario_id=None, limite=20):
+        """
+        Páginas que coinciden con la consulta (sintaxis de buscador web:
+        "frase exacta", -excluir, OR), ordenadas por relevancia
+        """
+        filas = self.session.execute(
+            text(
+                "SELECT p.documento_id, d.nombre_archivo, p.pagina, p.codigos, p.texto_comprimido, "
+                "       ts_rank_cd(p.vector, q) AS relevancia "
+                "FROM paginas_texto p "
+                "JOIN documentos d ON d.id = p.documento_id, "
+                "     websearch_to_tsquery('spanish', :consulta) q "
+                "WHERE p.vector @@ q "
+                "  AND (CAST(:usuario_id AS INTEGER) IS NULL OR d.usuario_id = :usuario_id) "
+                "ORDER BY relevancia DESC, p.documento_id DESC, p.pagina "
+                "LIMIT :limite"
+            ),
+            {'consulta': consulta, 'usuario_id': usuario_id, 'limite': limite}
+        )
+        return [
+            {
+                'documento_id': f.documento_id,
+                'nombre_archivo': f.nombre_archivo,
+                'pagina': f.pagina,
+                'codigos': f.codigos.split() if f.codigos else [],
+                'fragmento': fragmento(descomprimir(f.texto_comprimido), consulta),
+                'relevancia': round(float(f.relevancia), 4)
+            }
+            for f in filas
+        ]
+
+
+class BusquedaSQLite:
+    """Misma interfaz que BusquedaPostgres sobre una tabla virtual FTS5"""
+
+    def __init__(self, ruta=':memory:'):
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conexion:
+            self.conexion.execute("""
+                CREATE TABLE IF NOT EXISTS documentos_busqueda (
+                    documento_id INTEGER PRIMARY KEY,
+                    nombre_archivo TEXT,
+                    usuario_id INTEGER
+                )
+            """)
+            # El texto se guarda comprimido aparte; FTS5 solo guarda el índice
+            self.conexion.execute("""
+                CREATE TABLE IF NOT EXISTS paginas_texto (
+                    id INTEGER PRIMARY KEY,
+                    documento_id INTEGER,
+                    pagina INTEGER,
+                    codigos TEXT,
+                    texto_comprimido BLOB,
+                    parcial INTEGER DEFAULT 0
+                )
+            """)
+            columnas = {fila[1] for fila in self.conexion.execute("PRAGMA table_info(paginas_texto)")}
+            if 'parcial' not in columnas:
+                # Índices creados antes del texto diferido
+                self.conexion.execute("ALTER TABLE paginas_texto ADD COLUMN parcial INTEGER DEFAULT 0")
+            self.conexion.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS paginas_fts USING fts5(
+                    texto, content='', tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+
+    def en_sesion(self, session):
+        """Vista del índice cuyas escrituras siguen a la transacción de la sesión"""
+        return BusquedaSQLiteEnSesion(self, session)
+
+    def registrar_documento(self, documento_id, nombre_archivo, usuario_id=None):
+        with self.lock, self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO documentos_busqueda VALUES (?, ?, ?)",
+                (documento_id, nombre_archivo, usuario_id)
+            )
+
+    def indexar(self, documento_id, paginas):
+        with self.lock, self.conexion:
+            for p in paginas:
+                cursor = self.conexion.execute(
+                    "INSERT INTO paginas_texto (documento_id, pagina, codigos, texto_comprimido, parcial) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (documento_id, p['pagina'], p['codigos'], comprimir(p['texto']), int(p.get('parcial', False)))
+                )
+                self.conexion.execute(
+                    "INSERT INTO paginas_fts (rowid, texto) VALUES (?, ?)",
+                    (cursor.lastrowid, p['texto'])
+                )
+        return len(paginas)
+
+    def paginas_parciales(self, documento_id):
+        with self.lock:
+            filas = self.conexion.execute(
+                "SELECT pagina FROM paginas_texto WHERE documento_id = ? AND parcial ORDER BY pagina",
+                (documento_id,)
+            ).fetchall()
+        return [pagina for pagina, in filas]
+
+    def actualizar(self, documento_id, paginas):
+        with self.lock, self.conexion:
+            for p in paginas:
+                fila = self.conexion.execute(
+                    "SELECT id, texto_comprimido FROM paginas_texto WHERE documento_id = ? AND pagina = ?",
+                    (documento_id, p['pagina'])
+                ).fetchone()
+                if fila is None:
+                    continue
+                rowid, texto_comprimido = fila
+                # Una tabla FTS5 sin contenido se actualiza borrando con el texto anterior
+                self.conexion.execute(
+                    "INSERT INTO paginas_fts (paginas_fts, rowid, texto) VALUES ('delete', ?, ?)",
+                    (rowid, descomprimir(texto_comprimido))
+                )
+                self.conexion.execute(
+                    "INSERT INTO paginas_fts (rowid, texto) VALUES (?, ?)",
+                    (rowid, p['texto'])
+                )
+                self.conexion.execute(
+                    "UPDATE paginas_texto SET texto_comprimido = ?, parcial = 0 WHERE id = ?",
+                    (comprimir(p['texto']), rowid)
+                )
+        return len(paginas)
+
+    def buscar(self, consulta, usuario_id=None, limite=20):
+        # Cada término entre comillas: la entrada del usuario no se interpreta como sintaxis FTS5
+        terminos = re.findall(r'\w+', consulta)
+        if not terminos:
+            return []
+        expresion = ' '.join('"%s"' % t for t in terminos)
+
+        with self.lock:
+            filas = self.conexion.execute(
+                "SELECT p.documento_id, d.nombre_archivo, p.pagina, p.codigos, p.texto_comprimido, "
+                "       bm25(paginas_fts) AS relevancia "
+                "FROM paginas_fts "
+                "JOIN paginas_texto p ON p.id = paginas_fts.rowid "
+                "LEFT JOIN documentos_busqueda d ON d.documento_id = p.documento_id "
+                "WHERE paginas_fts MATCH ? AND (? IS NULL OR d.usuario_id = ?) "
+                "ORDER BY relevancia, p.documento_id DESC, p.pagina "
+                "LIMIT ?",
+                (expresion, usuario_id, usuario_id, limite)
+            ).fetchall()
+
+        return [
+            {
+                'documento_id': documento_id,
+                'nombre_archivo': nombre_archivo,
+                'pagina': pagina,
+                'codigos': codigos.split() if codigos else [],
+                'fragmento': fragmento(descomprimir(texto_comprimido), consulta),
+                # bm25 es menor cuanto más relevante
+                'relevancia': round(-relevancia, 4)
+            }
+            for documento_id, nombre_archivo, pagina, codigos, texto_comprimido, relevancia in filas
+        ]
+
+
+# Clave de session.info con las escrituras pendientes: [(índice, método, args)]
+CLAVE_PENDIENTES = 'busqueda_sqlite_pendientes'
+
+
+class BusquedaSQLiteEnSesion:
+    """
+    BusquedaSQLite ligada a una sesión de SQLAlchemy
+
+    registrar_documento, indexar y actualizar se encolan en la sesión y se
+    aplican en su after_commit; un rollback las descarta. Las lecturas van
+    directo al índice (no ven lo pendiente, igual que otra conexión de Postgres).
+    """
+
+    def __init__(self, indice, session):
+        self.indice = indice
+        # scoped_session → la Session del contexto actual (los eventos son por instancia)
+        self.session = session() if hasattr(session, 'registry') else session
+
+    def _diferir(self, metodo, *args):
+        self.session.info.setdefault(CLAVE_PENDIENTES, []).append((self.indice, metodo, args))
+        if not event.contains(self.session, 'after_commit', _aplicar_pendientes):
+            event.listen(self.session, 'after_commit', _aplicar_pendientes)
+            event.listen(self.session, 'after_rollback', _descartar_pendientes)
+
+    def registrar_documento(self, documento_id, nombre_archivo, usuario_id=None):
+        self._diferir('registrar_documento', documento_id, nombre_archivo, usuario_id)
+
+    def indexar(self, documento_id, paginas):
+        self._diferir('indexar', documento_id, paginas)
+        return len(paginas)
+
+    def actualizar(self, documento_id, paginas):
+        self._diferir('actualizar', documento_id, paginas)
+        return len(paginas)
+
+    def paginas_parciales(self, documento_id):
+        return self.indice.paginas_parciales(documento_id)
+
+    def buscar(self, consulta, usuario_id=None, limite=20):
+        return self.indice.buscar(consulta, usuario_id=usuario_id, limite=limite)
+
+
+def _aplicar_pendientes(session):
+    for indice, metodo, args in session.info.pop(CLAVE_PENDIENTES, []):
+        try:
+            getattr(indice, metodo)(*args)
+        except sqlite3.Error as e:
+            # La transacción principal ya se confirmó: el índice queda incompleto, no inconsistente
+            print(f"⚠️  Error actualizando el índice de búsqueda ({metodo}): {e}")
+
+
+def _descartar_pendientes(session):
+    session.info.pop(CLAVE_PENDIENTES, None)
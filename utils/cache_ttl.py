@@ -0,0 +1,67 @@
+"""
+Caché en Memoria con Expiración
+Caché por proceso con TTL corto, tamaño máximo, invalidación explícita y
+contadores de aciertos/fallos (usada para los usuarios de Flask-Login)
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """Caché LRU por proceso cuyas entradas expiran tras ttl_segundos"""
+
+    def __init__(self, ttl_segundos=30, max_entradas=1000):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self.entradas = OrderedDict()  # clave → (expira, valor)
+        self.lock = threading.Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave):
+        """Valor guardado, o None si no existe o expiró"""
+        ahora = time.monotonic()
+        with self.lock:
+            entrada = self.entradas.get(clave)
+            if entrada is None or entrada[0] < ahora:
+                if entrada is not None:
+                    del self.entradas[clave]
+                self.fallos += 1
+                return None
+            self.entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self.lock:
+            self.entradas[clave] = (time.monotonic() + self.ttl_segundos, valor)
+            self.entradas.move_to_end(clave)
+            while len(self.entradas) > self.max_entradas:
+                self.entradas.popitem(last=False)
+
+    def invalidar(self, clave):
+        """Elimina una entrada (p. ej. al desactivar un usuario o cambiar su rol)"""
+        with self.lock:
+            if self.entradas.pop(clave, None) is not None:
+                self.invalidaciones += 1
+
+    def limpiar(self):
+        with self.lock:
+            self.entradas.clear()
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        with self.lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self.entradas),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'invalidaciones': self.invalidaciones,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else 0,
+                'ttl_segundos': self.ttl_segundos
+            }
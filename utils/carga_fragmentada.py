@@ -0,0 +1,197 @@
+"""
+Carga Fragmentada y Reanudable
+Recibe archivos grandes por bloques, los escribe directamente a disco y
+calcula el SHA-256 a medida que llegan los datos
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import fcntl
+import hashlib
+import threading
+
+# Tamaño de lectura del stream al escribir cada fragmento
+TAMAÑO_LECTURA = 1024 * 1024
+
+_PATRON_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ErrorCarga(Exception):
+    """Error de una carga fragmentada (incluye los bytes ya recibidos para reanudar)"""
+
+    def __init__(self, mensaje, recibido=None):
+        super().__init__(mensaje)
+        self.recibido = recibido
+
+
+class GestorCargas:
+    """Gestiona cargas fragmentadas persistidas en disco"""
+
+    def __init__(self, directorio='uploads/.cargas/', max_fragmento_mb=64):
+        """
+        Args:
+            directorio: Carpeta para los archivos parciales y su estado
+            max_fragmento_mb: Tamaño máximo aceptado por fragmento
+        """
+        self.directorio = directorio
+        self.max_fragmento = int(max_fragmento_mb * 1024 * 1024)
+        # Hash incremental por carga; si se pierde (reinicio u otro proceso) se reconstruye
+        self.hashes = {}
+        self.lock = threading.Lock()
+
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta_estado(self, carga_id):
+        if not _PATRON_ID.match(carga_id or ''):
+            raise ErrorCarga('Identificador de carga inválido')
+        return os.path.join(self.directorio, f"{carga_id}.json")
+
+    def _ruta_parcial(self, carga_id):
+        return os.path.join(self.directorio, f"{carga_id}.part")
+
+    def iniciar(self, nombre, tamaño_total, metadatos=None):
+        """Crea una carga nueva y devuelve su estado"""
+        if tamaño_total <= 0:
+            raise ErrorCarga('El tamaño total debe ser mayor que cero')
+
+        carga_id = uuid.uuid4().hex
+        estado = {
+            'carga_id': carga_id,
+            'nombre': nombre,
+            'tamaño_total': tamaño_total,
+            'metadatos': metadatos or {},
+            'creado': time.time()
+        }
+        with open(self._ruta_estado(carga_id), 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False)
+        open(self._ruta_parcial(carga_id), 'wb').close()
+
+        with self.lock:
+            self.hashes[carga_id] = (0, hashlib.sha256())
+
+        estado['recibido'] = 0
+        return estado
+
+    def estado(self, carga_id):
+        """Estado de una carga; 'recibido' es el tamaño real del archivo parcial"""
+        ruta_estado = self._ruta_estado(carga_id)
+        try:
+            with open(ruta_estado, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            estado['recibido'] = os.path.getsize(self._ruta_parcial(carga_id))
+        except FileNotFoundError:
+            # También si otra petición la finalizó entre medio (el parcial ya se movió)
+            raise ErrorCarga('Carga no encontrada o expirada')
+        return estado
+
+    def _hash_hasta(self, carga_id, recibido):
+        """Devuelve el hash incremental alineado con los bytes ya escritos"""
+        with self.lock:
+            posicion, h = self.hashes.get(carga_id, (None, None))
+        if posicion == recibido:
+            # Copia: si el fragmento falla a mitad, el hash guardado sigue siendo válido
+            return h.copy()
+
+        # Reanudación en otro proceso o tras reinicio: rehacer el hash del parcial una vez
+        h = hashlib.sha256()
+        with open(self._ruta_parcial(carga_id), 'rb') as f:
+            for bloque in iter(lambda: f.read(TAMAÑO_LECTURA), b''):
+                h.update(bloque)
+        return h
+
+    def escribir_fragmento(self, carga_id, offset, stream, longitud):
+        """
+        Escribe un fragmento leyendo el stream por bloques
+
+        Args:
+            offset: Posición del fragmento; debe coincidir con lo ya recibido
+            stream: Objeto con read() (p. ej. request.stream)
+            longitud: Bytes del fragmento
+
+        Returns:
+            Estado de la carga; si se completó incluye 'sha256'
+        """
+        self._ruta_estado(carga_id)  # Valida el identificador antes de abrir nada
+        try:
+            parcial = open(self._ruta_parcial(carga_id), 'r+b')
+        except FileNotFoundError:
+            raise ErrorCarga('Carga no encontrada o expirada')
+
+        with parcial:
+            # Un fragmento a la vez por carga, entre hilos y procesos: la comprobación
+            # del offset, la escritura y el hash guardado son una sola operación
+            fcntl.flock(parcial, fcntl.LOCK_EX)
+            try:
+                return self._escribir_bloqueado(carga_id, parcial, offset, stream, longitud)
+            finally:
+                parcial.flush()
+                fcntl.flock(parcial, fcntl.LOCK_UN)
+
+    def _escribir_bloqueado(self, carga_id, f, offset, stream, longitud):
+        # Otra petición pudo finalizar la carga mientras se esperaba el bloqueo
+        estado = self.estado(carga_id)
+        recibido = estado['recibido']
+
+        if longitud is None or longitud <= 0:
+            raise ErrorCarga('Fragmento vacío o sin Content-Length', recibido)
+        if longitud > self.max_fragmento:
+            raise ErrorCarga(f'Fragmento demasiado grande (máximo {self.max_fragmento} bytes)', recibido)
+        if offset != recibido:
+            raise ErrorCarga(f'Offset {offset} no coincide con lo recibido ({recibido})', recibido)
+        if recibido + longitud > estado['tamaño_total']:
+            raise ErrorCarga('El fragmento excede el tamaño total declarado', recibido)
+
+        h = self._hash_hasta(carga_id, recibido)
+        escritos = 0
+        f.seek(recibido)
+        while escritos < longitud:
+            bloque = stream.read(min(TAMAÑO_LECTURA, longitud - escritos))
+            if not bloque:
+                break
+            f.write(bloque)
+            h.update(bloque)
+            escritos += len(bloque)
+
+        if escritos < longitud:
+            # Conexión cortada a mitad del fragmento: descartar lo parcial
+            f.truncate(recibido)
+            raise ErrorCarga('Fragmento incompleto, reintente desde el offset indicado', recibido)
+
+        recibido += escritos
+        with self.lock:
+            self.hashes[carga_id] = (recibido, h)
+
+        estado['recibido'] = recibido
+        estado['completo'] = recibido == estado['tamaño_total']
+        if estado['completo']:
+            estado['sha256'] = h.hexdigest()
+        return estado
+
+    def finalizar(self, carga_id, destino):
+        """Mueve el archivo completo a su destino y elimina el estado de la carga"""
+        os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+        os.replace(self._ruta_parcial(carga_id), destino)
+        os.unlink(self._ruta_estado(carga_id))
+        with self.lock:
+            self.hashes.pop(carga_id, None)
+        return destino
+
+    def limpiar_expiradas(self, max_edad_segundos=86400):
+        """Elimina cargas sin actividad (según el último fragmento recibido)"""
+        ahora = time.time()
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.json'):
+                continue
+            carga_id = nombre[:-len('.json')]
+            parcial = self._ruta_parcial(carga_id)
+            ultima_actividad = os.path.getmtime(parcial if os.path.exists(parcial) else os.path.join(self.directorio, nombre))
+            if ahora - ultima_actividad <= max_edad_segundos:
+                continue
+            for ruta in (parcial, os.path.join(self.directorio, nombre)):
+                if os.path.exists(ruta):
+                    os.unlink(ruta)
+            with self.lock:
+                self.hashes.pop(carga_id, None)
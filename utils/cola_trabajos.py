@@ -0,0 +1,257 @@
+"""
+Cola de Trabajos Persistente
+Guarda los trabajos en SQLite para que sobrevivan a reinicios y los reparte
+entre un pool local de hilos que los ejecuta en segundo plano
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import traceback
+from contextlib import closing
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_PROCESANDO = 'procesando'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_ERROR = 'error'
+
+
+def _proceso_vivo(pid):
+    """Indica si un proceso local sigue en ejecución"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ColaTrabajos:
+    """Cola de trabajos respaldada por una base SQLite local"""
+
+    def __init__(self, db_path='trabajos.db', max_intentos=3):
+        """
+        Args:
+            db_path: Ruta de la base SQLite
+            max_intentos: Veces que se reclama un trabajo antes de darlo por fallido
+                (un trabajo se reintenta solo si su proceso murió a medias)
+        """
+        self.db_path = db_path
+        self.max_intentos = max(1, max_intentos)
+        self.nuevo_trabajo = threading.Condition()
+
+        directorio = os.path.dirname(db_path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        with closing(self._conectar()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS trabajos (
+                    id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    resultado TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    intentos INTEGER DEFAULT 0,
+                    creado REAL NOT NULL,
+                    actualizado REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos(estado, creado)')
+
+    def _conectar(self):
+        # isolation_level=None: las transacciones se controlan explícitamente
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def encolar(self, tipo, payload):
+        """Agrega un trabajo a la cola y devuelve su ID"""
+        trabajo_id = str(uuid.uuid4())
+        ahora = time.time()
+        with closing(self._conectar()) as conn:
+            conn.execute(
+                'INSERT INTO trabajos (id, tipo, estado, payload, creado, actualizado) VALUES (?, ?, ?, ?, ?, ?)',
+                (trabajo_id, tipo, ESTADO_PENDIENTE, json.dumps(payload), ahora, ahora)
+            )
+
+        # Despertar a los workers de este proceso
+        with self.nuevo_trabajo:
+            self.nuevo_trabajo.notify()
+
+        return trabajo_id
+
+    def reclamar(self, worker):
+        """Toma atómicamente el trabajo pendiente más antiguo (o None)"""
+        conn = self._conectar()
+        try:
+            # BEGIN IMMEDIATE bloquea escrituras de otros procesos durante la reserva
+            conn.execute('BEGIN IMMEDIATE')
+            # Los que ya agotaron sus intentos no se vuelven a ejecutar
+            conn.execute(
+                'UPDATE trabajos SET estado = ?, error = ?, actualizado = ? WHERE estado = ? AND intentos >= ?',
+                (ESTADO_ERROR, self._mensaje_agotado(), time.time(), ESTADO_PENDIENTE, self.max_intentos)
+            )
+            fila = conn.execute(
+                'SELECT * FROM trabajos WHERE estado = ? ORDER BY creado LIMIT 1',
+                (ESTADO_PENDIENTE,)
+            ).fetchone()
+            if fila is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                'UPDATE trabajos SET estado = ?, worker = ?, intentos = intentos + 1, actualizado = ? WHERE id = ?',
+                (ESTADO_PROCESANDO, worker, time.time(), fila['id'])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        trabajo = self._a_dict(fila)
+        trabajo['estado'] = ESTADO_PROCESANDO
+        return trabajo
+
+    def completar(self, trabajo_id, resultado):
+        """Marca un trabajo como completado y guarda su resultado"""
+        with closing(self._conectar()) as conn:
+            conn.execute(
+                'UPDATE trabajos SET estado = ?, resultado = ?, actualizado = ? WHERE id = ?',
+                (ESTADO_COMPLETADO, json.dumps(resultado, default=str), time.time(), trabajo_id)
+            )
+
+    def fallar(self, trabajo_id, error):
+        """Marca un trabajo como fallido"""
+        with closing(self._conectar()) as conn:
+            conn.execute(
+                'UPDATE trabajos SET estado = ?, error = ?, actualizado = ? WHERE id = ?',
+                (ESTADO_ERROR, str(error), time.time(), trabajo_id)
+            )
+
+    def obtener(self, trabajo_id):
+        """Obtiene un trabajo por ID (None si no existe)"""
+        with closing(self._conectar()) as conn:
+            fila = conn.execute('SELECT * FROM trabajos WHERE id = ?', (trabajo_id,)).fetchone()
+        return self._a_dict(fila) if fila else None
+
+    def recuperar_interrumpidos(self):
+        """
+        Devuelve a la cola los trabajos de procesos locales que ya no existen
+
+        Los que ya se reclamaron max_intentos veces se marcan como fallidos en
+        lugar de reintentarse (un PDF que tumba al worker no se reprocesa sin fin).
+        """
+        host = socket.gethostname()
+        recuperados = 0
+        agotados = 0
+        with closing(self._conectar()) as conn:
+            filas = conn.execute(
+                'SELECT id, worker, intentos FROM trabajos WHERE estado = ?', (ESTADO_PROCESANDO,)
+            ).fetchall()
+            for fila in filas:
+                worker_host, _, pid = (fila['worker'] or '').partition(':')
+                if worker_host != host or not pid.isdigit() or _proceso_vivo(int(pid)):
+                    continue
+                if fila['intentos'] >= self.max_intentos:
+                    conn.execute(
+                        'UPDATE trabajos SET estado = ?, error = ?, actualizado = ? WHERE id = ? AND estado = ?',
+                        (ESTADO_ERROR, self._mensaje_agotado(), time.time(), fila['id'], ESTADO_PROCESANDO)
+                    )
+                    agotados += 1
+                    continue
+                conn.execute(
+                    'UPDATE trabajos SET estado = ?, worker = NULL, actualizado = ? WHERE id = ? AND estado = ?',
+                    (ESTADO_PENDIENTE, time.time(), fila['id'], ESTADO_PROCESANDO)
+                )
+                recuperados += 1
+
+        if recuperados:
+            print(f"♻️  Trabajos interrumpidos devueltos a la cola: {recuperados}")
+        if agotados:
+            print(f"⚠️  Trabajos interrumpidos sin más intentos (marcados como error): {agotados}")
+        return recuperados
+
+    def _mensaje_agotado(self):
+        return f"Interrumpido {self.max_intentos} veces; no se reintenta"
+
+    def _a_dict(self, fila):
+        trabajo = dict(fila)
+        trabajo['payload'] = json.loads(trabajo['payload'])
+        if trabajo.get('resultado'):
+            trabajo['resultado'] = json.loads(trabajo['resultado'])
+        return trabajo
+
+
+class PoolTrabajos:
+    """Pool local de hilos que vacía la cola de trabajos"""
+
+    def __init__(self, cola, manejadores, workers=2, intervalo=2.0):
+        """
+        Args:
+            cola: ColaTrabajos a consumir
+            manejadores: Dict tipo -> función(payload, trabajo_id) que devuelve el resultado
+            workers: Número de hilos
+            intervalo: Segundos entre consultas cuando la cola está vacía
+        """
+        self.cola = cola
+        self.manejadores = manejadores
+        self.workers = workers
+        self.intervalo = intervalo
+        self.hilos = []
+        self.detener_evento = threading.Event()
+
+    def iniciar(self):
+        """Recupera trabajos interrumpidos y arranca los hilos"""
+        if self.hilos:
+            return
+        self.cola.recuperar_interrumpidos()
+        for i in range(self.workers):
+            hilo = threading.Thread(target=self._bucle, name=f"trabajos-{i}", daemon=True)
+            hilo.start()
+            self.hilos.append(hilo)
+        print(f"🧵 Pool de trabajos iniciado con {self.workers} hilo(s)")
+
+    def detener(self):
+        self.detener_evento.set()
+        with self.cola.nuevo_trabajo:
+            self.cola.nuevo_trabajo.notify_all()
+
+    def _bucle(self):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        while not self.detener_evento.is_set():
+            try:
+                trabajo = self.cola.reclamar(worker)
+            except sqlite3.OperationalError as e:
+                print(f"⚠️  Error leyendo la cola de trabajos: {e}")
+                trabajo = None
+
+            if trabajo is None:
+                with self.cola.nuevo_trabajo:
+                    self.cola.nuevo_trabajo.wait(self.intervalo)
+                continue
+
+            self._ejecutar(trabajo)
+
+    def _ejecutar(self, trabajo):
+        manejador = self.manejadores.get(trabajo['tipo'])
+        if manejador is None:
+            self.cola.fallar(trabajo['id'], f"Tipo de trabajo desconocido: {trabajo['tipo']}")
+            return
+
+        try:
+            resultado = manejador(trabajo['payload'], trabajo['id'])
+            self.cola.completar(trabajo['id'], resultado)
+        except Exception as e:
+            print(f"❌ Error en trabajo {trabajo['id']}: {str(e)}")
+            traceback.print_exc()
+            self.cola.fallar(trabajo['id'], e)
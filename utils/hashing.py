@@ -0,0 +1,96 @@
+"""
+Servicio de Hashes de Integridad
+Calcula SHA-256 leyendo los archivos por bloques (memoria acotada) y guarda
+los resultados por (ruta, tamaño, fecha de modificación) para no releerlos
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ServicioHash:
+    """Hashes SHA-256 en streaming con caché LRU"""
+
+    def __init__(self, tamaño_bloque=1024 * 1024, max_entradas=20000, workers=4):
+        """
+        Args:
+            tamaño_bloque: Bytes leídos por iteración
+            max_entradas: Máximo de hashes guardados en memoria
+            workers: Hilos para calcular varios archivos a la vez
+        """
+        self.tamaño_bloque = tamaño_bloque
+        self.max_entradas = max_entradas
+        self.workers = workers
+        self.cache = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.lock = threading.Lock()
+
+    def _clave(self, ruta):
+        # Si el archivo se reescribe cambia el tamaño o la fecha y la clave deja de coincidir
+        stat = os.stat(ruta)
+        return (os.path.realpath(ruta), stat.st_size, stat.st_mtime_ns)
+
+    def _guardar(self, clave, digest):
+        with self.lock:
+            self.cache[clave] = digest
+            self.cache.move_to_end(clave)
+            while len(self.cache) > self.max_entradas:
+                self.cache.popitem(last=False)
+
+    def calcular(self, ruta):
+        """SHA-256 (hex) de un archivo, desde caché si no ha cambiado"""
+        clave = self._clave(ruta)
+        with self.lock:
+            digest = self.cache.get(clave)
+            if digest is not None:
+                self.cache.move_to_end(clave)
+                self.aciertos += 1
+                return digest
+            self.fallos += 1
+
+        h = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(self.tamaño_bloque), b''):
+                h.update(bloque)
+        digest = h.hexdigest()
+
+        self._guardar(clave, digest)
+        return digest
+
+    def calcular_varios(self, rutas):
+        """
+        Calcula los hashes de varios archivos en paralelo
+
+        Returns:
+            Dict nombre de archivo -> SHA-256, en el mismo orden que rutas
+        """
+        rutas = list(rutas)
+        if len(rutas) <= 1:
+            digests = [self.calcular(r) for r in rutas]
+        else:
+            # hashlib libera el GIL en bloques grandes, los hilos sí se reparten el trabajo
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(rutas))) as executor:
+                digests = list(executor.map(self.calcular, rutas))
+        return {os.path.basename(r): d for r, d in zip(rutas, digests)}
+
+    def registrar(self, ruta, digest):
+        """Guarda un hash ya conocido (p. ej. calculado durante la carga)"""
+        self._guardar(self._clave(ruta), digest)
+
+    def estadisticas(self):
+        with self.lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self.cache),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else 0
+            }
+
+
+# Instancia global
+servicio_hash = ServicioHash()
@@ -1,12 +1,23 @@
 """
 Procesador de Imágenes para Escaneo
 Ajusta brillo, contraste, detecta bordes y recorta automáticamente
+
+mejorar_documento analiza un único buffer uint8 de NumPy (límites del
+recorte, media, umbral de Otsu e inclinación opcional) y combina brillo,
+contraste y binarización en una tabla de 256 valores que se aplica a los
+píxeles en una sola pasada.
 """
 
 from PIL import Image, ImageEnhance, ImageFilter
 import numpy as np
 import os
 
+# Pesos de conversión RGB → L de PIL (ITU-R 601-2)
+PESOS_GRIS = np.array([299, 587, 114], dtype=np.uint32)
+
+# Las estadísticas (media, Otsu, inclinación) se calculan sobre 1 de cada PASO_MUESTRA² píxeles
+PASO_MUESTRA = 4
+
 class ImageProcessor:
     """Procesa y mejora imágenes escaneadas"""
     
@@ -120,20 +131,170 @@ class ImageProcessor:
         """
         return image.filter(ImageFilter.FIND_EDGES)
     
-    def mejorar_documento(self, image, auto_crop=True, brightness=1.0, 
-                         contrast=1.0, sharpness=1.0):
+    def limites_contenido(self, gris, threshold=240, margin=10):
+        """
+        Caja del contenido más oscuro que el umbral (sin crear la máscara completa)
+        
+        Args:
+            gris: Array uint8 (alto, ancho) en escala de grises
+        
+        Returns:
+            (xmin, ymin, xmax, ymax) o None si no hay contenido
+        """
+        # Mínimo por fila y por columna: solo dos arrays pequeños
+        filas = np.flatnonzero(gris.min(axis=1) < threshold)
+        if not filas.size:
+            return None
+        columnas = np.flatnonzero(gris[filas[0]:filas[-1] + 1].min(axis=0) < threshold)
+        
+        alto, ancho = gris.shape
+        return (
+            max(0, columnas[0] - margin),
+            max(0, filas[0] - margin),
+            min(ancho, columnas[-1] + margin),
+            min(alto, filas[-1] + margin)
+        )
+    
+    def tabla_ajuste(self, muestra, brightness=1.0, contrast=1.0, binarizar=False):
+        """
+        Tabla de 256 valores equivalente a brillo, luego contraste y luego binarización
+        
+        Args:
+            muestra: Píxeles (gris o RGB) para la media del contraste y el umbral de Otsu
+        
+        Returns:
+            Array uint8 de 256 elementos (se aplica igual a cada canal)
+        """
+        valores = np.arange(256, dtype=np.float32)
+        
+        # Brillo (como ImageEnhance.Brightness): mezcla con negro
+        tabla = np.clip(valores * brightness, 0, 255)
+        
+        # Contraste (como ImageEnhance.Contrast): mezcla con la media de gris tras el brillo
+        if contrast != 1.0:
+            con_brillo = tabla.astype(np.uint8)[muestra]
+            if con_brillo.ndim == 3:
+                con_brillo = con_brillo.astype(np.uint32) @ PESOS_GRIS // 1000
+            media = int(con_brillo.mean() + 0.5)
+            tabla = np.clip(media + (tabla - media) * contrast, 0, 255)
+        
+        tabla = tabla.astype(np.uint8)
+        
+        if binarizar:
+            umbral = self.umbral_otsu(np.bincount(tabla[muestra].ravel(), minlength=256))
+            tabla = np.where(tabla > umbral, 255, 0).astype(np.uint8)
+        
+        return tabla
+    
+    def umbral_otsu(self, histograma):
+        """Umbral de Otsu a partir del histograma de 256 niveles"""
+        histograma = histograma.astype(np.float64)
+        niveles = np.arange(256)
+        peso_fondo = np.cumsum(histograma)
+        peso_frente = peso_fondo[-1] - peso_fondo
+        suma_fondo = np.cumsum(histograma * niveles)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media_fondo = suma_fondo / peso_fondo
+            media_frente = (suma_fondo[-1] - suma_fondo) / peso_frente
+            varianza_entre = peso_fondo * peso_frente * (media_fondo - media_frente) ** 2
+        
+        return int(np.nanargmax(varianza_entre)) if np.isfinite(varianza_entre).any() else 127
+    
+    def estimar_inclinacion(self, gris, max_grados=5.0, paso=0.25, threshold=128):
+        """
+        Ángulo de inclinación del texto por perfiles de proyección
+        
+        Para cada ángulo candidato se proyectan los píxeles de tinta sobre el eje
+        vertical rotado; las líneas de texto alineadas dan el perfil más picudo.
+        
+        Returns:
+            Ángulo en grados (positivo: el texto baja hacia la derecha); corregir
+            con enderezar_imagen(image, angulo)
+        """
+        muestra = gris[::PASO_MUESTRA, ::PASO_MUESTRA]
+        ys, xs = np.nonzero(muestra < threshold)
+        if ys.size < 100:
+            return 0.0
+        if ys.size > 50_000:
+            elegidos = np.random.default_rng(0).choice(ys.size, 50_000, replace=False)
+            ys, xs = ys[elegidos], xs[elegidos]
+        
+        angulos = np.arange(-max_grados, max_grados + paso / 2, paso)
+        radianes = np.deg2rad(angulos)[:, None]
+        # Fila de cada punto al "desrotar" por cada ángulo: (ángulos, puntos)
+        proyecciones = np.rint(ys * np.cos(radianes) - xs * np.sin(radianes)).astype(np.int64)
+        proyecciones -= proyecciones.min(axis=1, keepdims=True)
+        
+        largo = int(proyecciones.max()) + 1
+        desplazamientos = (np.arange(len(angulos)) * largo)[:, None]
+        perfiles = np.bincount((proyecciones + desplazamientos).ravel(), minlength=len(angulos) * largo)
+        perfiles = perfiles.reshape(len(angulos), largo)
+        
+        return float(angulos[np.argmax((perfiles.astype(np.float64) ** 2).sum(axis=1))])
+    
+    def mejorar_documento(self, image, auto_crop=True, brightness=1.0,
+                         contrast=1.0, sharpness=1.0, binarizar=False, enderezar=False):
         """
         Mejora automática de documento escaneado
         
+        Los límites del recorte y las estadísticas se calculan sobre vistas del
+        buffer (la media y el umbral, sobre una muestra); brillo, contraste y
+        binarización se aplican juntos con Image.point, que recorre los píxeles
+        una sola vez en C (indexar la tabla con NumPy es varias veces más lento).
+        La nitidez (convolución) y el enderezado son pasadas extra y solo se
+        hacen si se piden.
+        
         Args:
             image: PIL Image
             auto_crop: Recortar automáticamente
             brightness: Factor de brillo
             contrast: Factor de contraste
             sharpness: Factor de nitidez
+            binarizar: Convertir a blanco y negro con umbral de Otsu
+            enderezar: Estimar la inclinación y rotar para corregirla
         
         Returns:
-            PIL Image mejorada
+            PIL Image mejorada ('L' si se binariza o la entrada no era 'L'/'RGB')
+        """
+        if image.mode not in ('L', 'RGB') or (binarizar and image.mode != 'L'):
+            image = image.convert('L')
+        
+        pixeles = np.asarray(image)
+        gris = pixeles
+        if pixeles.ndim == 3 and (auto_crop or enderezar):
+            gris = np.asarray(image.convert('L'))
+        
+        resultado = image
+        if auto_crop:
+            caja = self.limites_contenido(gris)
+            if caja is not None:
+                xmin, ymin, xmax, ymax = caja
+                pixeles = pixeles[ymin:ymax, xmin:xmax]
+                gris = gris[ymin:ymax, xmin:xmax]
+                resultado = image.crop(caja)
+        
+        if brightness != 1.0 or contrast != 1.0 or binarizar:
+            tabla = self.tabla_ajuste(pixeles[::PASO_MUESTRA, ::PASO_MUESTRA], brightness, contrast, binarizar)
+            # Única pasada sobre todos los píxeles (la misma tabla para cada banda)
+            resultado = resultado.point(tabla.tolist() * len(resultado.getbands()))
+        
+        if sharpness != 1.0:
+            resultado = self.ajustar_nitidez(resultado, sharpness)
+        
+        if enderezar:
+            angulo = self.estimar_inclinacion(gris)
+            if abs(angulo) >= 0.25:
+                resultado = self.enderezar_imagen(resultado, angulo)
+        
+        return resultado
+    
+    def mejorar_documento_encadenado(self, image, auto_crop=True, brightness=1.0,
+                                     contrast=1.0, sharpness=1.0):
+        """
+        Cadena anterior de realces de PIL (una imagen nueva por paso)
+        
+        Se conserva como referencia para benchmark_imagen.py.
         """
         # Recortar automáticamente si está habilitado
         if auto_crop:
@@ -193,6 +354,7 @@ class ImageProcessor:
             Lista de rutas de imágenes procesadas
         """
         import fitz  # PyMuPDF
+        from utils.perfiles_render import renderizar
         
         if output_dir is None:
             output_dir = os.path.dirname(pdf_path)
@@ -205,13 +367,10 @@ class ImageProcessor:
         for page_num in range(len(doc)):
             page = doc[page_num]
             
-            # Renderizar página como imagen
-            pix = page.get_pixmap(dpi=300)
-            img_data = pix.tobytes("png")
-            
-            # Convertir a PIL Image
-            from io import BytesIO
-            image = Image.open(BytesIO(img_data))
+            # Renderizar página en escala de grises (perfil 'mejora', sin codificar a PNG)
+            pix = renderizar(page, 'mejora')
+            image = Image.frombytes('L', (pix.width, pix.height), pix.samples)
+            del pix
             
             # Procesar
             processed = self.mejorar_documento(image, **kwargs)
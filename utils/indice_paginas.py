@@ -0,0 +1,85 @@
+"""
+Índice de Texto por Página
+Se construye una sola vez por documento y lo comparten la búsqueda de
+códigos, el divisor de PDFs y la corrección manual de códigos
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+
+from utils.normalizacion import normalizar_texto, normalizar_con_offsets
+
+
+class IndicePaginas:
+    """Texto crudo y normalizado de cada página de un documento"""
+
+    def __init__(self, paginas):
+        """
+        Args:
+            paginas: Lista de dicts con 'pagina', 'texto' y 'fuente' ('nativo', 'ocr', 'blanco'...)
+        """
+        self.paginas = [
+            {
+                'pagina': p['pagina'],
+                'texto': p['texto'],
+                'texto_normalizado': p.get('texto_normalizado') or normalizar_texto(p['texto']),
+                'fuente': p['fuente']
+            }
+            for p in paginas
+        ]
+        self._inicios = None
+        self._offsets = {}  # Índice de página → mapa de posiciones, al primer uso
+
+    @classmethod
+    def desde_pdf(cls, pdf_document):
+        """Construye el índice solo con texto nativo (sin OCR) de un documento fitz abierto"""
+        return cls([
+            {'pagina': n, 'texto': pdf_document[n].get_text(), 'fuente': 'nativo'}
+            for n in range(len(pdf_document))
+        ])
+
+    def __len__(self):
+        return len(self.paginas)
+
+    def __iter__(self):
+        return iter(self.paginas)
+
+    def texto_completo(self):
+        """Texto crudo del documento, una página por bloque"""
+        return "".join(p['texto'] + "\n" for p in self.paginas)
+
+    def texto_normalizado(self):
+        """Texto normalizado del documento completo"""
+        return "".join(p['texto_normalizado'] for p in self.paginas)
+
+    def ubicar(self, posicion):
+        """
+        Ubica una posición del texto normalizado completo en su página
+
+        Returns:
+            (número de página, posición en el texto crudo de esa página)
+        """
+        if self._inicios is None:
+            # Inicio de cada página dentro de texto_normalizado()
+            self._inicios = [0] + list(accumulate(len(p['texto_normalizado']) for p in self.paginas))
+
+        i = bisect_right(self._inicios, posicion) - 1
+        if i < 0 or i >= len(self.paginas):
+            raise IndexError(f"Posición {posicion} fuera del texto normalizado")
+
+        offsets = self._offsets.get(i)
+        if offsets is None:
+            _, offsets = normalizar_con_offsets(self.paginas[i]['texto'])
+            self._offsets[i] = offsets
+        return self.paginas[i]['pagina'], offsets[posicion - self._inicios[i]]
+
+    def paginas_en_blanco(self):
+        """Números de las páginas detectadas en blanco (sin OCR)"""
+        return [p['pagina'] for p in self.paginas if p['fuente'] == 'blanco']
+
+    def contar_por_fuente(self):
+        """Cuenta páginas por fuente de texto"""
+        conteo = {}
+        for p in self.paginas:
+            conteo[p['fuente']] = conteo.get(p['fuente'], 0) + 1
+        return conteo
@@ -0,0 +1,194 @@
+"""
+Backends de Tesseract
+Reconocen el texto directamente de los píxeles de un fitz.Pixmap, sin PNG
+temporales en disco:
+
+- BackendTesserocr: API de Tesseract en el mismo proceso (tesserocr), creada una
+  vez por hilo y reutilizada en todas las páginas; sin lanzar procesos
+- BackendPytesseract: fallback con pytesseract; la imagen se arma en memoria con
+  Image.frombytes (pytesseract sigue lanzando el ejecutable por página)
+
+Ambos devuelven (texto, confianza media 0-100 o None si no se pudo obtener o
+no se reconoció ninguna palabra).
+OCR_BACKEND elige el backend: 'auto' (tesserocr si está instalado),
+'tesserocr' o 'pytesseract'. tesserocr no usa tesseract_cmd: la carpeta
+tessdata se le pasa explícitamente (OCR_TESSDATA o TESSDATA_PREFIX).
+
+Las APIs de tesserocr se liberan con cerrar_backends() al salir del proceso
+(atexit) y al terminar cada proceso del pool de OCR.
+"""
+
+import os
+import atexit
+import shlex
+import threading
+
+import pytesseract
+from PIL import Image
+
+try:
+    # Bindings de la API C++ de Tesseract; opcional
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Modo de segmentación por defecto del ejecutable tesseract (PSM_AUTO)
+PSM_POR_DEFECTO = 3
+
+# Canales del pixmap → modo de imagen de PIL
+MODOS_PIL = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}
+
+# Carpeta tessdata para tesserocr (None: la compilada en libtesseract)
+TESSDATA = os.getenv('OCR_TESSDATA') or os.getenv('TESSDATA_PREFIX') or None
+
+
+def confianza_tsv(tsv):
+    """Confianza media de las palabras de la salida TSV de tesseract (None si no hay palabras)"""
+    confianzas = []
+    for linea in tsv.splitlines()[1:]:
+        columnas = linea.split('\t')
+        # level, page, block, par, line, word, left, top, width, height, conf, text
+        if len(columnas) == 12 and columnas[11].strip():
+            conf = float(columnas[10])
+            if conf >= 0:
+                confianzas.append(conf)
+    return sum(confianzas) / len(confianzas) if confianzas else None
+
+
+def parsear_config(config):
+    """
+    Convierte una config de la línea de comandos de tesseract en parámetros de la API
+
+    Returns:
+        (psm o None, dict de variables de '-c nombre=valor')
+    """
+    psm = None
+    variables = {}
+    partes = shlex.split(config or '')
+    i = 0
+    while i < len(partes):
+        if partes[i] == '--psm' and i + 1 < len(partes):
+            psm = int(partes[i + 1])
+            i += 2
+        elif partes[i] == '-c' and i + 1 < len(partes):
+            nombre, _, valor = partes[i + 1].partition('=')
+            variables[nombre] = valor
+            i += 2
+        else:
+            i += 1
+    return psm, variables
+
+
+class BackendTesserocr:
+    """API de Tesseract persistente (no es segura entre hilos: una por hilo)"""
+
+    nombre = 'tesserocr'
+
+    def __init__(self, lang, tessdata=None):
+        self.lang = lang
+        if tessdata:
+            self.api = tesserocr.PyTessBaseAPI(path=tessdata, lang=lang)
+        else:
+            self.api = tesserocr.PyTessBaseAPI(lang=lang)
+        self.valores_originales = {}  # Variables cambiadas por alguna config → valor inicial
+
+    def _aplicar_config(self, config):
+        psm, variables = parsear_config(config)
+        self.api.SetPageSegMode(PSM_POR_DEFECTO if psm is None else psm)
+
+        # Las variables persisten en la API: restaurar las que esta config no fija
+        for nombre, valor in self.valores_originales.items():
+            if nombre not in variables:
+                self.api.SetVariable(nombre, valor)
+        for nombre, valor in variables.items():
+            if nombre not in self.valores_originales:
+                self.valores_originales[nombre] = self.api.GetVariableAsString(nombre) or ''
+            self.api.SetVariable(nombre, valor)
+
+    def reconocer(self, pix, config=''):
+        self._aplicar_config(config)
+        self.api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+        texto = self.api.GetUTF8Text()
+        if not texto.strip():
+            # Sin palabras MeanTextConf es 0: no es evidencia de mala lectura
+            return texto, None
+        return texto, float(self.api.MeanTextConf())
+
+    def cerrar(self):
+        if self.api is not None:
+            self.api.End()
+            self.api = None
+
+    @property
+    def cerrado(self):
+        return self.api is None
+
+
+class BackendPytesseract:
+    """Fallback: pytesseract con la imagen armada en memoria desde el pixmap"""
+
+    nombre = 'pytesseract'
+
+    def __init__(self, lang):
+        self.lang = lang
+
+    def reconocer(self, pix, config=''):
+        imagen = Image.frombytes(MODOS_PIL[pix.n], (pix.width, pix.height), pix.samples)
+        if hasattr(pytesseract, 'run_and_get_multiple_output'):
+            # Texto y TSV (para la confianza) en una sola ejecución de tesseract
+            texto, tsv = pytesseract.run_and_get_multiple_output(
+                imagen, extensions=['txt', 'tsv'], lang=self.lang, config=config
+            )
+            return texto, confianza_tsv(tsv)
+        return pytesseract.image_to_string(imagen, lang=self.lang, config=config), None
+
+    cerrado = False
+
+    def cerrar(self):
+        pass
+
+
+def crear_backend(lang, preferido=None, tessdata=None):
+    """Crea el backend indicado (o el de OCR_BACKEND); tesserocr cae a pytesseract si falla"""
+    preferido = preferido or os.getenv('OCR_BACKEND', 'auto')
+
+    if preferido in ('auto', 'tesserocr') and tesserocr is not None:
+        try:
+            return BackendTesserocr(lang, tessdata or TESSDATA)
+        except RuntimeError as e:
+            # Sin tessdata para el idioma, por ejemplo
+            print(f"⚠️  tesserocr no disponible ({e}), se usa pytesseract")
+    elif preferido == 'tesserocr':
+        print("⚠️  tesserocr no está instalado, se usa pytesseract")
+
+    return BackendPytesseract(lang)
+
+
+_backends = threading.local()
+
+# Todos los backends creados (de cualquier hilo), para cerrarlos al salir
+_abiertos = []
+_lock_abiertos = threading.Lock()
+
+
+def obtener_backend(lang):
+    """Backend del hilo actual (se crea en la primera página y se reutiliza)"""
+    backend = getattr(_backends, lang, None)
+    if backend is None or backend.cerrado:
+        backend = crear_backend(lang)
+        setattr(_backends, lang, backend)
+        with _lock_abiertos:
+            _abiertos.append(backend)
+    return backend
+
+
+def cerrar_backends():
+    """Libera las APIs de Tesseract de todos los hilos (al terminar el proceso)"""
+    with _lock_abiertos:
+        abiertos = list(_abiertos)
+        _abiertos.clear()
+    for backend in abiertos:
+        backend.cerrar()
+
+
+atexit.register(cerrar_backends)
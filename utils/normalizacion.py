@@ -0,0 +1,39 @@
+"""
+Normalización de Texto OCR
+Tabla de traducción precompilada con las correcciones OCR usadas para
+buscar códigos notariales: una sola copia del texto en lugar de una por
+cada str.replace, con mapa opcional de posiciones al texto original
+"""
+
+from array import array
+
+# Correcciones OCR comunes
+CORRECCIONES_OCR = {
+    'O': '0', 'o': '0',  # O mayúscula/minúscula → 0
+    'l': '1', 'I': '1', '|': '1',  # l, I, | → 1
+    ' ': None, '\n': None, '\t': None  # Eliminar espacios
+}
+
+TABLA_CORRECCIONES = str.maketrans(CORRECCIONES_OCR)
+
+# Caracteres que desaparecen al normalizar
+_ELIMINADOS = frozenset(c for c, v in CORRECCIONES_OCR.items() if v is None)
+
+
+def normalizar_texto(texto):
+    """Aplica las correcciones OCR en una sola pasada"""
+    return texto.translate(TABLA_CORRECCIONES)
+
+
+
+def normalizar_con_offsets(texto):
+    """
+    Normaliza y devuelve el mapa de posiciones
+
+    Returns:
+        (texto_normalizado, offsets) donde offsets[i] es la posición en el
+        texto original del carácter i del texto normalizado
+    """
+    # Las correcciones son 1 a 1 o eliminaciones, así que basta con saltar las eliminadas
+    offsets = array('l', (i for i, c in enumerate(texto) if c not in _ELIMINADOS))
+    return texto.translate(TABLA_CORRECCIONES), offsets
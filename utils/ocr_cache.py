@@ -0,0 +1,197 @@
+"""
+Caché de Resultados OCR
+Guarda en disco el texto reconocido de cada página, indexado por el hash de
+la imagen renderizada más el idioma y la configuración de Tesseract
+"""
+
+import os
+import json
+import fcntl
+import hashlib
+import tempfile
+import threading
+
+# Contadores compartidos por todos los procesos que usan la misma carpeta
+ARCHIVO_ESTADISTICAS = 'estadisticas.json'
+
+
+class CacheOCR:
+    """Caché persistente de OCR con expulsión LRU acotada por tamaño"""
+
+    def __init__(self, directorio='ocr_cache/', max_mb=512):
+        """
+        Args:
+            directorio: Carpeta donde se guardan las entradas
+            max_mb: Tamaño máximo de la caché en disco (MB)
+        """
+        self.directorio = directorio
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._bytes_estimados = None
+        self.lock = threading.Lock()
+
+        os.makedirs(directorio, exist_ok=True)
+
+    @classmethod
+    def desde_entorno(cls):
+        """Crea la caché según OCR_CACHE_DIR / OCR_CACHE_MAX_MB (None si está desactivada)"""
+        directorio = os.getenv('OCR_CACHE_DIR', 'ocr_cache/')
+        if not directorio:
+            return None
+        return cls(directorio, float(os.getenv('OCR_CACHE_MAX_MB', 512)))
+
+    def clave(self, pix, lang, config=''):
+        """Hash del pixmap renderizado junto con los parámetros de Tesseract"""
+        h = hashlib.sha256()
+        h.update(f"{pix.width}x{pix.height}x{pix.n}|{lang}|{config}|".encode())
+        h.update(pix.samples)
+        return h.hexdigest()
+
+    def _ruta(self, clave):
+        # Subcarpetas por prefijo para no tener miles de archivos en un solo directorio
+        return os.path.join(self.directorio, clave[:2], f"{clave}.txt")
+
+    def obtener(self, clave):
+        """Devuelve el texto guardado o None si no está en caché"""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                texto = f.read()
+        except FileNotFoundError:
+            with self.lock:
+                self.fallos += 1
+            return None
+
+        # Actualizar fecha de acceso para el orden LRU
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+
+        with self.lock:
+            self.aciertos += 1
+        return texto
+
+    def guardar(self, clave, texto):
+        """Guarda el texto de una página y expulsa entradas antiguas si hace falta"""
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+        # Escritura atómica: varios procesos e hilos pueden compartir la caché
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                f.write(texto)
+            os.replace(temporal, ruta)
+        except BaseException:
+            try:
+                os.unlink(temporal)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self.lock:
+            if self._bytes_estimados is None:
+                self._bytes_estimados = self._tamaño_actual()
+            else:
+                self._bytes_estimados += os.path.getsize(ruta)
+            excedido = self._bytes_estimados > self.max_bytes
+
+        if excedido:
+            self._expulsar()
+
+    def _entradas(self):
+        """Lista (ruta, tamaño, fecha de acceso) de todas las entradas"""
+        entradas = []
+        for sub in os.scandir(self.directorio):
+            if not sub.is_dir():
+                continue
+            for entrada in os.scandir(sub.path):
+                if entrada.name.endswith('.txt'):
+                    try:
+                        stat = entrada.stat()
+                    except FileNotFoundError:
+                        continue
+                    entradas.append((entrada.path, stat.st_size, stat.st_mtime))
+        return entradas
+
+    def _tamaño_actual(self):
+        return sum(tamaño for _, tamaño, _ in self._entradas())
+
+    def _expulsar(self):
+        """Elimina las entradas menos usadas hasta quedar en el 90% del máximo"""
+        entradas = sorted(self._entradas(), key=lambda e: e[2])
+        total = sum(tamaño for _, tamaño, _ in entradas)
+        objetivo = self.max_bytes * 0.9
+        expulsadas = 0
+
+        for ruta, tamaño, _ in entradas:
+            if total <= objetivo:
+                break
+            try:
+                os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamaño
+            expulsadas += 1
+
+        with self.lock:
+            self._bytes_estimados = total
+            self.expulsiones += expulsadas
+
+    def volcar_contadores(self):
+        """
+        Suma los contadores de este proceso al archivo compartido de la caché
+
+        Los workers del pool llaman a esto al terminar cada bloque para que las
+        estadísticas reflejen todos los procesos y no solo el actual.
+        """
+        with self.lock:
+            pendientes = {'aciertos': self.aciertos, 'fallos': self.fallos, 'expulsiones': self.expulsiones}
+            self.aciertos = self.fallos = self.expulsiones = 0
+        if not any(pendientes.values()):
+            return
+
+        ruta = os.path.join(self.directorio, ARCHIVO_ESTADISTICAS)
+        with open(ruta, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    totales = json.loads(f.read() or '{}')
+                except ValueError:
+                    totales = {}
+                for nombre, valor in pendientes.items():
+                    totales[nombre] = totales.get(nombre, 0) + valor
+                f.seek(0)
+                f.truncate()
+                json.dump(totales, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _contadores_compartidos(self):
+        try:
+            with open(os.path.join(self.directorio, ARCHIVO_ESTADISTICAS), 'r', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                return json.loads(f.read() or '{}')
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def estadisticas(self):
+        """Contadores de aciertos/fallos de todos los procesos que comparten la caché"""
+        compartidos = self._contadores_compartidos()
+        with self.lock:
+            aciertos = self.aciertos + compartidos.get('aciertos', 0)
+            fallos = self.fallos + compartidos.get('fallos', 0)
+            expulsiones = self.expulsiones + compartidos.get('expulsiones', 0)
+        consultas = aciertos + fallos
+        return {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'expulsiones': expulsiones,
+            'tasa_aciertos': round(aciertos / consultas, 3) if consultas else 0,
+            'max_mb': round(self.max_bytes / (1024 * 1024), 1)
+        }
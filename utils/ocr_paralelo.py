@@ -0,0 +1,284 @@
+"""
+Motor de OCR Paralelo por Páginas
+Reparte las páginas de un PDF entre varios procesos, cada uno con su propio
+documento fitz abierto, y devuelve el texto en el orden original de páginas
+"""
+
+import os
+import multiprocessing
+import multiprocessing.util
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+import pytesseract
+
+from utils.ocr_cache import CacheOCR
+from utils.motor_tesseract import obtener_backend, cerrar_backends
+from utils.perfiles_render import renderizar, escalar
+from utils.paginas_blanco import DetectorPaginasBlanco
+
+TESSERACT_CMD = '/usr/bin/tesseract'
+
+# Mínimo de caracteres para considerar útil el texto nativo de una página
+MIN_CARACTERES_NATIVO = 50
+
+# Parámetros de Tesseract (forman parte de la clave de la caché)
+OCR_LANG = 'spa'
+OCR_CONFIG = ''
+
+# Modos de extracción
+MODO_COMPLETO = 'completo'  # OCR de la página entera
+MODO_CODIGOS = 'codigos'    # OCR solo de las franjas donde va el código notarial
+MODO_FORZADO = 'forzado'    # OCR de la página entera aunque parezca en blanco
+
+
+def _leer_regiones(valor):
+    """'x0,y0,x1,y1;...' en fracciones de la página → lista de tuplas"""
+    regiones = []
+    for region in valor.split(';'):
+        if region.strip():
+            x0, y0, x1, y1 = (float(v) for v in region.split(','))
+            regiones.append((x0, y0, x1, y1))
+    return regiones
+
+
+# Franjas de encabezado y pie de página donde se imprime el código
+REGIONES_CODIGOS = _leer_regiones(os.getenv('OCR_REGIONES', '0,0,1,0.18;0,0.82,1,1'))
+# Solo dígitos y letras de tipo de libro: menos confusiones y Tesseract más rápido
+OCR_CONFIG_CODIGOS = '--psm 6 -c tessedit_char_whitelist=0123456789PDCOA'
+
+# Páginas en blanco que no se pasan por OCR (None si OCR_BLANCO_UMBRAL=0)
+DETECTOR_BLANCO = DetectorPaginasBlanco.desde_entorno()
+
+# Documento, caché, limitador y modo de cada proceso worker (uno por proceso, no por bloque)
+_documento_worker = None
+_cache_worker = None
+_limitador_worker = None
+_modo_worker = MODO_COMPLETO
+
+
+def _inicializar_worker(pdf_path, tesseract_cmd, config_cache, limitador=None, modo=MODO_COMPLETO):
+    """Abre el PDF una sola vez en cada proceso del pool"""
+    global _documento_worker, _cache_worker, _limitador_worker, _modo_worker
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    _documento_worker = fitz.open(pdf_path)
+    _cache_worker = CacheOCR(*config_cache) if config_cache else None
+    _limitador_worker = limitador
+    _modo_worker = modo
+    # Los procesos del pool terminan con os._exit (sin atexit): cerrar el backend al apagarse el pool
+    multiprocessing.util.Finalize(None, cerrar_backends, exitpriority=10)
+
+
+def _procesar_bloque(numeros):
+    """Procesa las páginas indicadas con el documento del worker"""
+    resultado = [
+        extraer_texto_pagina(_documento_worker[n], n, _cache_worker, _limitador_worker, _modo_worker)
+        for n in numeros
+    ]
+    if _cache_worker is not None:
+        _cache_worker.volcar_contadores()
+    return resultado
+
+
+def _ocr_pagina(page, etapa, config, cache=None, limitador=None, clip=None):
+    """
+    Texto de una página (o región) con Tesseract, consultando antes la caché
+
+    Se renderiza con el perfil de la etapa (ver perfiles_render) y los píxeles
+    van directo al backend del hilo, sin pasar por un PNG en disco. Si la
+    confianza es baja se reintenta con más DPI; la caché guarda el resultado
+    final bajo la clave del primer renderizado.
+
+    Returns:
+        (texto, 'acierto' | 'fallo' | None si no hay caché, etapa del resultado)
+    """
+    pix = renderizar(page, etapa, clip)
+
+    clave = None
+    if cache is not None:
+        clave = cache.clave(pix, OCR_LANG, config)
+        texto_cache = cache.obtener(clave)
+        if texto_cache is not None:
+            return texto_cache, 'acierto', etapa
+
+    backend = obtener_backend(OCR_LANG)
+
+    def reconocer(pixmap):
+        with limitador if limitador is not None else nullcontext():
+            return backend.reconocer(pixmap, config)
+
+    texto, confianza = reconocer(pix)
+    del pix  # No mantener dos renderizados en memoria si hay que escalar
+    texto, _, etapa_final = escalar(page, etapa, texto, confianza, reconocer, clip)
+
+    if cache is None:
+        return texto, None, etapa_final
+    cache.guardar(clave, texto)
+    return texto, 'fallo', etapa_final
+
+
+def extraer_texto_pagina(page, page_num, cache=None, limitador=None, modo=MODO_COMPLETO):
+    """
+    Extrae el texto de una página: nativo si está disponible, OCR como fallback
+
+    Args:
+        cache: CacheOCR a consultar antes de llamar a Tesseract (opcional)
+        limitador: Semáforo compartido que acota las páginas en Tesseract a la vez (opcional)
+        modo: MODO_COMPLETO (página entera), MODO_CODIGOS (solo REGIONES_CODIGOS)
+            o MODO_FORZADO (página entera sin descartar las que parecen en blanco)
+
+    Returns:
+        dict con 'pagina', 'texto' y 'fuente' ('nativo', 'blanco', 'ocr' u 'ocr_regiones');
+        las páginas OCR incluyen 'cache' ('acierto' o 'fallo') cuando hay caché
+        y 'escalada' cuando se reintentaron con más DPI por baja confianza
+    """
+    # ESTRATEGIA HÍBRIDA: Intentar texto nativo primero
+    texto_nativo = page.get_text()
+
+    if len(texto_nativo.strip()) > MIN_CARACTERES_NATIVO:
+        return {'pagina': page_num, 'texto': texto_nativo, 'fuente': 'nativo'}
+
+    # Reversos y separadores en blanco: sin OCR
+    if DETECTOR_BLANCO is not None and modo != MODO_FORZADO:
+        regiones = REGIONES_CODIGOS if modo == MODO_CODIGOS else None
+        blanco, metricas = DETECTOR_BLANCO.es_blanco(page, page_num, regiones)
+        if blanco:
+            return {'pagina': page_num, 'texto': '', 'fuente': 'blanco', 'tinta': round(metricas['tinta'], 5)}
+
+    if modo == MODO_CODIGOS:
+        # Solo las franjas del código, con el perfil 'codigos' y lista blanca de caracteres
+        rect = page.rect
+        textos = []
+        estados = []
+        etapas = []
+        for x0, y0, x1, y1 in REGIONES_CODIGOS:
+            clip = fitz.Rect(
+                rect.x0 + x0 * rect.width, rect.y0 + y0 * rect.height,
+                rect.x0 + x1 * rect.width, rect.y0 + y1 * rect.height
+            )
+            texto, estado, etapa = _ocr_pagina(page, 'codigos', OCR_CONFIG_CODIGOS, cache, limitador, clip)
+            textos.append(texto)
+            estados.append(estado)
+            etapas.append(etapa)
+
+        resultado = {'pagina': page_num, 'texto': "\n".join(textos), 'fuente': 'ocr_regiones'}
+        if cache is not None:
+            resultado['cache'] = 'acierto' if all(e == 'acierto' for e in estados) else 'fallo'
+        if any(etapa != 'codigos' for etapa in etapas):
+            resultado['escalada'] = True
+        return resultado
+
+    # Si no tiene texto nativo, usar OCR
+    texto_pagina, estado, etapa = _ocr_pagina(page, 'texto', OCR_CONFIG, cache, limitador)
+
+    resultado = {'pagina': page_num, 'texto': texto_pagina, 'fuente': 'ocr'}
+    if estado is not None:
+        resultado['cache'] = estado
+    if etapa != 'texto':
+        resultado['escalada'] = True
+    return resultado
+
+
+class MotorOCRParalelo:
+    """Extrae texto página a página repartiendo el trabajo en un pool de procesos"""
+
+    def __init__(self, workers=None, paginas_por_bloque=16, min_paginas_paralelo=20,
+                 tesseract_cmd=TESSERACT_CMD, cache=None, limitador=None, modo=None):
+        """
+        Args:
+            workers: Número de procesos (por defecto OCR_WORKERS o todos los núcleos)
+            paginas_por_bloque: Páginas que recibe cada worker por tarea
+            min_paginas_paralelo: Por debajo de este total se procesa en el mismo proceso
+            tesseract_cmd: Ruta del ejecutable de Tesseract
+            cache: CacheOCR compartida (por defecto según OCR_CACHE_DIR)
+            limitador: Semáforo entre procesos (p. ej. de un Manager) que acota las
+                páginas en OCR simultáneas de todos los motores que lo comparten
+            modo: MODO_COMPLETO (página entera) o MODO_CODIGOS (solo las franjas del código)
+        """
+        if workers is None:
+            workers = int(os.getenv('OCR_WORKERS', 0)) or os.cpu_count() or 1
+        self.workers = max(1, workers)
+        self.paginas_por_bloque = max(1, paginas_por_bloque)
+        self.min_paginas_paralelo = min_paginas_paralelo
+        self.tesseract_cmd = tesseract_cmd
+        self.cache = cache if cache is not None else CacheOCR.desde_entorno()
+        self.limitador = limitador
+        self.modo = modo or MODO_COMPLETO
+        self.ultimas_estadisticas = {}
+
+    def _bloques(self, numeros):
+        """Divide la lista de páginas en bloques contiguos"""
+        return [
+            numeros[inicio:inicio + self.paginas_por_bloque]
+            for inicio in range(0, len(numeros), self.paginas_por_bloque)
+        ]
+
+    def extraer_paginas(self, pdf_path, paginas=None, modo=None):
+        """
+        Extrae el texto de las páginas del PDF
+
+        Args:
+            paginas: Números de página a extraer (por defecto todas)
+            modo: Sobrescribe el modo del motor para esta extracción
+
+        Returns:
+            Lista de dicts por página ('pagina', 'texto', 'fuente') en orden
+        """
+        modo = modo or self.modo
+
+        with fitz.open(pdf_path) as pdf_document:
+            numeros = list(range(len(pdf_document))) if paginas is None else sorted(paginas)
+            total_paginas = len(numeros)
+
+            if self.workers == 1 or total_paginas < self.min_paginas_paralelo:
+                pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+                resultado = [
+                    extraer_texto_pagina(pdf_document[n], n, self.cache, self.limitador, modo)
+                    for n in numeros
+                ]
+                if self.cache is not None:
+                    self.cache.volcar_contadores()
+                self._registrar_estadisticas(resultado)
+                return resultado
+
+        bloques = self._bloques(numeros)
+        workers = min(self.workers, len(bloques))
+        print(f"⚙️  OCR paralelo: {workers} procesos, {len(bloques)} bloques de hasta {self.paginas_por_bloque} páginas")
+
+        paginas = []
+        # 'spawn' evita heredar hilos y handles de fitz del proceso web
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=contexto,
+            initializer=_inicializar_worker,
+            initargs=(pdf_path, self.tesseract_cmd, self._config_cache(), self.limitador, modo)
+        ) as executor:
+            # map() conserva el orden de los bloques aunque terminen desordenados
+            for resultado_bloque in executor.map(_procesar_bloque, bloques):
+                anteriores = len(paginas)
+                paginas.extend(resultado_bloque)
+                # Mostrar progreso cada 50 páginas
+                if len(paginas) // 50 > anteriores // 50:
+                    print(f"   Procesadas {len(paginas)}/{total_paginas} páginas")
+
+        self._registrar_estadisticas(paginas)
+        return paginas
+
+    def _config_cache(self):
+        """Parámetros para que cada worker abra la misma caché en disco"""
+        if self.cache is None:
+            return None
+        return (self.cache.directorio, self.cache.max_bytes / (1024 * 1024))
+
+    def _registrar_estadisticas(self, paginas):
+        """Resume los aciertos/fallos de caché y las páginas escaladas de la última extracción"""
+        aciertos = sum(1 for p in paginas if p.get('cache') == 'acierto')
+        fallos = sum(1 for p in paginas if p.get('cache') == 'fallo')
+        escaladas = sum(1 for p in paginas if p.get('escalada'))
+        self.ultimas_estadisticas = {'cache_aciertos': aciertos, 'cache_fallos': fallos, 'escaladas': escaladas}
+        if aciertos or fallos:
+            print(f"   💾 Caché OCR: {aciertos} aciertos, {fallos} fallos")
+        if escaladas:
+            print(f"   🔎 Reintentadas con más DPI por baja confianza: {escaladas} páginas")
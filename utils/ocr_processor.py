@@ -1,90 +1,154 @@
 import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
-import fitz  # PyMuPDF
 import re
-import tempfile
 import os
-import sys
+from bisect import bisect_left
+
+from utils.ocr_paralelo import MotorOCRParalelo, MODO_CODIGOS, MODO_FORZADO
+from utils.indice_paginas import IndicePaginas
+from utils.normalizacion import normalizar_texto
+from utils.analisis_codigos import deduplicar, detectar_faltantes, secuencial
 
 # Añadir esto al inicio de la clase
 class ProcesadorOCR:
-    def __init__(self):
+    def __init__(self, workers=None, limitador=None):
+        """
+        Args:
+            workers: Procesos para el OCR por páginas (por defecto OCR_WORKERS o todos los núcleos)
+            limitador: Semáforo compartido que acota las páginas en OCR simultáneas (opcional)
+        """
         self.codigo_notaria = "1101007"
+        # 'regiones': los códigos se buscan solo en encabezado/pie; 'completo': página entera
+        self.deteccion = os.getenv('OCR_DETECCION', 'regiones')
         # Configurar ruta de Tesseract para Ubuntu
         pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
+        self.motor = MotorOCRParalelo(
+            workers=workers,
+            tesseract_cmd=pytesseract.pytesseract.tesseract_cmd,
+            limitador=limitador
+        )
     
     def extraer_texto(self, pdf_path):
         """Extrae texto del PDF usando texto nativo cuando está disponible, OCR como fallback"""
-        texto_completo = ""
-        
-        # Abrir PDF
-        pdf_document = fitz.open(pdf_path)
-        total_paginas = len(pdf_document)
-        
-        paginas_texto_nativo = 0
-        paginas_ocr = 0
-        
-        print(f"📄 Extrayendo texto de {total_paginas} páginas...")
-        
-        for page_num in range(total_paginas):
-            page = pdf_document[page_num]
-            
-            # ESTRATEGIA HÍBRIDA: Intentar texto nativo primero
-            texto_nativo = page.get_text()
-            
-            # Si tiene contenido útil (>50 caracteres), usar texto nativo
-            if len(texto_nativo.strip()) > 50:
-                texto_completo += texto_nativo + "\n"
-                paginas_texto_nativo += 1
-                
-                # Mostrar progreso cada 50 páginas
-                if (page_num + 1) % 50 == 0:
-                    print(f"   Procesadas {page_num + 1}/{total_paginas} páginas (nativo: {paginas_texto_nativo}, OCR: {paginas_ocr})")
-            else:
-                # Si no tiene texto nativo, usar OCR
-                pix = page.get_pixmap()
-                temp_img_path = tempfile.mktemp(suffix='.png')
-                pix.save(temp_img_path)
-                
-                # Aplicar OCR
-                texto_pagina = pytesseract.image_to_string(
-                    Image.open(temp_img_path),
-                    lang='spa'
-                )
-                texto_completo += texto_pagina + "\n"
-                paginas_ocr += 1
-                
-                # Limpiar archivo temporal
-                os.unlink(temp_img_path)
-                
-                # Mostrar progreso cada 50 páginas
-                if (page_num + 1) % 50 == 0:
-                    print(f"   Procesadas {page_num + 1}/{total_paginas} páginas (nativo: {paginas_texto_nativo}, OCR: {paginas_ocr})")
-        
-        pdf_document.close()
+        return self.construir_indice(pdf_path).texto_completo()
+    
+    def construir_indice(self, pdf_path):
+        """Construye el índice de texto por página (una sola pasada por el documento)"""
+        return IndicePaginas(self.extraer_paginas(pdf_path))
+    
+    def construir_indice_codigos(self, pdf_path, año_config, tipo_config):
+        """Índice mínimo para dividir el libro y sus códigos notariales
+        
+        Con detección por regiones, las páginas escaneadas solo se pasan por OCR
+        en las franjas del código; si así no aparece ningún código se repite
+        con la página completa, y si faltan secuenciales se repite solo en las
+        páginas entre los códigos vecinos de cada faltante (un código fuera de
+        las franjas no debe dividir mal el libro). El texto completo del resto
+        de páginas se obtiene después con completar_texto() cuando se necesita.
+        
+        Returns:
+            (IndicePaginas, lista de códigos únicos)
+        """
+        if self.deteccion == 'regiones':
+            indice = IndicePaginas(self.extraer_paginas(pdf_path, modo=MODO_CODIGOS))
+            codigos = self.buscar_codigos_notariales(indice, año_config, tipo_config)
+            if codigos or not indice.contar_por_fuente().get('ocr_regiones'):
+                paginas = self._paginas_entre_faltantes(indice, codigos, año_config, tipo_config)
+                if paginas:
+                    print(f"⚠️  Faltan secuenciales: OCR de página completa en {len(paginas)} páginas vecinas")
+                    completas = {p['pagina']: p for p in self.completar_texto(pdf_path, paginas, forzar=True)}
+                    indice = IndicePaginas([completas.get(p['pagina'], p) for p in indice])
+                    codigos = self.buscar_codigos_notariales(indice, año_config, tipo_config)
+                return indice, codigos
+            print("⚠️  Sin códigos en las regiones: se repite con OCR de página completa")
+        
+        indice = self.construir_indice(pdf_path)
+        return indice, self.buscar_codigos_notariales(indice, año_config, tipo_config)
+    
+    def _paginas_entre_faltantes(self, indice, codigos, año_config, tipo_config):
+        """Páginas leídas solo por regiones (o descartadas como en blanco) entre el
+        código anterior y el siguiente de cada secuencial faltante"""
+        faltantes = self.detectar_codigos_faltantes(codigos, año_config, tipo_config)
+        if not faltantes:
+            return []
+        
+        # Secuencial → primera página donde aparece su código. Se busca en el mismo
+        # texto que buscar_codigos_notariales, así también se ubica un código que
+        # quedó partido entre dos páginas
+        patron = re.compile(rf'{año_config}{self.codigo_notaria}[{tipo_config}]\d{{5}}')
+        pagina_de = {}
+        for coincidencia in patron.finditer(indice.texto_normalizado()):
+            pagina, _ = indice.ubicar(coincidencia.start())
+            pagina_de.setdefault(secuencial(coincidencia.group()), pagina)
+        encontrados = sorted(pagina_de)
+        if not encontrados:
+            return []
+        
+        paginas = set()
+        for faltante in faltantes:
+            i = bisect_left(encontrados, secuencial(faltante))
+            vecinos = [pagina_de[s] for s in encontrados[max(0, i - 1):i + 1]]
+            paginas.update(range(min(vecinos), max(vecinos) + 1))
+        
+        return [
+            p['pagina'] for p in indice
+            if p['pagina'] in paginas and p['fuente'] in ('ocr_regiones', 'blanco')
+        ]
+    
+    def completar_texto(self, pdf_path, paginas, forzar=False):
+        """OCR de página completa solo para las páginas indicadas (texto diferido)
+        
+        Args:
+            forzar: Pasar por OCR también las páginas que parecen en blanco
+        """
+        return self.extraer_paginas(pdf_path, paginas=paginas, modo=MODO_FORZADO if forzar else None)
+    
+    def extraer_paginas(self, pdf_path, paginas=None, modo=None):
+        """Extrae el texto página a página (en orden) usando el motor paralelo
+        
+        Args:
+            paginas: Números de página a extraer (por defecto todas)
+            modo: MODO_CODIGOS para leer solo las franjas del código; MODO_FORZADO
+                para no descartar las páginas que parecen en blanco
+        """
+        print(f"📄 Extrayendo texto de {pdf_path}...")
+        
+        paginas = self.motor.extraer_paginas(pdf_path, paginas=paginas, modo=modo)
+        total_paginas = len(paginas)
+        
+        if not total_paginas:
+            print("⚠️  El PDF no tiene páginas")
+            return paginas
+        
+        paginas_texto_nativo = sum(1 for p in paginas if p['fuente'] == 'nativo')
+        paginas_regiones = sum(1 for p in paginas if p['fuente'] == 'ocr_regiones')
+        paginas_blanco = sum(1 for p in paginas if p['fuente'] == 'blanco')
+        paginas_ocr = total_paginas - paginas_texto_nativo - paginas_regiones - paginas_blanco
         
         print(f"\n✅ Extracción completada:")
         print(f"   📄 Texto nativo: {paginas_texto_nativo} páginas ({paginas_texto_nativo/total_paginas*100:.1f}%)")
         print(f"   🔍 OCR: {paginas_ocr} páginas ({paginas_ocr/total_paginas*100:.1f}%)")
+        if paginas_blanco:
+            print(f"   ⬜ En blanco (sin OCR): {paginas_blanco} páginas ({paginas_blanco/total_paginas*100:.1f}%)")
+        if paginas_regiones:
+            print(f"   🎯 OCR de regiones del código: {paginas_regiones} páginas ({paginas_regiones/total_paginas*100:.1f}%)")
         
-        return texto_completo
+        return paginas
     
     def buscar_codigos_notariales(self, texto, año_config, tipo_config):
-        """Busca y corrige códigos notariales según el patrón"""
+        """Busca y corrige códigos notariales según el patrón
         
-        print(f"🔍 Buscando códigos para año={año_config}, tipo={tipo_config}")
-        print(f"📝 Texto original: {len(texto)} caracteres")
+        Args:
+            texto: Texto del documento o IndicePaginas ya construido
+        """
         
-        # Correcciones OCR comunes
-        correcciones = [
-            ('O', '0'), ('o', '0'),  # O mayúscula/minúscula → 0
-            ('l', '1'), ('I', '1'), ('|', '1'),  # l, I, | → 1
-            (' ', ''), ('\n', ''), ('\t', '')  # Eliminar espacios
-        ]
+        print(f"🔍 Buscando códigos para año={año_config}, tipo={tipo_config}")
         
-        texto_corregido = texto
-        for viejo, nuevo in correcciones:
-            texto_corregido = texto_corregido.replace(viejo, nuevo)
+        if isinstance(texto, IndicePaginas):
+            # El índice ya tiene cada página normalizada
+            texto_corregido = texto.texto_normalizado()
+        else:
+            print(f"📝 Texto original: {len(texto)} caracteres")
+            texto_corregido = normalizar_texto(texto)
         
         print(f"📝 Texto corregido: {len(texto_corregido)} caracteres")
         
@@ -97,10 +161,7 @@ class ProcesadorOCR:
         print(f"✅ Códigos encontrados (con regex): {len(codigos_encontrados)}")
         
         # Eliminar duplicados manteniendo orden
-        codigos_unicos = []
-        for codigo in codigos_encontrados:
-            if codigo not in codigos_unicos:
-                codigos_unicos.append(codigo)
+        codigos_unicos = deduplicar(codigos_encontrados)
         
         print(f"📋 Códigos únicos: {len(codigos_unicos)}")
         if codigos_unicos:
@@ -116,19 +177,4 @@ class ProcesadorOCR:
     
     def detectar_codigos_faltantes(self, codigos_encontrados, año, tipo):
         """Detecta códigos que deberían existir pero no se encontraron"""
-        if not codigos_encontrados:
-            return []
-        
-        # Extraer secuenciales
-        secuenciales = sorted([int(c[-5:]) for c in codigos_encontrados])
-        min_sec = secuenciales[0]
-        max_sec = secuenciales[-1]
-        
-        # Detectar faltantes en el rango
-        faltantes = []
-        for sec in range(min_sec, max_sec + 1):
-            codigo_esperado = f"{año}{self.codigo_notaria}{tipo}{sec:05d}"
-            if codigo_esperado not in codigos_encontrados:
-                faltantes.append(codigo_esperado)
-        
-        return faltantes
\ No newline at end of file
+        return detectar_faltantes(codigos_encontrados, f"{año}{self.codigo_notaria}{tipo}")
@@ -0,0 +1,123 @@
+"""
+Detector de Páginas en Blanco
+Los libros de protocolo escaneados tienen muchos reversos en blanco y hojas
+separadoras. Antes de pasar una página por Tesseract se renderiza a bajo DPI y
+se mide con NumPy la proporción de píxeles con tinta y la desviación del gris;
+con poca tinta y un gris uniforme la página se marca como 'blanco' y no se
+hace OCR. Al buscar solo códigos, las franjas del código se miden aparte: un
+código sellado en una hoja casi vacía es poca tinta para la página entera,
+pero no para su franja.
+"""
+
+import os
+import json
+import threading
+
+import numpy as np
+
+from utils.perfiles_render import renderizar
+
+
+class DetectorPaginasBlanco:
+    """Clasifica páginas por cobertura de tinta sobre el pixmap en escala de grises"""
+
+    def __init__(self, umbral_tinta=0.002, nivel_tinta=160, max_desviacion=12.0, margen=0.05,
+                 dir_depuracion=None):
+        """
+        Args:
+            umbral_tinta: Fracción de píxeles con tinta por debajo de la cual la página está en blanco
+            nivel_tinta: Gris (0-255) por debajo del cual un píxel cuenta como tinta
+            max_desviacion: Desviación del gris desde la cual la página no está en blanco
+                aunque tenga poca tinta (texto tenue, lápiz); None solo mira la tinta
+            margen: Fracción de cada borde que se ignora (sombras y bordes del escáner)
+            dir_depuracion: Carpeta donde guardar las páginas dudosas (opcional)
+        """
+        self.umbral_tinta = umbral_tinta
+        self.nivel_tinta = nivel_tinta
+        self.max_desviacion = max_desviacion
+        self.margen = margen
+        self.dir_depuracion = dir_depuracion
+        self.lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls):
+        """Detector según OCR_BLANCO_* (None si OCR_BLANCO_UMBRAL=0)"""
+        umbral = float(os.getenv('OCR_BLANCO_UMBRAL', 0.002))
+        if umbral <= 0:
+            return None
+        max_desviacion = float(os.getenv('OCR_BLANCO_MAX_DESVIACION', 12))
+        return cls(
+            umbral_tinta=umbral,
+            nivel_tinta=int(os.getenv('OCR_BLANCO_NIVEL', 160)),
+            max_desviacion=max_desviacion if max_desviacion > 0 else None,
+            dir_depuracion=os.getenv('OCR_BLANCO_DEPURACION') or None
+        )
+
+    def medir(self, pix, regiones=None):
+        """
+        Métricas del pixmap (1 canal, sin alfa)
+
+        Args:
+            regiones: Franjas (x0, y0, x1, y1 en fracciones de la página) a medir aparte
+
+        Returns:
+            dict con 'tinta' (fracción de píxeles oscuros) y 'desviacion' del gris, y
+            con regiones, 'tinta_regiones' (la mayor fracción de tinta de una franja)
+        """
+        # Las filas del pixmap pueden tener relleno: recortar al ancho real
+        pixeles = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+        alto, ancho = pixeles.shape
+        dy, dx = int(alto * self.margen), int(ancho * self.margen)
+        centro = pixeles[dy:alto - dy, dx:ancho - dx]
+        if centro.size == 0:
+            centro = pixeles
+
+        metricas = {
+            'tinta': self._tinta(centro),
+            'desviacion': float(centro.std())
+        }
+        if regiones:
+            # Las franjas completas: el código puede ir dentro del margen de la página
+            franjas = [
+                pixeles[int(y0 * alto):int(y1 * alto), int(x0 * ancho):int(x1 * ancho)]
+                for x0, y0, x1, y1 in regiones
+            ]
+            metricas['tinta_regiones'] = max((self._tinta(f) for f in franjas if f.size), default=0.0)
+        return metricas
+
+    def _tinta(self, pixeles):
+        return float(np.count_nonzero(pixeles < self.nivel_tinta)) / pixeles.size
+
+    def es_blanco(self, page, page_num=None, regiones=None):
+        """
+        Args:
+            regiones: Franjas del código (modo códigos): la página no está en
+                blanco si alguna franja tiene tinta, aunque la página entera no
+
+        Returns:
+            (True si la página está en blanco, métricas)
+        """
+        pix = renderizar(page, 'blanco')
+        metricas = self.medir(pix, regiones)
+        blanco = (
+            metricas['tinta'] < self.umbral_tinta
+            and (self.max_desviacion is None or metricas['desviacion'] < self.max_desviacion)
+            and metricas.get('tinta_regiones', 0.0) < self.umbral_tinta
+        )
+
+        # Dudosas: entre la mitad y el doble del umbral
+        if self.dir_depuracion and self.umbral_tinta / 2 <= metricas['tinta'] < self.umbral_tinta * 2:
+            self._volcar(pix, page, page_num, metricas, blanco)
+        return blanco, metricas
+
+    def _volcar(self, pix, page, page_num, metricas, blanco):
+        """Guarda la página dudosa y sus métricas para ajustar el umbral"""
+        os.makedirs(self.dir_depuracion, exist_ok=True)
+        documento = os.path.splitext(os.path.basename(page.parent.name or 'documento'))[0]
+        nombre = f"{documento}_p{page_num if page_num is not None else page.number}"
+        pix.save(os.path.join(self.dir_depuracion, f"{nombre}.png"))
+
+        entrada = dict(metricas, imagen=f"{nombre}.png", blanco=blanco, umbral=self.umbral_tinta)
+        with self.lock, open(os.path.join(self.dir_depuracion, 'dudosas.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
@@ -1,9 +1,122 @@
 import fitz
 import os
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.indice_paginas import IndicePaginas
+from utils.aho_corasick import AutomataCodigos
+
+# Documento original abierto por cada proceso escritor
+_documento_worker = None
+
+
+def _inicializar_worker(pdf_path):
+    """Abre el PDF original una sola vez por proceso"""
+    global _documento_worker
+    _documento_worker = fitz.open(pdf_path)
+
+
+def _escribir_bloque(rangos, output_dir, opciones_guardado, documento=None):
+    """Escribe un subconjunto de rangos (con el documento del worker si no se pasa otro)"""
+    documento = documento if documento is not None else _documento_worker
+    archivos = []
+    for rango in rangos:
+        nuevo_pdf = fitz.open()
+        
+        # Insertar TODAS las páginas del rango
+        nuevo_pdf.insert_pdf(
+            documento,
+            from_page=rango['inicio'],
+            to_page=rango['fin']
+        )
+        
+        # Nombre del archivo según especificación
+        output_path = os.path.join(output_dir, f"{rango['codigo']}.pdf")
+        nuevo_pdf.save(output_path, **opciones_guardado)
+        nuevo_pdf.close()
+        
+        archivos.append(output_path)
+    return archivos
+
+
+def paginas_con_varios_codigos(rangos):
+    """Páginas donde empieza más de una escritura (comparten la página), según los rangos"""
+    por_pagina = {}
+    for rango in rangos:
+        por_pagina.setdefault(rango['inicio'], []).append(rango['codigo'])
+    return {pagina: codigos for pagina, codigos in sorted(por_pagina.items()) if len(codigos) > 1}
+
+
+def _publicar(preparados, eliminados, output_dir, preparacion):
+    """
+    Mueve los PDFs preparados a output_dir y borra los eliminados (renombres en
+    el mismo sistema de archivos). Los archivos que se reemplazan o borran se
+    apartan primero; si algo falla se restauran y la carpeta queda como estaba.
+
+    Returns:
+        Rutas finales de los archivos publicados
+    """
+    respaldo = os.path.join(preparacion, '.respaldo')
+    os.makedirs(respaldo)
+    hechos = []  # (ruta publicada o None, ruta original, ruta apartada o None)
+    try:
+        for ruta in eliminados:
+            if os.path.exists(ruta):
+                apartado = os.path.join(respaldo, os.path.basename(ruta))
+                os.replace(ruta, apartado)
+                hechos.append((None, ruta, apartado))
+        publicados = []
+        for origen in preparados:
+            destino = os.path.join(output_dir, os.path.basename(origen))
+            apartado = None
+            if os.path.exists(destino):
+                apartado = os.path.join(respaldo, os.path.basename(destino))
+                os.replace(destino, apartado)
+            hechos.append((destino, destino, apartado))
+            os.replace(origen, destino)
+            publicados.append(destino)
+        return publicados
+    except OSError:
+        for publicado, ruta, apartado in reversed(hechos):
+            if publicado is not None and os.path.exists(publicado):
+                os.unlink(publicado)
+            if apartado is not None:
+                os.replace(apartado, ruta)
+        raise
+
 
 class PDFSplitter:
-    def dividir_por_codigos(self, pdf_path, codigos, año, tipo, base_output_dir):
-        """Divide el PDF en archivos individuales por rangos de páginas entre códigos"""
+    def __init__(self, workers=None, opciones_guardado=None, min_rangos_paralelo=8):
+        """
+        Args:
+            workers: Procesos para escribir los PDFs (por defecto SPLIT_WORKERS o todos los núcleos)
+            opciones_guardado: kwargs de fitz.Document.save (por defecto SPLIT_GARBAGE / SPLIT_DEFLATE)
+            min_rangos_paralelo: Por debajo de este número de rangos se escribe en el mismo proceso
+        """
+        if workers is None:
+            workers = int(os.getenv('SPLIT_WORKERS', 0)) or os.cpu_count() or 1
+        self.workers = max(1, workers)
+        self.min_rangos_paralelo = min_rangos_paralelo
+        
+        # garbage/deflate más altos: archivos más pequeños a cambio de más CPU
+        if opciones_guardado is None:
+            opciones_guardado = {
+                'garbage': int(os.getenv('SPLIT_GARBAGE', 0)),
+                'deflate': os.getenv('SPLIT_DEFLATE', '0').lower() in ('1', 'true', 'si')
+            }
+        self.opciones_guardado = opciones_guardado
+        
+        # Rangos de la última división
+        self.rangos = []
+    
+    def dividir_por_codigos(self, pdf_path, codigos, año, tipo, base_output_dir, indice=None):
+        """Divide el PDF en archivos individuales por rangos de páginas entre códigos
+        
+        Args:
+            indice: IndicePaginas del documento (si no se pasa, se usa solo texto nativo)
+        """
         
         print(f"\n📄 Dividiendo PDF: {pdf_path}")
         print(f"📋 Códigos a buscar: {len(codigos)}")
@@ -18,96 +131,32 @@ class PDFSplitter:
         total_paginas = len(pdf_document)
         print(f"📖 Total de páginas en PDF: {total_paginas}")
         
+        if indice is None:
+            indice = IndicePaginas.desde_pdf(pdf_document)
+        
         # PASO 1: Mapear códigos a páginas (una sola pasada por el documento)
         print(f"\n🔍 Mapeando códigos a páginas...")
-        codigo_a_pagina = {}
-        
-        for page_num in range(total_paginas):
-            page = pdf_document[page_num]
-            texto_pagina = page.get_text()
-            
-            # Aplicar las mismas correcciones OCR
-            texto_corregido = texto_pagina
-            correcciones = [
-                ('O', '0'), ('o', '0'),
-                ('l', '1'), ('I', '1'), ('|', '1'),
-                (' ', ''), ('\n', ''), ('\t', '')
-            ]
-            for viejo, nuevo in correcciones:
-                texto_corregido = texto_corregido.replace(viejo, nuevo)
-            
-            # Buscar códigos en esta página
-            for codigo in codigos:
-                if codigo in texto_corregido and codigo not in codigo_a_pagina:
-                    codigo_a_pagina[codigo] = page_num
-                    print(f"   ✅ {codigo} encontrado en página {page_num}")
-                    break  # Pasar a la siguiente página
+        codigo_a_pagina = self._mapear_codigos(indice, codigos, {})
         
         print(f"\n📊 Total de códigos encontrados en el PDF: {len(codigo_a_pagina)}/{len(codigos)}")
         
-        # PASO 2: Ordenar códigos por posición en el documento
-        codigos_ordenados = sorted(
-            codigo_a_pagina.items(),
-            key=lambda x: x[1]  # Ordenar por número de página
-        )
-        
-        # PASO 3: Calcular rangos de páginas
-        print(f"\n📐 Calculando rangos de páginas...")
-        rangos = []
-        
-        for i, (codigo, pagina_inicio) in enumerate(codigos_ordenados):
-            # Si hay un siguiente código, el rango termina antes de él
-            if i + 1 < len(codigos_ordenados):
-                siguiente_pagina = codigos_ordenados[i + 1][1]
-                pagina_fin = siguiente_pagina - 1
-            else:
-                # Último código: incluir hasta el final del documento
-                pagina_fin = total_paginas - 1
-            
-            total_pags = pagina_fin - pagina_inicio + 1
-            rangos.append({
-                'codigo': codigo,
-                'inicio': pagina_inicio,
-                'fin': pagina_fin,
-                'total_paginas': total_pags
-            })
-            
-            print(f"   {codigo}: páginas {pagina_inicio}-{pagina_fin} ({total_pags} páginas)")
+        # PASO 2 y 3: Ordenar códigos y calcular rangos de páginas
+        rangos = self._calcular_rangos(codigo_a_pagina, total_paginas)
+        pdf_document.close()
         
         # PASO 4: Generar PDFs con rangos completos
-        print(f"\n💾 Generando PDFs...")
-        archivos_generados = []
-        
-        for rango in rangos:
-            nuevo_pdf = fitz.open()
-            
-            # Insertar TODAS las páginas del rango
-            nuevo_pdf.insert_pdf(
-                pdf_document,
-                from_page=rango['inicio'],
-                to_page=rango['fin']
-            )
-            
-            # Nombre del archivo según especificación
-            nombre_archivo = f"{rango['codigo']}.pdf"
-            output_path = os.path.join(output_dir, nombre_archivo)
-            
-            nuevo_pdf.save(output_path)
-            nuevo_pdf.close()
-            
-            archivos_generados.append(output_path)
-            print(f"   ✅ {nombre_archivo} guardado ({rango['total_paginas']} páginas)")
-        
-        pdf_document.close()
+        archivos_generados = self._escribir_rangos(pdf_path, rangos, output_dir)
         print(f"\n✅ Total de archivos generados: {len(archivos_generados)}")
         return archivos_generados
     
-    def dividir_por_codigos_con_manual(self, pdf_path, codigos, codigos_manuales, año, tipo, base_output_dir):
+    def dividir_por_codigos_con_manual(self, pdf_path, codigos, codigos_manuales, año, tipo, base_output_dir,
+                                       indice=None):
         """Divide PDF incluyendo códigos agregados manualmente
         
         Args:
             codigos: Lista de códigos detectados por OCR
             codigos_manuales: Lista de tuplas (codigo, pagina_inicio)
+            indice: IndicePaginas del documento (si no se pasa, se usa solo texto nativo)
         """
         
         print(f"\n📄 Dividiendo PDF con códigos manuales: {pdf_path}")
@@ -124,6 +173,9 @@ class PDFSplitter:
         total_paginas = len(pdf_document)
         print(f"📖 Total de páginas en PDF: {total_paginas}")
         
+        if indice is None:
+            indice = IndicePaginas.desde_pdf(pdf_document)
+        
         # PASO 1: Crear mapa de códigos a páginas
         print(f"\n🔍 Mapeando códigos a páginas...")
         codigo_a_pagina = {}
@@ -134,29 +186,105 @@ class PDFSplitter:
             print(f"   🔧 {codigo} agregado manualmente en página {pagina}")
         
         # Luego mapear códigos detectados por OCR (si no están ya)
-        for page_num in range(total_paginas):
-            page = pdf_document[page_num]
-            texto_pagina = page.get_text()
-            
-            # Aplicar las mismas correcciones OCR
-            texto_corregido = texto_pagina
-            correcciones = [
-                ('O', '0'), ('o', '0'),
-                ('l', '1'), ('I', '1'), ('|', '1'),
-                (' ', ''), ('\n', ''), ('\t', '')
-            ]
-            for viejo, nuevo in correcciones:
-                texto_corregido = texto_corregido.replace(viejo, nuevo)
+        codigo_a_pagina = self._mapear_codigos(indice, codigos, codigo_a_pagina)
+        
+        print(f"\n📊 Total de códigos mapeados: {len(codigo_a_pagina)}/{len(codigos)}")
+        
+        # PASO 2 y 3: Ordenar códigos y calcular rangos de páginas
+        rangos = self._calcular_rangos(codigo_a_pagina, total_paginas)
+        pdf_document.close()
+        
+        # PASO 4: Generar PDFs con rangos completos
+        archivos_generados = self._escribir_rangos(pdf_path, rangos, output_dir)
+        print(f"\n✅ Total de archivos generados: {len(archivos_generados)}")
+        return archivos_generados
+    
+    def redividir(self, pdf_path, rangos_previos, codigos_manuales, año, tipo, base_output_dir):
+        """Inserta códigos manuales sobre una división ya hecha reescribiendo solo lo que cambia
+        
+        Los rangos se recalculan a partir del mapa código → página inicial de la
+        división anterior (sin leer texto del PDF); solo se escriben los rangos
+        nuevos o con otras páginas, y se borran los archivos de códigos que
+        dejaron de existir. Los demás PDFs no se tocan.
+        
+        Es todo o nada: si falla la escritura de algún rango, la carpeta de
+        salida queda como estaba (ver _publicar).
+        
+        Args:
+            rangos_previos: self.rangos de la división anterior
+            codigos_manuales: Lista de tuplas (codigo, pagina_inicio), tienen prioridad
+        
+        Returns:
+            (todos los archivos en orden, archivos reescritos, archivos eliminados)
+        """
+        print(f"\n📄 Redivisión incremental: {pdf_path}")
+        
+        tipo_nombre = self._mapear_tipo(tipo)
+        output_dir = os.path.join(base_output_dir, str(año), tipo_nombre)
+        os.makedirs(output_dir, exist_ok=True)
+        
+        with fitz.open(pdf_path) as pdf_document:
+            total_paginas = len(pdf_document)
+        
+        codigo_a_pagina = {rango['codigo']: rango['inicio'] for rango in rangos_previos}
+        for codigo, pagina in codigos_manuales:
+            codigo_a_pagina[codigo] = pagina
+            print(f"   🔧 {codigo} agregado manualmente en página {pagina}")
+        
+        rangos = self._calcular_rangos(codigo_a_pagina, total_paginas)
+        
+        # Comparar con la división anterior por código
+        anteriores = {rango['codigo']: (rango['inicio'], rango['fin']) for rango in rangos_previos}
+        cambiados = [
+            rango for rango in rangos
+            if anteriores.get(rango['codigo']) != (rango['inicio'], rango['fin'])
+        ]
+        vigentes = {rango['codigo'] for rango in rangos}
+        eliminados = [
+            os.path.join(output_dir, f"{codigo}.pdf") for codigo in anteriores if codigo not in vigentes
+        ]
+        
+        print(f"   ♻️  {len(cambiados)} de {len(rangos)} rangos cambian")
+        # Todo o nada: los rangos se escriben aparte y solo se publican si se escribieron todos
+        preparacion = tempfile.mkdtemp(prefix='.redivision_', dir=output_dir)
+        try:
+            preparados = self._escribir_rangos(pdf_path, cambiados, preparacion) if cambiados else []
+            reescritos = _publicar(preparados, eliminados, output_dir, preparacion)
+        finally:
+            shutil.rmtree(preparacion, ignore_errors=True)
+        
+        archivos_generados = [os.path.join(output_dir, f"{rango['codigo']}.pdf") for rango in rangos]
+        return archivos_generados, reescritos, eliminados
+    
+    def _mapear_codigos(self, indice, codigos, codigo_a_pagina):
+        """Asigna a cada código la primera página donde aparece
+        
+        Un autómata Aho-Corasick encuentra todos los códigos de cada página en una
+        sola pasada, así una página con dos escrituras no pierde ninguna.
+        
+        Args:
+            codigo_a_pagina: Mapa previo (p. ej. códigos manuales), tiene prioridad
+        """
+        automata = AutomataCodigos(codigos)
+        
+        for entrada in indice:
+            page_num = entrada['pagina']
+            encontrados = automata.codigos_en(entrada['texto_normalizado'])
+            if not encontrados:
+                continue
             
-            # Buscar códigos en esta página (solo si no están ya mapeados)
-            for codigo in codigos:
-                if codigo not in codigo_a_pagina and codigo in texto_corregido:
+            for codigo in encontrados:
+                if codigo not in codigo_a_pagina:
                     codigo_a_pagina[codigo] = page_num
                     print(f"   ✅ {codigo} encontrado en página {page_num}")
-                    break  # Pasar a la siguiente página
-        
-        print(f"\n📊 Total de códigos mapeados: {len(codigo_a_pagina)}/{len(codigos)}")
+            
+            if len(encontrados) > 1:
+                print(f"   📑 Página {page_num} contiene {len(encontrados)} códigos: {encontrados}")
         
+        return codigo_a_pagina
+    
+    def _calcular_rangos(self, codigo_a_pagina, total_paginas):
+        """Ordena los códigos por página y calcula el rango de cada escritura"""
         # PASO 2: Ordenar códigos por posición en el documento
         codigos_ordenados = sorted(
             codigo_a_pagina.items(),
@@ -171,7 +299,8 @@ class PDFSplitter:
             # Si hay un siguiente código, el rango termina antes de él
             if i + 1 < len(codigos_ordenados):
                 siguiente_pagina = codigos_ordenados[i + 1][1]
-                pagina_fin = siguiente_pagina - 1
+                # Si el siguiente empieza en la misma página, esa página se comparte
+                pagina_fin = max(pagina_inicio, siguiente_pagina - 1)
             else:
                 # Último código: incluir hasta el final del documento
                 pagina_fin = total_paginas - 1
@@ -186,32 +315,43 @@ class PDFSplitter:
             
             print(f"   {codigo}: páginas {pagina_inicio}-{pagina_fin} ({total_pags} páginas)")
         
-        # PASO 4: Generar PDFs con rangos completos
+        self.rangos = rangos
+        return rangos
+    
+    def _escribir_rangos(self, pdf_path, rangos, output_dir):
+        """Escribe un PDF por rango, repartiendo los rangos en un pool de procesos"""
         print(f"\n💾 Generando PDFs...")
-        archivos_generados = []
         
-        for rango in rangos:
-            nuevo_pdf = fitz.open()
-            
-            # Insertar TODAS las páginas del rango
-            nuevo_pdf.insert_pdf(
-                pdf_document,
-                from_page=rango['inicio'],
-                to_page=rango['fin']
-            )
-            
-            # Nombre del archivo según especificación
-            nombre_archivo = f"{rango['codigo']}.pdf"
-            output_path = os.path.join(output_dir, nombre_archivo)
-            
-            nuevo_pdf.save(output_path)
-            nuevo_pdf.close()
+        if self.workers == 1 or len(rangos) < self.min_rangos_paralelo:
+            with fitz.open(pdf_path) as pdf_document:
+                archivos_generados = _escribir_bloque(
+                    rangos, output_dir, self.opciones_guardado, documento=pdf_document
+                )
+        else:
+            # Bloques contiguos: cada worker abre el original una sola vez
+            workers = min(self.workers, len(rangos))
+            tamaño_bloque = -(-len(rangos) // (workers * 2))
+            bloques = [rangos[i:i + tamaño_bloque] for i in range(0, len(rangos), tamaño_bloque)]
+            print(f"⚙️  Escritura paralela: {workers} procesos, {len(bloques)} bloques")
             
-            archivos_generados.append(output_path)
-            print(f"   ✅ {nombre_archivo} guardado ({rango['total_paginas']} páginas)")
+            archivos_generados = []
+            contexto = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=contexto,
+                initializer=_inicializar_worker,
+                initargs=(pdf_path,)
+            ) as executor:
+                futuros = [
+                    executor.submit(_escribir_bloque, bloque, output_dir, self.opciones_guardado)
+                    for bloque in bloques
+                ]
+                for futuro in futuros:
+                    archivos_generados.extend(futuro.result())
+        
+        for rango, output_path in zip(rangos, archivos_generados):
+            print(f"   ✅ {os.path.basename(output_path)} guardado ({rango['total_paginas']} páginas)")
         
-        pdf_document.close()
-        print(f"\n✅ Total de archivos generados: {len(archivos_generados)}")
         return archivos_generados
     
     def _mapear_tipo(self, tipo):
@@ -0,0 +1,85 @@
+"""
+Perfiles de Renderizado de Páginas
+Un solo lugar define cómo se rasteriza una página para cada etapa: siempre en
+escala de grises y sin canal alfa (1 byte por píxel en lugar de 3-4), con el
+DPI que necesita cada etapa y escalado automático a más DPI cuando la
+confianza de Tesseract es baja.
+
+Etapas:
+- 'codigos': franjas del código notarial (OCR_DPI_CODIGOS)
+- 'texto': página completa (OCR_DPI_TEXTO)
+- 'escalado': reintento de una página con baja confianza (OCR_DPI_ESCALADO)
+- 'mejora': mejora de imagen de ImageProcessor
+- 'blanco': miniatura para detectar páginas en blanco (OCR_DPI_BLANCO)
+"""
+
+import os
+
+import fitz  # PyMuPDF
+
+# Confianza media de Tesseract (0-100) por debajo de la cual se reintenta con más DPI
+CONFIANZA_MINIMA = float(os.getenv('OCR_CONFIANZA_MINIMA', 60))
+
+
+class PerfilRender:
+    """DPI y espacio de color de una etapa, y la etapa a la que escala"""
+
+    def __init__(self, nombre, dpi, escalar_a=None, max_reintentos=None):
+        """
+        Args:
+            max_reintentos: Reintentos con más DPI desde esta etapa (None: hasta el último perfil)
+        """
+        self.nombre = nombre
+        self.dpi = dpi
+        self.escalar_a = escalar_a
+        self.max_reintentos = max_reintentos
+
+    def renderizar(self, page, clip=None):
+        """Pixmap en escala de grises y sin alfa (clip opcional en coordenadas de la página)"""
+        return page.get_pixmap(dpi=self.dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+
+    def __repr__(self):
+        return f"PerfilRender({self.nombre!r}, dpi={self.dpi})"
+
+
+PERFILES = {
+    # Las franjas se leen en cada página escaneada: como mucho un reintento
+    'codigos': PerfilRender('codigos', int(os.getenv('OCR_DPI_CODIGOS', 200)), escalar_a='texto', max_reintentos=1),
+    'texto': PerfilRender('texto', int(os.getenv('OCR_DPI_TEXTO', 300)), escalar_a='escalado'),
+    'escalado': PerfilRender('escalado', int(os.getenv('OCR_DPI_ESCALADO', 400))),
+    'mejora': PerfilRender('mejora', int(os.getenv('IMAGEN_DPI', 300))),
+    'blanco': PerfilRender('blanco', int(os.getenv('OCR_DPI_BLANCO', 50))),
+}
+
+
+def renderizar(page, etapa, clip=None):
+    """Renderiza una página (o una región) con el perfil de la etapa"""
+    return PERFILES[etapa].renderizar(page, clip)
+
+
+def escalar(page, etapa, texto, confianza, reconocer, clip=None):
+    """
+    Reintenta el OCR con los perfiles de más DPI mientras la confianza sea baja
+
+    Args:
+        etapa: Etapa con la que se obtuvo el primer resultado
+        texto, confianza: Primer resultado (confianza None: el backend no la informa
+            o no reconoció ninguna palabra; no hay evidencia para reintentar)
+        reconocer: Función pixmap → (texto, confianza)
+
+    Returns:
+        (texto, confianza, etapa) del resultado con mayor confianza
+    """
+    mejor = (texto, confianza, etapa)
+    restantes = PERFILES[etapa].max_reintentos
+    while confianza is not None and confianza < CONFIANZA_MINIMA and restantes != 0:
+        if restantes is not None:
+            restantes -= 1
+        siguiente = PERFILES[etapa].escalar_a
+        if siguiente is None or PERFILES[siguiente].dpi <= PERFILES[etapa].dpi:
+            break
+        etapa = siguiente
+        texto, confianza = reconocer(renderizar(page, etapa, clip))
+        if confianza is not None and confianza > mejor[1]:
+            mejor = (texto, confianza, etapa)
+    return mejor
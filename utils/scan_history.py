@@ -1,61 +1,261 @@
 """
 Historial de Escaneos
 Registra y gestiona el historial de documentos escaneados
+
+El historial completo es un log de solo anexado (JSON Lines); en memoria se
+mantienen los escaneos recientes y los agregados, que se actualizan en O(1)
+por escaneo. Al iniciar se compacta: los agregados se guardan en una
+instantánea junto con la posición del log que ya incluyen, así el arranque
+solo relee lo anexado desde la última vez. Cada compact_every escaneos el log
+activo se archiva como segmento numerado (scan_history.jsonl.00001, ...) y
+vuelve a empezar vacío
 """
 
 import json
 import os
+import threading
+from collections import deque
 from datetime import datetime
+from itertools import islice
 
 class ScanHistory:
     """Gestor de historial de escaneos"""
-    
-    def __init__(self, history_file='scan_history.json'):
+
+    def __init__(self, history_file='scan_history.jsonl', snapshot_file=None,
+                 legacy_file='scan_history.json', recent_size=200, compact_every=1000):
+        """
+        Args:
+            history_file: Log de escaneos (una línea JSON por escaneo)
+            snapshot_file: Instantánea de agregados (por defecto history_file + '.snapshot')
+            legacy_file: Historial antiguo (arreglo JSON) que se migra al log una sola vez
+            recent_size: Escaneos recientes que se mantienen en memoria
+            compact_every: Escaneos en el log activo a partir de los cuales se archiva
+        """
         self.history_file = history_file
-        self.history = self.load_history()
-    
-    def load_history(self):
-        """Carga el historial desde archivo"""
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-    
-    def save_history(self):
-        """Guarda el historial en archivo"""
-        with open(self.history_file, 'w', encoding='utf-8') as f:
-            json.dump(self.history, f, ensure_ascii=False, indent=2)
-    
-    def add_scan(self, filename, scan_type='simple', pages=1, size_mb=0, 
+        self.snapshot_file = snapshot_file or history_file + '.snapshot'
+        self.legacy_file = legacy_file
+        self.compact_every = max(1, compact_every)
+        self.lock = threading.Lock()
+
+        self.recent = deque(maxlen=recent_size)
+        self._reset_aggregates()
+
+        self._migrate_legacy()
+        self.compact()
+
+    def _reset_aggregates(self):
+        self.segment = 0      # Último segmento archivado incluido en los agregados
+        self.log_entries = 0  # Escaneos en el log activo
+        self.last_id = 0
+        self.total_scans = 0
+        self.total_pages = 0
+        self.total_size_mb = 0.0
+        self.scan_types = {}
+        self.compression_usage = {}
+        self.recent.clear()
+
+    def _apply(self, entry):
+        """Incorpora un escaneo a los agregados (O(1))"""
+        self.last_id = max(self.last_id, entry.get('id', 0))
+        self.total_scans += 1
+        self.total_pages += entry.get('pages', 0)
+        self.total_size_mb += entry.get('size_mb', 0)
+
+        scan_type = entry.get('scan_type', 'simple')
+        self.scan_types[scan_type] = self.scan_types.get(scan_type, 0) + 1
+        level = entry.get('compression_level', 'none')
+        self.compression_usage[level] = self.compression_usage.get(level, 0) + 1
+
+        self.recent.append(entry)
+
+    def _migrate_legacy(self):
+        """Pasa el antiguo scan_history.json (reescrito en cada escaneo) al log"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file) or os.path.exists(self.history_file):
+            return
+        try:
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except:
+            return
+        if not isinstance(history, list):
+            return
+
+        with open(self.history_file, 'a', encoding='utf-8') as f:
+            for entry in history:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(self.legacy_file, self.legacy_file + '.migrado')
+
+    def compact(self):
+        """Carga la instantánea, aplica lo anexado desde entonces y guarda una nueva
+
+        Si el log activo ya acumula compact_every escaneos, además se archiva.
+        """
+        with self.lock:
+            snapshot, offset = self._load_state()
+
+            if self.log_entries >= self.compact_every:
+                self._rotate()
+            elif snapshot is None and offset == 0 and not self.segment:
+                return  # Historial vacío: nada que compactar
+            elif (snapshot is None or offset != snapshot.get('offset')
+                  or self.segment != snapshot.get('segment', 0)):
+                self._save_snapshot(offset)
+
+    def _load_state(self):
+        """
+        Reconstruye los agregados desde la instantánea y lo que falte por aplicar
+
+        Returns:
+            (instantánea usada o None, posición del log activo ya aplicada)
+        """
+        self._reset_aggregates()
+        snapshot = self._load_snapshot()
+        segments = self._segments()
+
+        if snapshot is not None:
+            # Segmentos archivados después de guardar la instantánea (corte entre ambos pasos)
+            pending = [(n, path) for n, path in segments if n > snapshot.get('segment', 0)]
+            base = pending[0][1] if pending else self.history_file
+            base_size = os.path.getsize(base) if os.path.exists(base) else 0
+            if snapshot.get('offset', 0) > base_size:
+                snapshot = None  # No corresponde al log: reconstruir todo
+
+        offset = 0
+        if snapshot is None:
+            pending = segments
+        else:
+            offset = snapshot['offset']
+            self.segment = snapshot.get('segment', 0)
+            self.log_entries = snapshot.get('log_entries', 0)
+            self.last_id = snapshot['last_id']
+            self.total_scans = snapshot['total_scans']
+            self.total_pages = snapshot['total_pages']
+            self.total_size_mb = snapshot['total_size_mb']
+            self.scan_types = snapshot['scan_types']
+            self.compression_usage = snapshot['compression_usage']
+            self.recent.extend(snapshot['recent'])
+
+        for n, path in pending:
+            self._apply_file(path, offset)
+            self.segment = n
+            self.log_entries = 0
+            offset = 0
+
+        # Reaplicar solo la cola del log activo
+        offset, count = self._apply_file(self.history_file, offset)
+        self.log_entries += count
+        return snapshot, offset
+
+    def _apply_file(self, path, offset):
+        """Aplica las líneas completas desde offset; devuelve (nuevo offset, escaneos)"""
+        count = 0
+        if not os.path.exists(path) or os.path.getsize(path) <= offset:
+            return offset, count
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Línea incompleta: se relee en el próximo arranque
+                offset += len(line)
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    continue
+                count += 1
+        return offset, count
+
+    def _segments(self):
+        """Segmentos archivados del log, [(número, ruta)] en orden"""
+        directory = os.path.dirname(self.history_file) or '.'
+        prefix = os.path.basename(self.history_file) + '.'
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            (int(name[len(prefix):]), os.path.join(directory, name))
+            for name in os.listdir(directory)
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        )
+
+    def _rotate(self):
+        """Archiva el log activo (ya incluido en los agregados) y guarda la instantánea"""
+        self.segment += 1
+        os.replace(self.history_file, f"{self.history_file}.{self.segment:05d}")
+        self.log_entries = 0
+        self._save_snapshot(0)
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_file):
+            return None
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return None
+
+    def _save_snapshot(self, offset):
+        snapshot = {
+            'offset': offset,
+            'segment': self.segment,
+            'log_entries': self.log_entries,
+            'last_id': self.last_id,
+            'total_scans': self.total_scans,
+            'total_pages': self.total_pages,
+            'total_size_mb': self.total_size_mb,
+            'scan_types': self.scan_types,
+            'compression_usage': self.compression_usage,
+            'recent': list(self.recent)
+        }
+        temporal = self.snapshot_file + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(temporal, self.snapshot_file)
+
+    def add_scan(self, filename, scan_type='simple', pages=1, size_mb=0,
                  compression_level='none', ocr_codes=0, **kwargs):
         """Agrega un escaneo al historial"""
-        entry = {
-            'id': len(self.history) + 1,
-            'timestamp': datetime.now().isoformat(),
-            'filename': filename,
-            'scan_type': scan_type,  # simple, multiple, ocr
-            'pages': pages,
-            'size_mb': round(size_mb, 2),
-            'compression_level': compression_level,
-            'ocr_codes': ocr_codes,
-            **kwargs
-        }
-        
-        self.history.append(entry)
-        self.save_history()
-        
+        with self.lock:
+            entry = {
+                'id': self.last_id + 1,
+                'timestamp': datetime.now().isoformat(),
+                'filename': filename,
+                'scan_type': scan_type,  # simple, multiple, ocr
+                'pages': pages,
+                'size_mb': round(size_mb, 2),
+                'compression_level': compression_level,
+                'ocr_codes': ocr_codes,
+                **kwargs
+            }
+
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._apply(entry)
+            self.log_entries += 1
+            if self.log_entries >= self.compact_every:
+                self._rotate()
+
         return entry['id']
-    
+
     def get_recent(self, limit=10):
-        """Obtiene los escaneos más recientes"""
-        return sorted(self.history, key=lambda x: x['timestamp'], reverse=True)[:limit]
-    
+        """Obtiene los escaneos más recientes (hasta recent_size)"""
+        return list(islice(reversed(self.recent), limit))
+
+    def iter_history(self):
+        """Recorre el historial completo (segmentos y log activo), del más antiguo al más reciente"""
+        paths = [path for _, path in self._segments()] + [self.history_file]
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            except FileNotFoundError:
+                continue
+
     def get_stats(self):
         """Obtiene estadísticas del historial"""
-        if not self.history:
+        if not self.total_scans:
             return {
                 'total_scans': 0,
                 'total_pages': 0,
@@ -63,36 +263,20 @@ class ScanHistory:
                 'avg_pages_per_scan': 0,
                 'avg_size_mb': 0
             }
-        
-        total_scans = len(self.history)
-        total_pages = sum(s['pages'] for s in self.history)
-        total_size = sum(s['size_mb'] for s in self.history)
-        
+
+        total_scans = self.total_scans
+        total_pages = self.total_pages
+        total_size = self.total_size_mb
+
         return {
             'total_scans': total_scans,
             'total_pages': total_pages,
             'total_size_mb': round(total_size, 2),
             'avg_pages_per_scan': round(total_pages / total_scans, 1),
             'avg_size_mb': round(total_size / total_scans, 2),
-            'scan_types': self._count_by_type(),
-            'compression_usage': self._count_by_compression()
+            'scan_types': dict(self.scan_types),
+            'compression_usage': dict(self.compression_usage)
         }
-    
-    def _count_by_type(self):
-        """Cuenta escaneos por tipo"""
-        types = {}
-        for scan in self.history:
-            scan_type = scan.get('scan_type', 'simple')
-            types[scan_type] = types.get(scan_type, 0) + 1
-        return types
-    
-    def _count_by_compression(self):
-        """Cuenta escaneos por nivel de compresión"""
-        compression = {}
-        for scan in self.history:
-            level = scan.get('compression_level', 'none')
-            compression[level] = compression.get(level, 0) + 1
-        return compression
 
 # Instancia global
 scan_history = ScanHistory()
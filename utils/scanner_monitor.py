@@ -1,62 +1,337 @@
 import os
 import glob
+import json
+import queue
 import shutil
+import threading
+import time
 from datetime import datetime
 
+try:
+    # Eventos del sistema de archivos (inotify en Linux); opcional
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _ManejadorEventos(FileSystemEventHandler):
+    """Pasa al monitor las rutas de PDFs creados, modificados o movidos a la carpeta"""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.monitor.observar(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.monitor.observar(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.monitor.observar(event.dest_path)
+
+
 class ScannerMonitor:
-    """Monitor de carpeta para detectar archivos escaneados nuevos"""
-    
-    def __init__(self, watch_dir='scanned/'):
+    """Monitor de carpeta para detectar archivos escaneados nuevos
+
+    Con watchdog instalado se usan eventos del sistema de archivos; si no, se
+    recorre la carpeta cada `intervalo` segundos. En ambos casos un archivo solo
+    se entrega cuando su tamaño no cambia durante `segundos_estables`, así nunca
+    se toma un PDF que el escáner aún está escribiendo.
+    """
+
+    def __init__(self, watch_dir='scanned/', estado_file=None, segundos_estables=5.0,
+                 intervalo=2.0, max_cola=100):
+        """
+        Args:
+            watch_dir: Carpeta donde el escáner deja los PDFs
+            estado_file: JSON con los archivos ya procesados (por defecto dentro de watch_dir)
+            segundos_estables: Tiempo sin cambios de tamaño para considerar un archivo completo
+            intervalo: Segundos entre revisiones de archivos pendientes
+            max_cola: Capacidad de la cola de archivos listos
+        """
         self.watch_dir = watch_dir
-        self.processed_files = set()
-        
+        self.estado_file = estado_file or os.path.join(watch_dir, '.procesados.json')
+        self.segundos_estables = segundos_estables
+        self.intervalo = intervalo
+
+        # Archivos listos para procesar (acotada: si se llena, los pendientes esperan)
+        self.cola = queue.Queue(maxsize=max_cola)
+
+        self.lock = threading.Lock()
+        self.pendientes = {}  # ruta → (tamaño, mtime, visto estable desde)
+        self.encolados = set()
+        self.fallidos = {}  # ruta → mtime del intento fallido (se reintenta si el archivo cambia)
+        self.detenido = threading.Event()
+        self.hilos = []
+        self.observer = None
+
         # Crear directorio si no existe
         os.makedirs(watch_dir, exist_ok=True)
-    
+
+        self.processed_files = self._cargar_procesados()
+
+    # ------------------------------------------------------------------
+    # Estado persistente
+    # ------------------------------------------------------------------
+
+    def _cargar_procesados(self):
+        if not os.path.exists(self.estado_file):
+            return set()
+        try:
+            with open(self.estado_file, 'r', encoding='utf-8') as f:
+                procesados = set(json.load(f))
+        except (OSError, ValueError):
+            return set()
+        # Olvidar los que ya no están en la carpeta (archivados o eliminados)
+        return {ruta for ruta in procesados if os.path.exists(ruta)}
+
+    def _guardar_procesados(self):
+        temporal = self.estado_file + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(sorted(self.processed_files), f, ensure_ascii=False)
+        os.replace(temporal, self.estado_file)
+
+    # ------------------------------------------------------------------
+    # Detección
+    # ------------------------------------------------------------------
+
+    def observar(self, archivo):
+        """Registra un archivo como candidato (lo llaman los eventos o el sondeo)"""
+        if not archivo.lower().endswith('.pdf'):
+            return
+        with self.lock:
+            if archivo in self.processed_files or archivo in self.encolados:
+                return
+            if archivo in self.fallidos:
+                try:
+                    if os.stat(archivo).st_mtime_ns == self.fallidos[archivo]:
+                        return
+                except FileNotFoundError:
+                    pass
+                del self.fallidos[archivo]
+            self.pendientes.setdefault(archivo, (-1, -1, None))
+
+    def _sondear(self):
+        """Registra los PDFs de la carpeta (una sola llamada a scandir)"""
+        try:
+            entradas = list(os.scandir(self.watch_dir))
+        except FileNotFoundError:
+            return
+        for entrada in entradas:
+            if entrada.is_file():
+                self.observar(entrada.path)
+
+    def _revisar_pendientes(self):
+        """Devuelve los pendientes cuyo tamaño lleva segundos_estables sin cambiar"""
+        ahora = time.monotonic()
+        listos = []
+
+        with self.lock:
+            for archivo, (tamaño, mtime, estable_desde) in list(self.pendientes.items()):
+                try:
+                    stat = os.stat(archivo)
+                except FileNotFoundError:
+                    del self.pendientes[archivo]
+                    continue
+
+                if (stat.st_size, stat.st_mtime_ns) != (tamaño, mtime) or stat.st_size == 0:
+                    # Aún se está escribiendo: reiniciar la espera
+                    self.pendientes[archivo] = (stat.st_size, stat.st_mtime_ns, ahora)
+                elif ahora - estable_desde >= self.segundos_estables:
+                    listos.append((stat.st_mtime, archivo))
+
+        # Más antiguos primero
+        return [archivo for _, archivo in sorted(listos)]
+
     def detectar_archivos_nuevos(self):
-        """Detecta archivos PDF nuevos en la carpeta de escaneo"""
+        """Detecta archivos PDF nuevos en la carpeta de escaneo
+
+        Devuelve todos los PDFs aún no procesados, sin esperar a que estén
+        estables (eso lo hace la vigilancia en segundo plano con iniciar()).
+        """
         # Buscar todos los PDFs en la carpeta
         archivos_actuales = set(glob.glob(os.path.join(self.watch_dir, '*.pdf')))
-        
+
         # Filtrar solo los nuevos (no procesados)
-        nuevos = archivos_actuales - self.processed_files
-        
+        with self.lock:
+            nuevos = archivos_actuales - self.processed_files
+
         # Ordenar por fecha de modificación (más antiguos primero)
-        nuevos_ordenados = sorted(nuevos, key=lambda x: os.path.getmtime(x))
-        
-        return nuevos_ordenados
-    
+        return sorted(nuevos, key=lambda x: os.path.getmtime(x))
+
     def marcar_como_procesado(self, archivo):
-        """Marca un archivo como procesado"""
-        self.processed_files.add(archivo)
-    
+        """Marca un archivo como procesado (se guarda en disco)"""
+        with self.lock:
+            self.processed_files.add(archivo)
+            self.pendientes.pop(archivo, None)
+            self.encolados.discard(archivo)
+            self.fallidos.pop(archivo, None)
+            self._guardar_procesados()
+
+    def marcar_como_fallido(self, archivo):
+        """Libera un archivo que falló; se reintenta si cambia o al reiniciar el servicio"""
+        with self.lock:
+            self.encolados.discard(archivo)
+            self.pendientes.pop(archivo, None)
+            try:
+                self.fallidos[archivo] = os.stat(archivo).st_mtime_ns
+            except FileNotFoundError:
+                pass
+
+    def reintentar(self, archivos):
+        """Devuelve archivos encolados a pendientes (tras un fallo de todo el lote)"""
+        with self.lock:
+            for archivo in archivos:
+                self.encolados.discard(archivo)
+                if archivo not in self.processed_files:
+                    self.pendientes[archivo] = (-1, -1, None)
+
+    # ------------------------------------------------------------------
+    # Vigilancia en segundo plano
+    # ------------------------------------------------------------------
+
+    def iniciar(self):
+        """Empieza a vigilar la carpeta y a llenar self.cola con archivos listos"""
+        self.detenido.clear()
+        self._sondear()  # Archivos que llegaron mientras el servicio estaba detenido
+
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(_ManejadorEventos(self), self.watch_dir, recursive=False)
+            self.observer.start()
+            print(f"👁️  Vigilando {self.watch_dir} (eventos del sistema de archivos)")
+        else:
+            print("⚠️  watchdog no está instalado: se recorre la carpeta en lugar de usar eventos")
+            print(f"👁️  Vigilando {self.watch_dir} (sondeo cada {self.intervalo}s)")
+
+        hilo = threading.Thread(target=self._bucle, name='scanner-monitor', daemon=True)
+        hilo.start()
+        self.hilos.append(hilo)
+
+    def _bucle(self):
+        while not self.detenido.wait(self.intervalo):
+            if self.observer is None:
+                self._sondear()
+
+            for archivo in self._revisar_pendientes():
+                try:
+                    self.cola.put_nowait(archivo)
+                except queue.Full:
+                    break  # Se reintenta en la siguiente vuelta
+                with self.lock:
+                    self.pendientes.pop(archivo, None)
+                    self.encolados.add(archivo)
+
+    def iniciar_procesamiento(self, procesador, año, tipo, max_lote=10, archive_dir=None):
+        """Consume la cola con un BatchProcessor en un hilo
+
+        Solo los archivos procesados sin error se marcan como procesados; los
+        que fallan se liberan y se reintentan cuando cambian o al reiniciar.
+
+        Args:
+            procesador: BatchProcessor (u objeto con procesar_lote(archivos, año, tipo))
+            max_lote: Archivos listos que se agrupan en una llamada a procesar_lote
+            archive_dir: Si se indica, los archivos procesados sin error se archivan allí
+
+        Returns:
+            Lista donde se van acumulando los resultados de procesar_lote
+        """
+        resultados = []
+
+        def consumir():
+            while not self.detenido.is_set():
+                try:
+                    lote = [self.cola.get(timeout=self.intervalo)]
+                except queue.Empty:
+                    continue
+                while len(lote) < max_lote:
+                    try:
+                        lote.append(self.cola.get_nowait())
+                    except queue.Empty:
+                        break
+
+                try:
+                    resultados_lote = procesador.procesar_lote(lote, año, tipo)
+                except Exception as e:
+                    # Fallo de todo el lote: liberar los archivos para reintentarlos
+                    print(f"❌ Error procesando lote de {len(lote)} archivo(s): {e}")
+                    self.reintentar(lote)
+                    continue
+
+                sin_resultado = set(lote)
+                for resultado in resultados_lote:
+                    resultados.append(resultado)
+                    archivo = resultado['archivo']
+                    sin_resultado.discard(archivo)
+                    if resultado.get('estado') == 'error':
+                        self.marcar_como_fallido(archivo)
+                        continue
+                    self.marcar_como_procesado(archivo)
+                    if archive_dir:
+                        try:
+                            self.archivar_archivo(archivo, archive_dir)
+                        except OSError as e:
+                            print(f"⚠️  No se pudo archivar {archivo}: {e}")
+                self.reintentar(sin_resultado)
+
+        hilo = threading.Thread(target=consumir, name='scanner-procesador', daemon=True)
+        hilo.start()
+        self.hilos.append(hilo)
+        return resultados
+
+    def detener(self):
+        """Detiene la vigilancia y el procesamiento"""
+        self.detenido.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        for hilo in self.hilos:
+            hilo.join()
+        self.hilos = []
+
+    # ------------------------------------------------------------------
+
     def archivar_archivo(self, archivo, archive_dir='scanned_archive/'):
         """Mueve archivo procesado a carpeta de archivo"""
         # Crear directorio de archivo con fecha
         fecha = datetime.now().strftime('%Y-%m-%d')
         destino_dir = os.path.join(archive_dir, fecha)
         os.makedirs(destino_dir, exist_ok=True)
-        
+
         # Mover archivo
         nombre_archivo = os.path.basename(archivo)
         destino = os.path.join(destino_dir, nombre_archivo)
-        
+
         # Si ya existe, agregar timestamp
         if os.path.exists(destino):
             timestamp = datetime.now().strftime('%H%M%S')
             nombre_base, ext = os.path.splitext(nombre_archivo)
             nombre_archivo = f"{nombre_base}_{timestamp}{ext}"
             destino = os.path.join(destino_dir, nombre_archivo)
-        
+
         shutil.move(archivo, destino)
         print(f"📦 Archivo archivado: {destino}")
-        
+
+        # Ya no está en la carpeta: un escaneo nuevo con el mismo nombre debe procesarse
+        with self.lock:
+            if archivo in self.processed_files:
+                self.processed_files.discard(archivo)
+                self._guardar_procesados()
+
         return destino
-    
+
     def limpiar_procesados(self):
         """Limpia la lista de archivos procesados (útil para reiniciar)"""
-        self.processed_files.clear()
-    
+        with self.lock:
+            self.processed_files.clear()
+            self._guardar_procesados()
+
     def obtener_info_archivo(self, archivo):
         """Obtiene información de un archivo"""
         stat = os.stat(archivo)
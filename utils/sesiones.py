@@ -0,0 +1,134 @@
+"""
+Almacén de Sesiones de Procesamiento
+Guarda en disco los datos necesarios para la corrección manual de códigos
+(archivo, códigos, rangos y hashes) con expiración por inactividad y un
+máximo de sesiones; lo comparten todos los workers
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import fcntl
+import threading
+from contextlib import contextmanager
+
+_PATRON_ID = re.compile(r'^[0-9a-fA-F-]{32,36}$')
+
+# Archivos de bloqueo compartidos entre sesiones (no hay que limpiarlos al expirar)
+FRANJAS_BLOQUEO = 64
+
+
+class AlmacenSesiones:
+    """Sesiones persistidas como archivos JSON con TTL y expulsión por tamaño"""
+
+    def __init__(self, directorio='sesiones/', ttl_segundos=86400, max_sesiones=500):
+        """
+        Args:
+            directorio: Carpeta compartida por todos los procesos
+            ttl_segundos: Inactividad tras la cual una sesión expira
+            max_sesiones: Máximo de sesiones guardadas (se expulsan las menos usadas)
+        """
+        self.directorio = directorio
+        self.ttl_segundos = ttl_segundos
+        self.max_sesiones = max_sesiones
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(directorio, '.bloqueos'), exist_ok=True)
+
+    def _ruta(self, session_id):
+        if not _PATRON_ID.match(session_id or ''):
+            return None
+        return os.path.join(self.directorio, f"{session_id}.json")
+
+    @contextmanager
+    def bloquear(self, session_id):
+        """
+        Bloqueo exclusivo de una sesión entre hilos y procesos
+
+        Envuelve los ciclos leer → modificar → guardar para que dos correcciones
+        simultáneas de la misma sesión no pierdan cambios.
+        """
+        franja = zlib.crc32((session_id or '').encode()) % FRANJAS_BLOQUEO
+        with open(os.path.join(self.directorio, '.bloqueos', f"{franja}.lock"), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def __contains__(self, session_id):
+        return self.obtener(session_id) is not None
+
+    def guardar(self, session_id, datos):
+        """Guarda (o reemplaza) los datos de una sesión"""
+        ruta = self._ruta(session_id)
+        if ruta is None:
+            raise ValueError(f"ID de sesión inválido: {session_id}")
+
+        # Escritura atómica: otro worker puede estar leyendo la misma sesión
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+        self._expulsar()
+
+    def obtener(self, session_id):
+        """Datos de la sesión, o None si no existe o expiró"""
+        ruta = self._ruta(session_id)
+        if ruta is None:
+            return None
+
+        try:
+            if time.time() - os.path.getmtime(ruta) > self.ttl_segundos:
+                self.eliminar(session_id)
+                return None
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # Renovar la expiración por uso
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return datos
+
+    def eliminar(self, session_id):
+        ruta = self._ruta(session_id)
+        if ruta and os.path.exists(ruta):
+            try:
+                os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+
+    def _expulsar(self):
+        """Elimina sesiones expiradas y, si sobran, las menos usadas"""
+        with self.lock:
+            ahora = time.time()
+            sesiones = []
+            for entrada in os.scandir(self.directorio):
+                if not entrada.name.endswith('.json'):
+                    continue
+                try:
+                    mtime = entrada.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if ahora - mtime > self.ttl_segundos:
+                    self._borrar(entrada.path)
+                else:
+                    sesiones.append((mtime, entrada.path))
+
+            sobrantes = len(sesiones) - self.max_sesiones
+            if sobrantes > 0:
+                for _, ruta in sorted(sesiones)[:sobrantes]:
+                    self._borrar(ruta)
+
+    def _borrar(self, ruta):
+        try:
+            os.unlink(ruta)
+        except FileNotFoundError:
+            pass
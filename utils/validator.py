@@ -1,3 +1,5 @@
+from utils.analisis_codigos import analizar_secuenciales
+
 class ValidadorNotarial:
     def validar_secuenciales(self, codigos):
         """Valida la continuidad de los secuenciales"""
@@ -13,32 +15,20 @@ class ValidadorNotarial:
             except:
                 continue
         
-        secuenciales.sort()
+        # Faltantes y duplicados en una pasada sobre el rango (mapa de conteos)
+        analisis = analizar_secuenciales(secuenciales)
+        faltantes = [str(faltante).zfill(5) for faltante in analisis['faltantes']]
+        duplicados = [str(sec).zfill(5) for sec in analisis['duplicados']]
         
-        # Encontrar faltantes
-        faltantes = []
-        for i in range(len(secuenciales) - 1):
-            actual = secuenciales[i]
-            siguiente = secuenciales[i + 1]
-            
-            if siguiente - actual > 1:
-                for faltante in range(actual + 1, siguiente):
-                    faltantes.append(str(faltante).zfill(5))
-        
-        # Encontrar duplicados
-        duplicados = []
-        visto = set()
-        for sec in secuenciales:
-            if sec in visto:
-                duplicados.append(str(sec).zfill(5))
-            visto.add(sec)
+        primero = str(analisis['minimo']).zfill(5) if secuenciales else 'N/A'
+        ultimo = str(analisis['maximo']).zfill(5) if secuenciales else 'N/A'
         
         return {
             'total_encontrados': len(secuenciales),
-            'primer_secuencial': str(secuenciales[0]).zfill(5) if secuenciales else 'N/A',
-            'ultimo_secuencial': str(secuenciales[-1]).zfill(5) if secuenciales else 'N/A',
-            'rango_esperado': f"{str(secuenciales[0]).zfill(5)} - {str(secuenciales[-1]).zfill(5)}" if secuenciales else 'N/A',
+            'primer_secuencial': primero,
+            'ultimo_secuencial': ultimo,
+            'rango_esperado': f"{primero} - {ultimo}" if secuenciales else 'N/A',
             'faltantes': faltantes,
             'duplicados': duplicados,
             'es_continuo': len(faltantes) == 0
-        }
\ No newline at end of file
+        }